@@ -1,3 +1,5 @@
+import hashlib
+import json
 import os
 from dotenv import load_dotenv
 from mistralai import Mistral
@@ -7,11 +9,97 @@ load_dotenv()
 # initialize client
 client = Mistral(api_key=os.getenv("MISTRAL_API_KEY"))
 
+# Agent IDs and configuration hashes kept between runs when agents are persisted
+AGENT_STATE_PATH = "outputs/agent_state.json"
 
-def initialize_agents():
+
+def bake_instructions(instructions, materials):
+    """Append learning materials to an agent's base instructions."""
+    if not materials:
+        return instructions
+    return f"{instructions.rstrip()}\n\n## Learning Materials from Previous Runs\n\n{materials.strip()}\n"
+
+
+def config_hash(config):
+    """Hash an agent's configuration so changes can be detected between runs."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def load_agent_state(state_path):
+    """Load persisted agent IDs and configuration hashes."""
+    if os.path.exists(state_path):
+        try:
+            with open(state_path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠ Warning: Could not read agent state: {e}")
+    return {}
+
+
+def save_agent_state(state_path, state):
+    """Persist agent IDs and configuration hashes."""
+    try:
+        os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+        with open(state_path, "w") as f:
+            json.dump(state, f, indent=2)
+    except Exception as e:
+        print(f"⚠ Warning: Could not save agent state: {e}")
+
+
+def _agent(state, learning_materials, **config):
+    """Create an agent, or reuse a persisted one and update it only if its
+    configuration (including baked-in learning materials) has changed.
+
+    Args:
+        state: Persisted agent state dict, or None to always create a new agent
+        learning_materials: Dict mapping agent names to materials to bake into
+            their instructions
+        **config: Arguments for ``client.beta.agents.create``
+    """
+    name = config['name']
+    config['instructions'] = bake_instructions(config['instructions'], learning_materials.get(name))
+    if state is None:
+        return client.beta.agents.create(**config)
+
+    digest = config_hash(config)
+    entry = state.get(name)
+    if entry:
+        try:
+            if entry['hash'] == digest:
+                agent = client.beta.agents.get(agent_id=entry['id'])
+                print(f"✓ Reusing {name} agent")
+                return agent
+            agent = client.beta.agents.update(agent_id=entry['id'], **config)
+            state[name] = {'id': agent.id, 'hash': digest}
+            print(f"✓ Updated {name} agent instructions")
+            return agent
+        except Exception as e:
+            print(f"⚠ Warning: Could not reuse {name} agent, creating a new one: {e}")
+
+    agent = client.beta.agents.create(**config)
+    state[name] = {'id': agent.id, 'hash': digest}
+    return agent
+
+
+def initialize_agents(learning_materials=None, state_path=None):
+    """Create the five agents.
+
+    Args:
+        learning_materials: Optional dict mapping agent names to learning
+            materials baked into their instructions, so they live server-side
+            instead of being re-sent with every conversation input
+        state_path: Optional JSON file of persisted agents. When given, agents
+            from earlier runs are reused and only updated when their
+            configuration changes; otherwise new agents are created every run.
+
+    Returns:
+        Tuple of (whisper, quant, dev, spec, critique)
+    """
+    learning_materials = learning_materials or {}
+    state = load_agent_state(state_path) if state_path else None
 
     # create agent
-    whisper = client.beta.agents.create(
+    whisper = _agent(state, learning_materials,
         model="mistral-medium-latest",
         name="whisper",
         description="prompt engineer",
@@ -24,7 +112,7 @@ def initialize_agents():
         completion_args={"temperature": 0.3},
     )
 
-    quant = client.beta.agents.create(
+    quant = _agent(state, learning_materials,
         model="mistral-medium-latest",
         name="quant",
         description="Data analyst",
@@ -41,7 +129,7 @@ def initialize_agents():
         ],
     )
 
-    dev = client.beta.agents.create(
+    dev = _agent(state, learning_materials,
         model="mistral-medium-latest",
         name="dev",
         description="Software developer",
@@ -70,7 +158,7 @@ def initialize_agents():
         ],
     )
 
-    spec = client.beta.agents.create(
+    spec = _agent(state, learning_materials,
         model="mistral-medium-latest",
         name="spec",
         description="Designs specifications that can be passed to the software agent for building",
@@ -93,7 +181,7 @@ def initialize_agents():
     )
 
 
-    critique = client.beta.agents.create(
+    critique = _agent(state, learning_materials,
         model="mistral-medium-latest",
         name="critique",
         description="Data analyst",
@@ -111,4 +199,7 @@ def initialize_agents():
         ],
     )
 
+    if state_path:
+        save_agent_state(state_path, state)
+
     return whisper, quant, dev, spec, critique
@@ -11,6 +11,23 @@ from textblob import TextBlob
 from dotenv import load_dotenv
 from mistralai import Mistral
 
+try:
+    from generated_code.embedding_cache import cached_embeddings
+    from generated_code.embedding_batches import embed_in_chunks
+    from generated_code.embedding_store import EmbeddingStore
+    from generated_code.dimensionality import reduce_embeddings
+except ImportError:
+    try:
+        # Run as a script from generated_code/
+        from embedding_cache import cached_embeddings
+        from embedding_batches import embed_in_chunks
+        from embedding_store import EmbeddingStore
+        from dimensionality import reduce_embeddings
+    except ImportError:
+        # Helpers not next to the script: texts are embedded in one request into an
+        # in-memory array, and reduced with plain t-SNE
+        cached_embeddings = embed_in_chunks = EmbeddingStore = reduce_embeddings = None
+
 # Load environment variables
 load_dotenv()
 
@@ -23,25 +40,69 @@ def extract_position_data(file_path):
     positions = df['position_text'].tolist()
     return positions
 
-def embeddings_model(text_data):
-    """Generate embeddings using Mistral's embeddings model."""
-    results = client.embeddings.create(inputs=text_data, model="mistral-embed")
+def extract_position_ids(file_path):
+    """Load the position ids, or None if the file has no position_id column."""
+    columns = pd.read_csv(file_path, nrows=0).columns
+    if 'position_id' not in columns:
+        return None
+    return pd.read_csv(file_path, usecols=['position_id'])['position_id'].astype(str).tolist()
+
+EMBEDDING_MODEL = "mistral-embed"
+
+def embed_request(text_data):
+    """Embed texts with one call to Mistral's embeddings API."""
+    results = client.embeddings.create(inputs=text_data, model=EMBEDDING_MODEL)
     embeddings = [data.embedding for data in results.data]
     return embeddings
 
-def reduce_dimensions(embeddings, n_components=3):
-    """Reduce dimensionality of embeddings using t-SNE."""
-    tsne = TSNE(n_components=n_components, random_state=42)
-    reduced_embeddings = tsne.fit_transform(np.array(embeddings))
+def embed_texts(text_data):
+    """Embed texts in size-limited chunks sent concurrently, in order."""
+    if embed_in_chunks is None:
+        return embed_request(text_data)
+    return embed_in_chunks(text_data, embed_request)
+
+def embeddings_model(text_data, ids=None):
+    """Generate embeddings using Mistral's embeddings model.
+
+    Embeddings are cached on disk by model and text, so only texts never
+    embedded before are sent to the API, each one once. They are returned
+    as an EmbeddingStore: float32 rows in a memory-mapped file, in the order
+    of text_data and indexed by ids (position ids; row numbers by default).
+    """
+    if cached_embeddings is None:
+        return np.asarray(embed_texts(text_data), dtype=np.float32)
+
+    def embed(texts):
+        return cached_embeddings(texts, embed_texts, EMBEDDING_MODEL)
+
+    return EmbeddingStore.build(ids, text_data, embed, EMBEDDING_MODEL)
+
+def as_float32(embeddings):
+    """View embeddings (a store, array or lists) as a float32 array, copying only if needed."""
+    return np.asarray(embeddings, dtype=np.float32)
+
+# Dimensionality reduction: 'tsne' (the original t-SNE), or opt in to
+# 'pca_tsne', 'barnes_hut', 'pca', 'landmark' or 'auto' (t-SNE, or landmark
+# t-SNE beyond 5,000 positions); see dimensionality.py
+REDUCTION_METHOD = "tsne"
+
+def reduce_dimensions(embeddings, n_components=3, method=REDUCTION_METHOD):
+    """Reduce dimensionality of embeddings (t-SNE by default; see dimensionality.py)."""
+    if reduce_embeddings is None:
+        tsne = TSNE(n_components=n_components, random_state=42)
+        return tsne.fit_transform(as_float32(embeddings))
+    reduced_embeddings, method, seconds = reduce_embeddings(embeddings, n_components, method)
+    print(f"Reduced {len(reduced_embeddings)} embeddings to {n_components}D with {method} in {seconds:.1f}s")
     return reduced_embeddings
 
 def get_optimum_n_clusters(embeddings, max_clusters=10):
     """Determine the optimal number of clusters using silhouette score."""
+    embeddings = as_float32(embeddings)
     scs = []
     n_clusters_range = np.arange(2, max_clusters + 1)
     for n_clusters in n_clusters_range:
         kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        clusters = kmeans.fit_predict(np.array(embeddings))
+        clusters = kmeans.fit_predict(embeddings)
         sc = silhouette_score(embeddings, clusters)
         scs.append(sc)
     optimum_n_clusters = n_clusters_range[np.argmax(scs)]
@@ -50,7 +111,7 @@ def get_optimum_n_clusters(embeddings, max_clusters=10):
 def perform_kmeans(n_clusters, embeddings):
     """Perform K-means clustering."""
     kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    clusters = kmeans.fit_predict(np.array(embeddings))
+    clusters = kmeans.fit_predict(as_float32(embeddings))
     return clusters
 
 def plot_3d_cluster_map(clusters, embeddings):
@@ -88,7 +149,7 @@ def analyze_sentiment(text_data):
 def run_pipeline(file_path):
     """Run the full analysis pipeline."""
     positions = extract_position_data(file_path)
-    embeddings = embeddings_model(positions)
+    embeddings = embeddings_model(positions, ids=extract_position_ids(file_path))
     reduced_embeddings = reduce_dimensions(embeddings)
 
     # Clustering
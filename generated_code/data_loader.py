@@ -0,0 +1,124 @@
+"""Load the dataset a generated analysis script was written against.
+
+When Dev embeds the dataset in its code as a CSV string literal, the
+code-saving step in main.py replaces the literal with
+``load_data("<fingerprint>")`` and stores the rows in ``data_cache/`` next
+to this file (as Parquet when pyarrow is installed). Scripts stay small and
+skip parsing a large string literal on every run.
+
+Set DATA_FILE_PATH to run a script against another (e.g. updated) dataset.
+"""
+import bz2
+import gzip
+import io
+import json
+import os
+import pandas as pd
+
+# Environment variable holding the dataset path (same as pipeline.local_executor.DATA_PATH_ENV)
+DATA_PATH_ENV = "DATA_FILE_PATH"
+
+# Cached datasets and their manifest, keyed by fingerprint
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_cache")
+MANIFEST_FILE = "manifest.json"
+
+
+# Deliberately a copy of the detection rules in pipeline/data_loading.py:
+# generated_code runs on its own, next to analysis.py, without the pipeline
+# package on the path. Keep the two in step.
+MAGIC_BYTES = {
+    b'\x1f\x8b': 'gzip',
+    b'BZh': 'bz2',
+    b'\x28\xb5\x2f\xfd': 'zstd',
+}
+PARQUET_MAGIC = b'PAR1'
+
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson', '.json')
+
+
+def _open_decompressed(path, compression):
+    """Open a file as a binary stream, decompressing it on the fly."""
+    if compression == 'gzip':
+        return gzip.open(path, 'rb')
+    if compression == 'bz2':
+        return bz2.open(path, 'rb')
+    if compression == 'zstd':
+        import zstandard
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True))
+    return open(path, 'rb')
+
+
+def detect_format(path):
+    """Return (format, compression) of a data file.
+
+    Compression and Parquet are recognised from their magic bytes; for text
+    formats the first decompressed character decides between JSONL and CSV,
+    with the file extension as a tie-breaker.
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic == PARQUET_MAGIC:
+        return 'parquet', None
+
+    compression = None
+    for prefix, name in MAGIC_BYTES.items():
+        if magic.startswith(prefix):
+            compression = name
+            break
+
+    with _open_decompressed(path, compression) as f:
+        head = f.read(1024).lstrip()
+
+    stem = path.lower()
+    for suffix in ('.gz', '.gzip', '.bz2', '.zst', '.zstd'):
+        if stem.endswith(suffix):
+            stem = stem[:-len(suffix)]
+            break
+
+    if head.startswith(b'{') or (not head and stem.endswith(JSONL_EXTENSIONS)):
+        return 'jsonl', compression
+    return 'csv', compression
+
+
+def read_data_file(path):
+    """Read a CSV, JSONL or Parquet file (CSV and JSONL may be compressed)."""
+    fmt, compression = detect_format(path)
+    if fmt == 'parquet':
+        return pd.read_parquet(path)
+    with _open_decompressed(path, compression) as f:
+        if fmt == 'jsonl':
+            return pd.read_json(f, lines=True)
+        return pd.read_csv(f)
+
+
+def load_manifest(cache_dir=CACHE_DIR):
+    """Return the manifest of cached datasets, or an empty one."""
+    path = os.path.join(cache_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def load_data(fingerprint=None, path=None, cache_dir=CACHE_DIR):
+    """Load a dataset by path or by the fingerprint of the data Dev received.
+
+    Lookup order: an explicit path, then DATA_FILE_PATH, then the cached
+    copy for the fingerprint, then the dataset file that copy came from
+    (which holds every row, even when Dev was only given a sample).
+    """
+    path = path or os.environ.get(DATA_PATH_ENV)
+    if path:
+        return read_data_file(path)
+
+    entry = load_manifest(cache_dir).get(fingerprint)
+    if entry is None:
+        raise FileNotFoundError(f"No dataset with fingerprint {fingerprint} in {cache_dir}; "
+                                f"set {DATA_PATH_ENV} to the dataset to analyze")
+    cached = os.path.join(cache_dir, entry['cache'])
+    if os.path.exists(cached):
+        return read_data_file(cached)
+    if entry.get('source') and os.path.exists(entry['source']):
+        return read_data_file(entry['source'])
+    raise FileNotFoundError(f"Dataset {fingerprint} is no longer in {cache_dir} and its source "
+                            f"{entry.get('source')} is missing; set {DATA_PATH_ENV} to the dataset to analyze")
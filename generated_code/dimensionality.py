@@ -0,0 +1,191 @@
+"""Dimensionality-reduction backends for ``reduce_dimensions``.
+
+scikit-learn's default t-SNE on raw 1024-dimensional embeddings runs its
+neighbour search on one core and is superlinear in the number of
+positions, so it dominates the analysis beyond a few thousand of them.
+Every backend here takes the same arguments and returns an
+(n, n_components) array. ``tsne`` is the default; the others are opt-in
+because they change the layout:
+
+- ``tsne``: scikit-learn's t-SNE with default settings (the original behaviour)
+- ``pca_tsne``: t-SNE on the embeddings after PCA to ``PCA_COMPONENTS`` dimensions
+- ``barnes_hut``: the same Barnes-Hut t-SNE as ``tsne`` (scikit-learn's
+  default method); the only difference is ``n_jobs=N_JOBS``, which runs the
+  neighbour search on several cores
+- ``pca``: PCA only, for quick looks at very large corpora
+- ``landmark``: t-SNE fitted on a sample of ``LANDMARK_ROWS`` positions; every
+  other position is placed at the distance-weighted mean of its nearest
+  landmarks
+- ``auto``: ``tsne`` up to ``AUTO_LANDMARK_ROWS`` positions, ``landmark`` beyond
+
+``compare_reductions`` times the backends on the same embeddings and scores
+how well each preserves neighbourhoods.
+
+Usage:
+    python generated_code/dimensionality.py outputs/embedding_store/<store>.npy --methods pca pca_tsne landmark
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.decomposition import PCA
+from sklearn.manifold import TSNE, trustworthiness
+from sklearn.neighbors import NearestNeighbors
+
+METHODS = ("tsne", "pca_tsne", "barnes_hut", "pca", "landmark")
+
+# Dimensions kept by PCA before t-SNE
+PCA_COMPONENTS = 50
+
+# Cores used by the Barnes-Hut neighbour search (-1 for all)
+N_JOBS = -1
+
+# Landmark t-SNE: positions fitted with t-SNE, and landmarks averaged per other position
+LANDMARK_ROWS = 2000
+LANDMARK_NEIGHBORS = 10
+
+# Above this many positions 'auto' switches from t-SNE to landmark t-SNE
+AUTO_LANDMARK_ROWS = 5000
+
+# t-SNE perplexity, lowered for datasets too small for it
+PERPLEXITY = 30.0
+
+# Rows used to score neighbourhood preservation in compare_reductions
+QUALITY_ROWS = 1000
+
+
+def _tsne(n_components, n_rows, random_state, **options):
+    return TSNE(n_components=n_components, perplexity=min(PERPLEXITY, n_rows - 1),
+                random_state=random_state, **options)
+
+
+def _pca(embeddings, n_components, random_state):
+    """Project embeddings onto at most n_components principal components."""
+    n_components = min(n_components, *embeddings.shape)
+    return PCA(n_components=n_components, random_state=random_state).fit_transform(embeddings)
+
+
+def reduce_tsne(embeddings, n_components=3, random_state=42):
+    """t-SNE with scikit-learn's defaults on the full embeddings."""
+    return _tsne(n_components, len(embeddings), random_state).fit_transform(embeddings)
+
+
+def reduce_pca_tsne(embeddings, n_components=3, random_state=42):
+    """t-SNE on embeddings pre-reduced with PCA."""
+    reduced = _pca(embeddings, PCA_COMPONENTS, random_state)
+    return _tsne(n_components, len(embeddings), random_state).fit_transform(reduced)
+
+
+def reduce_barnes_hut(embeddings, n_components=3, random_state=42):
+    """``reduce_tsne`` with its nearest-neighbour search run on N_JOBS cores."""
+    tsne = _tsne(n_components, len(embeddings), random_state, method="barnes_hut", n_jobs=N_JOBS)
+    return tsne.fit_transform(embeddings)
+
+
+def reduce_pca(embeddings, n_components=3, random_state=42):
+    """PCA only."""
+    return _pca(embeddings, n_components, random_state)
+
+
+def reduce_landmark(embeddings, n_components=3, random_state=42):
+    """t-SNE on a sample of landmarks, with the rest placed by kNN interpolation.
+
+    Landmarks and neighbours are found after PCA pre-reduction; each
+    non-landmark position gets the inverse-distance weighted mean of the
+    t-SNE coordinates of its nearest landmarks.
+    """
+    n_rows = len(embeddings)
+    if n_rows <= LANDMARK_ROWS:
+        return reduce_pca_tsne(embeddings, n_components, random_state)
+
+    reduced = _pca(embeddings, PCA_COMPONENTS, random_state)
+    rng = np.random.default_rng(random_state)
+    landmarks = np.sort(rng.choice(n_rows, size=LANDMARK_ROWS, replace=False))
+    landmark_coords = _tsne(n_components, LANDMARK_ROWS, random_state).fit_transform(reduced[landmarks])
+
+    others = np.setdiff1d(np.arange(n_rows), landmarks)
+    distances, neighbors = NearestNeighbors(n_neighbors=LANDMARK_NEIGHBORS).fit(reduced[landmarks]).kneighbors(reduced[others])
+    weights = 1.0 / np.maximum(distances, 1e-12)
+    weights /= weights.sum(axis=1, keepdims=True)
+
+    coords = np.empty((n_rows, n_components), dtype=landmark_coords.dtype)
+    coords[landmarks] = landmark_coords
+    coords[others] = np.einsum("ij,ijk->ik", weights, landmark_coords[neighbors])
+    return coords
+
+
+BACKENDS = {
+    "tsne": reduce_tsne,
+    "pca_tsne": reduce_pca_tsne,
+    "barnes_hut": reduce_barnes_hut,
+    "pca": reduce_pca,
+    "landmark": reduce_landmark,
+}
+
+
+def resolve_method(method, n_rows):
+    """Return the backend name 'auto' stands for with n_rows positions."""
+    if method == "auto":
+        return "landmark" if n_rows > AUTO_LANDMARK_ROWS else "tsne"
+    if method not in BACKENDS:
+        raise ValueError(f"Unknown reduction method '{method}'; choose from auto, {', '.join(METHODS)}")
+    return method
+
+
+def reduce_embeddings(embeddings, n_components=3, method="tsne", random_state=42):
+    """Reduce embeddings with a backend and time it.
+
+    Args:
+        embeddings: (n, dims) array-like, e.g. an EmbeddingStore; float32
+            input is used without copying
+        n_components: Output dimensions
+        method: 'auto' or one of METHODS
+        random_state: Seed for every random step
+
+    Returns:
+        Tuple of ((n, n_components) array, backend used, seconds taken)
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    method = resolve_method(method, len(embeddings))
+    start = time.perf_counter()
+    reduced = BACKENDS[method](embeddings, n_components, random_state)
+    return reduced, method, time.perf_counter() - start
+
+
+def compare_reductions(embeddings, methods=METHODS, n_components=3, random_state=42, quality_rows=QUALITY_ROWS):
+    """Run several backends on the same embeddings and compare them.
+
+    Quality is scikit-learn's trustworthiness (1.0 when every point's nearest
+    neighbours in the reduction are also near it in the embeddings),
+    computed on the same random subset of at most quality_rows positions.
+
+    Returns:
+        List of dicts with 'method', 'seconds' and 'trustworthiness'
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    rng = np.random.default_rng(random_state)
+    subset = np.sort(rng.choice(len(embeddings), size=min(quality_rows, len(embeddings)), replace=False))
+    neighbors = min(5, (len(subset) - 1) // 2)
+
+    results = []
+    for method in methods:
+        reduced, used, seconds = reduce_embeddings(embeddings, n_components, method, random_state)
+        results.append({
+            'method': used,
+            'seconds': seconds,
+            'trustworthiness': float(trustworthiness(embeddings[subset], reduced[subset], n_neighbors=neighbors)),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time dimensionality-reduction backends on saved embeddings.")
+    parser.add_argument("embeddings", help=".npy file of embeddings, e.g. from outputs/embedding_store/")
+    parser.add_argument("--methods", nargs="+", default=list(METHODS), choices=METHODS)
+    parser.add_argument("--components", type=int, default=3)
+    args = parser.parse_args()
+
+    vectors = np.load(args.embeddings, mmap_mode="r")
+    print(f"{len(vectors)} embeddings with {vectors.shape[1]} dimensions")
+    for result in compare_reductions(vectors, args.methods, args.components):
+        print(f"  {result['method']:<11} {result['seconds']:8.2f}s  trustworthiness {result['trustworthiness']:.3f}")
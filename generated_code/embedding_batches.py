@@ -0,0 +1,108 @@
+"""Size-aware, concurrent embedding requests.
+
+Sending every text in one embeddings request fails once a dataset exceeds
+the API's per-request limits, and leaves the client idle while it waits.
+Texts are split into consecutive chunks bounded by item count and
+estimated tokens, the chunks are sent from a small thread pool, and the
+vectors are put back in the original order. A failing chunk is retried on
+its own with exponential backoff, without resending the others.
+"""
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Upper bounds per embeddings request, kept below mistral-embed's limits
+MAX_REQUEST_ITEMS = 128
+MAX_REQUEST_TOKENS = 16000
+
+# Requests in flight at once
+MAX_CONCURRENT_REQUESTS = 4
+
+# Retries per chunk, waiting RETRY_BACKOFF * 2**attempt seconds between tries
+MAX_RETRIES = 3
+RETRY_BACKOFF = 1.0
+
+# Average characters per token (same estimate as pipeline/tokens.py)
+CHARS_PER_TOKEN = 4
+
+
+# Deliberately a copy of pipeline.tokens.estimate_tokens: generated_code runs
+# on its own, next to analysis.py, without the pipeline package on the path.
+# Unlike that one it counts every text as at least one token, since each
+# text takes a slot in the request even when empty
+def estimate_tokens(text):
+    """Estimate the number of tokens in a text without calling a tokenizer."""
+    return max(1, math.ceil(len(str(text)) / CHARS_PER_TOKEN))
+
+
+def chunk_ranges(texts, max_items=MAX_REQUEST_ITEMS, max_tokens=MAX_REQUEST_TOKENS):
+    """Split texts into consecutive chunks within the item and token limits.
+
+    A text that is over the token limit on its own gets a chunk to itself.
+
+    Returns:
+        List of (start, end) index ranges covering all texts in order
+    """
+    ranges = []
+    start = 0
+    tokens = 0
+    for i, text in enumerate(texts):
+        text_tokens = estimate_tokens(text)
+        if i > start and (i - start >= max_items or tokens + text_tokens > max_tokens):
+            ranges.append((start, i))
+            start, tokens = i, 0
+        tokens += text_tokens
+    if start < len(texts):
+        ranges.append((start, len(texts)))
+    return ranges
+
+
+def _embed_chunk(embed_request, texts, retries, backoff):
+    """Embed one chunk, retrying it with exponential backoff."""
+    for attempt in range(retries + 1):
+        try:
+            vectors = embed_request(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+            return vectors
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+def embed_in_chunks(texts, embed_request, max_items=MAX_REQUEST_ITEMS, max_tokens=MAX_REQUEST_TOKENS,
+                    max_concurrency=MAX_CONCURRENT_REQUESTS, retries=MAX_RETRIES, backoff=RETRY_BACKOFF):
+    """Embed texts in size-limited chunks sent concurrently.
+
+    Args:
+        texts: List of texts
+        embed_request: Function embedding a list of texts in one API request
+        max_items: Maximum texts per request
+        max_tokens: Maximum estimated tokens per request
+        max_concurrency: Maximum requests in flight
+        retries: Retries per chunk before giving up
+        backoff: Seconds before the first retry, doubled on each retry
+
+    Returns:
+        List with one embedding per text, in the order of ``texts``
+
+    Raises:
+        RuntimeError: If a chunk still fails after its retries
+    """
+    texts = list(texts)
+    ranges = chunk_ranges(texts, max_items, max_tokens)
+    embeddings = [None] * len(texts)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(ranges)))) as executor:
+        futures = {
+            executor.submit(_embed_chunk, embed_request, texts[start:end], retries, backoff): (start, end)
+            for start, end in ranges
+        }
+        for future, (start, end) in futures.items():
+            try:
+                embeddings[start:end] = future.result()
+            except Exception as e:
+                for other in futures:
+                    other.cancel()
+                raise RuntimeError(f"Embedding texts {start}-{end - 1} failed after {retries} retries: {e}") from e
+    return embeddings
@@ -0,0 +1,133 @@
+"""Persistent cache of text embeddings.
+
+Position texts barely change between runs, yet ``main.py``, ``test.py`` and
+the representative sampler embed them again every time. Embeddings are
+stored in SQLite as float32 blobs keyed by model and a hash of the
+whitespace-normalized text, so only texts that were never embedded with a
+model reach the API, and each distinct text is sent once however often it
+repeats. The database uses WAL mode so parallel runs can share it.
+"""
+import hashlib
+import os
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+
+EMBEDDING_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "outputs", "embedding_cache.db")
+
+# Seconds a writer waits for another run's transaction to finish
+BUSY_TIMEOUT = 30
+
+# Keys per SELECT ... IN (...) query, below SQLite's bound-parameter limit
+LOOKUP_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    dims INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    PRIMARY KEY (model, text_hash)
+);
+"""
+
+
+def text_key(text):
+    """Return the cache key of a text: a hash of its whitespace-normalized form."""
+    return hashlib.sha256(" ".join(str(text).split()).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Embeddings of texts by model, shared by all runs.
+
+    Args:
+        db_path: Path of the SQLite database file
+    """
+
+    def __init__(self, db_path=EMBEDDING_CACHE_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT * 1000}")
+        return conn
+
+    def get_many(self, model, keys):
+        """Return a dict of key -> float32 vector for the keys that are cached."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with closing(self._connect()) as conn:
+            for start in range(0, len(keys), LOOKUP_BATCH):
+                batch = keys[start:start + LOOKUP_BATCH]
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? "
+                    f"AND text_hash IN ({','.join('?' * len(batch))})",
+                    (model, *batch),
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model, items):
+        """Store (key, vector) pairs for a model, replacing existing ones."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for key, vector in items:
+                vector = np.asarray(vector, dtype=np.float32)
+                conn.execute(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, dims, vector) VALUES (?, ?, ?, ?)",
+                    (model, key, vector.shape[0], vector.tobytes()),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def count(self, model=None):
+        """Return the number of cached embeddings, optionally for one model."""
+        with closing(self._connect()) as conn:
+            if model is None:
+                return conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM embeddings WHERE model = ?", (model,)).fetchone()[0]
+
+
+def cached_embeddings(texts, embed, model, cache=None):
+    """Embed texts, calling ``embed`` only for distinct texts not yet cached.
+
+    Args:
+        texts: List of texts
+        embed: Function mapping a list of texts to a list of vectors
+        model: Name of the embedding model, part of the cache key
+        cache: EmbeddingCache to use (defaults to the shared one)
+
+    Returns:
+        float32 array with one embedding row per text, in order
+    """
+    cache = cache or EmbeddingCache()
+    keys = [text_key(text) for text in texts]
+    found = cache.get_many(model, keys)
+
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in found and key not in missing:
+            missing[key] = text
+    if missing:
+        vectors = embed(list(missing.values()))
+        if len(vectors) != len(missing):
+            raise ValueError(f"Expected {len(missing)} embeddings, got {len(vectors)}")
+        new = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(missing, vectors)}
+        cache.put_many(model, new.items())
+        found.update(new)
+
+    if not keys:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.stack([found[key] for key in keys])
@@ -0,0 +1,123 @@
+"""Memory-mapped float32 store of embeddings with a position_id index.
+
+Embeddings used to travel as Python lists of lists and were converted to
+float64 arrays again in every analysis step; for 1024-dimensional vectors
+over a large consultation that is gigabytes of transient copies. A store
+keeps one float32 ``.npy`` file per set of texts, written block by block and
+opened with ``mmap_mode='r'``, plus a JSON list of position ids mapping
+each id to its row. ``np.asarray(store, dtype=np.float32)`` is the
+memory-mapped array itself, so analysis steps read it without copying.
+
+A store is named after the model, ids and texts it holds, so asking for the
+same embeddings again reopens the file instead of rebuilding it.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+EMBEDDING_STORE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "outputs", "embedding_store")
+
+# Texts embedded and written to the memory-mapped file per block
+STORE_BLOCK_ROWS = 4096
+
+
+def store_name(model, ids, texts):
+    """Return the file stem of the store holding some texts' embeddings."""
+    digest = hashlib.sha256(model.encode("utf-8"))
+    for position_id, text in zip(ids, texts):
+        digest.update(f"{position_id}\x1f{' '.join(str(text).split())}\x1e".encode("utf-8"))
+    return f"{model}-{digest.hexdigest()[:16]}"
+
+
+class EmbeddingStore:
+    """Float32 embeddings in a memory-mapped array with a position_id -> row index.
+
+    Behaves as a read-only (rows, dims) array: ``np.asarray``, ``len`` and
+    slicing go straight to the memory-mapped vectors.
+
+    Args:
+        vectors: (rows, dims) float32 array, usually memory-mapped
+        ids: Position id of each row
+    """
+
+    def __init__(self, vectors, ids):
+        self.vectors = vectors
+        self.ids = [str(position_id) for position_id in ids]
+        self.index = {position_id: row for row, position_id in enumerate(self.ids)}
+
+    @classmethod
+    def open(cls, path):
+        """Open a store written by ``build`` (path without extension)."""
+        with open(path + ".ids.json", "r") as f:
+            ids = json.load(f)
+        return cls(np.load(path + ".npy", mmap_mode="r"), ids)
+
+    @classmethod
+    def build(cls, ids, texts, embed, model, directory=EMBEDDING_STORE_DIR, block_rows=STORE_BLOCK_ROWS):
+        """Embed texts into a new store, or reopen the store that already holds them.
+
+        Args:
+            ids: Position id of each text (row numbers when None)
+            texts: List of texts
+            embed: Function mapping a list of texts to a list of vectors
+            model: Name of the embedding model, part of the store's name
+            directory: Directory holding the stores
+            block_rows: Texts embedded and written per block, which bounds
+                the memory used while building
+
+        Returns:
+            EmbeddingStore with one row per text, in order
+        """
+        texts = list(texts)
+        ids = [str(i) for i in range(len(texts))] if ids is None else [str(i) for i in ids]
+        if len(ids) != len(texts):
+            raise ValueError(f"Got {len(ids)} ids for {len(texts)} texts")
+        path = os.path.join(directory, store_name(model, ids, texts))
+        if os.path.exists(path + ".npy") and os.path.exists(path + ".ids.json"):
+            return cls.open(path)
+
+        os.makedirs(directory, exist_ok=True)
+        partial = f"{path}.{os.getpid()}.partial.npy"
+        vectors = None
+        for start in range(0, len(texts), block_rows):
+            block = np.asarray(embed(texts[start:start + block_rows]), dtype=np.float32)
+            if vectors is None:
+                vectors = np.lib.format.open_memmap(partial, mode="w+", dtype=np.float32,
+                                                    shape=(len(texts), block.shape[1]))
+            vectors[start:start + len(block)] = block
+        if vectors is None:
+            return cls(np.zeros((0, 0), dtype=np.float32), ids)
+        vectors.flush()
+        del vectors
+
+        with open(path + ".ids.json", "w") as f:
+            json.dump(ids, f)
+        # The .npy appears last and atomically, so an existing one is always complete
+        os.replace(partial, path + ".npy")
+        return cls.open(path)
+
+    def __array__(self, dtype=None, copy=None):
+        if copy:
+            return np.array(self.vectors, dtype=dtype)
+        return np.asarray(self.vectors, dtype=dtype)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def __getitem__(self, key):
+        return self.vectors[key]
+
+    @property
+    def shape(self):
+        return self.vectors.shape
+
+    def row(self, position_id):
+        """Return the vector of one position as a view of the store."""
+        return self.vectors[self.index[str(position_id)]]
+
+    def rows(self, position_ids):
+        """Return the vectors of some positions, in the order given."""
+        return self.vectors[[self.index[str(position_id)] for position_id in position_ids]]
@@ -1,10 +1,39 @@
+import functools
 import os
+import re
+import time
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 from dotenv import load_dotenv
 from mistralai import Mistral
-from agents.agents import initialize_agents
+from agents.agents import initialize_agents, AGENT_STATE_PATH
+from pipeline.data_loading import load_dataframe, format_memory_report
+from pipeline.text_profile import text_columns, profile_text_columns, format_text_profile
+from pipeline.sampling import random_sample, representative_sample, format_sample_manifest
+from pipeline.learning_store import LearningStore, split_lessons
+from pipeline.lesson_index import LessonIndex
+from pipeline.prompt_store import PromptStore
+from pipeline.tokens import estimate_tokens
+from pipeline.context_guard import part, fit_to_budget
+from pipeline.results import RESULTS_INSTRUCTIONS, extract_results, render_results, strip_result_blocks
+from pipeline.projections import project_messages, project_executions, project_prompt
+from pipeline.critique_parsing import parse_critique
+from pipeline.code_extraction import find_code_blocks, merge_code_blocks
+from pipeline.structured_outputs import WhisperOutput, CritiqueOutput, schema_instructions, request_structured
+from pipeline.local_executor import run_script, DATA_PATH_ENV
+from pipeline.execution_cache import ExecutionCache, cached_run
+from pipeline.code_profiler import load_profile, format_profile, format_profile_lesson
+from pipeline.data_literals import externalize_data_literals
+from pipeline.prompts import (
+    segment,
+    build_prompt,
+    STABILITY_AGENT,
+    STABILITY_SCRIPT,
+    STABILITY_LEARNING,
+    STABILITY_DATA,
+    STABILITY_RUN,
+)
 
 load_dotenv()
 
@@ -22,26 +51,166 @@ SAMPLE_SIZE = 500  # rows
 # Random seed for reproducible sampling
 RANDOM_SEED = 42
 
+# Sampling strategy for medium datasets: 'random' or 'representative'
+# ('representative' embeds position_text and samples across clusters)
+SAMPLING_STRATEGY = 'random'
+
+# Example text entries shown alongside text profiles in summary mode
+TEXT_EXAMPLES = 5
+
+# Columns to load from the data file (None loads every column)
+DATA_COLUMNS = None
+
+# Optional dtype schema for the data file (None infers one from the first rows)
+DATA_SCHEMA = None
+
 # Learning materials directory
 LEARNING_MATERIALS_DIR = "outputs/agent_learning_materials"
 
+# Token budget for each agent's learning materials; lessons beyond it are
+# deduplicated, compacted and evicted by recency and importance
+LEARNING_TOKEN_CAP = 1500
+
+# Ask the Critique agent to summarize old lessons before evicting any
+LEARNING_SUMMARIZE = False
+
+# How learning materials reach prompts: 'store' injects each agent's capped
+# materials, 'index' retrieves only the top-k lessons relevant to the dataset
+# and stage from the SQLite full-text index, 'instructions' bakes the capped
+# materials into persisted agents' instructions (updated only when they change)
+# so per-run inputs carry only task-specific content
+LEARNING_RETRIEVAL_MODE = 'store'
+LESSON_TOP_K = 12
+
+# Hard cap on the Whisper prompt; Critique's revisions above it are
+# consolidated (by Critique if enabled, otherwise trimmed) instead of growing
+WHISPER_PROMPT_TOKEN_CAP = 2500
+WHISPER_PROMPT_CONSOLIDATE = False
+
+# Input token budget for Quant and Critique; oversized Dev output, reports
+# and prompts are collapsed, summarized (if enabled) or trimmed to fit
+CONTEXT_TOKEN_BUDGET = 96000
+CONTEXT_SUMMARIZE = False
+
+# Views of Dev's output given to downstream agents: Quant interprets results
+# so code blocks are stripped; Critique audits the code but sees the dataset
+# in Dev's prompt only as a fingerprint. Both get duplicate Dev messages
+# collapsed and each execution's stdout capped (see pipeline/projections.py)
+QUANT_PROJECTION = {
+    'strip_code': True,
+    'dedupe_messages': True,
+    'stdout_token_cap': 6000,
+}
+CRITIQUE_PROJECTION = {
+    'strip_code': False,
+    'dedupe_messages': True,
+    'stdout_token_cap': 6000,
+    'data': 'fingerprint',
+}
+
+# Ask Whisper and Critique for JSON validated against a schema (with one
+# repair retry) instead of parsing delimiters and headings out of free text
+STRUCTURED_OUTPUTS = False
+
+# Where Dev's code runs: 'remote' uses Mistral's code_interpreter; 'local'
+# has Dev write code only and runs the extracted script in a subprocess with
+# the limits below, reading the dataset from disk and saving figures to
+# outputs/runs/<timestamp>/
+DEV_EXECUTION_BACKEND = 'remote'
+LOCAL_EXECUTION_LIMITS = {
+    'timeout_seconds': 900,
+    'cpu_seconds': 900,
+    'memory_mb': 8192,
+}
+
+# Replay local executions of unchanged code on unchanged data (same library
+# versions) from outputs/execution_cache/ instead of running them again
+EXECUTION_CACHE = True
+
+# Run the script's independent top-level steps in up to this many parallel
+# worker processes, following a def-use dependency graph of its statements
+# (0 runs it as a plain script)
+LOCAL_EXECUTION_PARALLEL_CELLS = 0
+
+# Run the extracted script under cProfile and tracemalloc (locally, also with
+# the remote backend) and pass a summary of its slowest statements, hottest
+# functions and peak memory to Critique and to Dev's learning materials.
+# Profiled runs skip the execution cache and parallel cells
+PROFILE_GENERATED_CODE = False
+
+# Replace CSV datasets Dev embeds in its code as string literals with a call
+# to generated_code/data_loader.py, which reads a cached copy of the data
+EXTERNALIZE_DATA_LITERALS = True
+
+# Static instructions that open every Dev prompt (kept identical across runs
+# so they form a cacheable prefix); only remote Dev runs its own code
+DEV_EXECUTION_INSTRUCTIONS = {
+    'remote': "Execute the analysis code and print all key results, metrics, and findings to stdout so they can be passed to the next agent.",
+    'local': "Write analysis code that prints all key results, metrics, and findings to stdout when it runs, so they can be passed to the next agent.",
+}
+DEV_INSTRUCTIONS = f"""You will receive an existing Python script, learning materials from previous runs, the input data and a technical specification. Extend the script to implement the specification.
+
+{DEV_EXECUTION_INSTRUCTIONS[DEV_EXECUTION_BACKEND]}
+
+CRITICAL: In your response, include ALL Python code you write wrapped in markdown code blocks using ```python syntax. This allows the code to be extracted and saved for local execution. Include both the imports and the full implementation code in code blocks.
+
+""" + RESULTS_INSTRUCTIONS
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
+def summarize_lessons(lessons):
+    """Ask the Critique agent to consolidate old lessons into a short summary."""
+    lesson_list = "\n".join(f"- {lesson}" for lesson in lessons)
+    response = client.beta.conversations.start(
+        agent_id=critique.id,
+        inputs=f"Consolidate these lessons from earlier runs into a short markdown bullet list. Merge overlapping points and keep only actionable guidance. Return only the list.\n\n{lesson_list}",
+    )
+    return "\n".join(str(output.content) for output in response.outputs if getattr(output, 'content', None))
+
+learning_store = LearningStore(
+    LEARNING_MATERIALS_DIR,
+    token_cap=LEARNING_TOKEN_CAP,
+    summarizer=summarize_lessons if LEARNING_SUMMARIZE else None,
+)
+
+os.makedirs(LEARNING_MATERIALS_DIR, exist_ok=True)
+lesson_index = LessonIndex(os.path.join(LEARNING_MATERIALS_DIR, "lessons.db"))
+
+def consolidate_prompt(prompt, token_cap):
+    """Ask the Critique agent to rewrite an oversized prompt within a token budget."""
+    response = client.beta.conversations.start(
+        agent_id=critique.id,
+        inputs=f"Rewrite the following prompt so it is at most {token_cap * 3 // 4} words. Merge repeated or overlapping instructions and keep every distinct requirement. Return only the rewritten prompt.\n\n{prompt}",
+    )
+    return "\n".join(str(output.content) for output in response.outputs if getattr(output, 'content', None))
+
+prompt_store = PromptStore(
+    "prompts/whisper_message.txt",
+    "prompts/whisper_history",
+    token_cap=WHISPER_PROMPT_TOKEN_CAP,
+    consolidator=consolidate_prompt if WHISPER_PROMPT_CONSOLIDATE else None,
+)
+
+def summarize_input(text, token_cap):
+    """Ask the Critique agent to summarize an oversized input part."""
+    response = client.beta.conversations.start(
+        agent_id=critique.id,
+        inputs=f"Summarize the following in at most {token_cap * 3 // 4} words. Keep every number, metric, error message and finding; drop repetition and boilerplate. Return only the summary.\n\n{text}",
+    )
+    return "\n".join(str(output.content) for output in response.outputs if getattr(output, 'content', None))
+
 def load_learning_materials(agent_name):
     """Load learning materials for a specific agent if they exist."""
-    materials_path = os.path.join(LEARNING_MATERIALS_DIR, f"{agent_name}_learning.md")
-    if os.path.exists(materials_path):
-        try:
-            with open(materials_path, "r") as f:
-                materials = f.read()
-            print(f"✓ Loaded learning materials for {agent_name}")
-            return materials
-        except Exception as e:
-            print(f"⚠ Warning: Could not load learning materials for {agent_name}: {e}")
-            return None
-    return None
+    try:
+        materials = learning_store.materials(agent_name)
+    except Exception as e:
+        print(f"⚠ Warning: Could not load learning materials for {agent_name}: {e}")
+        return None
+    if materials:
+        print(f"✓ Loaded learning materials for {agent_name} (~{estimate_tokens(materials)} tokens)")
+    return materials
 
 def format_learning_materials(materials):
     """Format learning materials for inclusion in a prompt."""
@@ -49,68 +218,72 @@ def format_learning_materials(materials):
         return ""
     return f"\n\n## Learning Materials from Previous Runs\n\n{materials}\n"
 
-def save_learning_materials(agent_name, new_materials):
-    """Save or append learning materials for an agent."""
-    os.makedirs(LEARNING_MATERIALS_DIR, exist_ok=True)
-    materials_path = os.path.join(LEARNING_MATERIALS_DIR, f"{agent_name}_learning.md")
-
-    # Load existing materials if they exist
-    existing_materials = ""
-    if os.path.exists(materials_path):
+def retrieve_learning_materials(agent_name, *context):
+    """Load learning materials for an agent, retrieving only the lessons
+    relevant to the dataset profile and the agent's own context in 'index'
+    mode, preferring lessons from runs in the same data mode.
+    Returns None in 'instructions' mode, where materials are already part of
+    the agents' instructions."""
+    if LEARNING_RETRIEVAL_MODE == 'instructions':
+        return None
+    if LEARNING_RETRIEVAL_MODE == 'index':
         try:
-            with open(materials_path, "r") as f:
-                existing_materials = f.read()
+            if lesson_index.count(agent_name) == 0:
+                # Seed the index from the lesson store on first use
+                state = learning_store.load(agent_name)
+                lesson_index.add(agent_name, [(lesson['section'], lesson['text']) for lesson in state['lessons']])
+            materials = lesson_index.retrieve(agent_name, dataset_profile, *context, k=LESSON_TOP_K, stage=data_info['mode'])
+            if materials:
+                print(f"✓ Retrieved top {LESSON_TOP_K} lessons for {agent_name} (~{estimate_tokens(materials)} tokens)")
+                return materials
         except Exception as e:
-            print(f"⚠ Warning: Could not load existing materials for {agent_name}: {e}")
+            print(f"⚠ Warning: Could not retrieve lessons for {agent_name}, loading stored materials: {e}")
+    return load_learning_materials(agent_name)
 
-    # Append new materials
-    if existing_materials:
-        combined_materials = f"{existing_materials}\n\n---\n\n{new_materials}"
-    else:
-        combined_materials = new_materials
-
-    # Save combined materials
-    try:
-        with open(materials_path, "w") as f:
-            f.write(combined_materials)
-        print(f"✓ Saved learning materials for {agent_name}")
-    except Exception as e:
-        print(f"⚠ Warning: Could not save learning materials for {agent_name}: {e}")
+def suggestion_section(prompt, agent_label):
+    """Return the '## <Agent> Agent Prompt Suggestions' section of the Whisper prompt, or ''."""
+    match = re.search(rf"^## {agent_label} Agent Prompt Suggestions\s*$(.*?)(?=^## |\Z)", prompt, re.M | re.S)
+    return match.group(1).strip() if match else ""
 
-def extract_python_code(text_content_list):
-    """Extract Python code blocks from markdown text and combine them.
+def whisper_task(prompt):
+    """Return the Whisper prompt without the appended per-agent suggestion sections."""
+    return re.split(r"^## \w+ Agent Prompt Suggestions\s*$", prompt, maxsplit=1, flags=re.M)[0].strip()
 
-    Args:
-        text_content_list: List of text content strings from Dev agent
+def baked_learning_materials():
+    """Collect the capped learning materials to bake into agent instructions.
 
-    Returns:
-        String containing all extracted Python code, or None if no code found
+    Whisper also gets Spec's and Quant's materials, since she writes their
+    prompts; Dev gets its own.
     """
-    import re
-
-    all_code = []
+    whisper_parts = []
+    for agent_name, heading in [
+        ("whisper", None),
+        ("spec", "Learning Materials for Spec Agent\n\nWhen designing the prompt for Spec, please incorporate these learning materials:"),
+        ("quant", "Learning Materials for Quant Agent\n\nWhen designing the prompt for Quant, please incorporate these learning materials:"),
+    ]:
+        materials = load_learning_materials(agent_name)
+        if materials:
+            whisper_parts.append(f"## {heading}\n\n{materials}" if heading else materials)
+
+    return {
+        'whisper': "\n\n".join(whisper_parts) or None,
+        'dev': load_learning_materials("dev"),
+    }
 
-    for content in text_content_list:
-        # Convert to string if needed
-        content_str = str(content) if not isinstance(content, str) else content
-
-        # Extract code blocks marked as ```python or just ```
-        # Pattern matches: ```python\n...code...\n``` or ```\n...code...\n```
-        pattern = r'```(?:python)?\n(.*?)```'
-        matches = re.findall(pattern, content_str, re.DOTALL)
-
-        for code_block in matches:
-            # Clean up the code block
-            code_block = code_block.strip()
-            if code_block:  # Only add non-empty blocks
-                all_code.append(code_block)
+def save_learning_materials(agent_name, new_materials):
+    """Merge new learning materials into an agent's bounded lesson store and index."""
+    try:
+        materials = learning_store.add(agent_name, new_materials)
+        print(f"✓ Saved learning materials for {agent_name} (~{estimate_tokens(materials)} tokens)")
+    except Exception as e:
+        print(f"⚠ Warning: Could not save learning materials for {agent_name}: {e}")
 
-    if not all_code:
-        return None
+    try:
+        lesson_index.add(agent_name, split_lessons(new_materials), stage=data_info['mode'])
+    except Exception as e:
+        print(f"⚠ Warning: Could not index learning materials for {agent_name}: {e}")
 
-    # Combine all code blocks with proper spacing
-    combined_code = "\n\n".join(all_code)
-    return combined_code
+pipeline_start = time.time()
 
 # Validate environment variables
 api_key = os.getenv("MISTRAL_API_KEY")
@@ -136,11 +309,13 @@ except Exception as e:
 
 # Load input data - pass full data, sample, or summary depending on size
 try:
-    # Load the CSV to analyze it
-    df = pd.read_csv(file_path)
+    # Load the data file (CSV, JSONL or Parquet, optionally compressed) with compact dtypes
+    df, load_report = load_dataframe(file_path, schema=DATA_SCHEMA, usecols=DATA_COLUMNS)
 
     print(f"✓ Loaded data from {file_path}")
+    print(f"  - Format: {load_report['format']}" + (f" ({load_report['compression']})" if load_report['compression'] else ""))
     print(f"  - {df.shape[0]} rows × {df.shape[1]} columns")
+    print(f"  - {format_memory_report(load_report)}")
 
     # Decide whether to pass full data, sample, or summary based on size
     full_csv = df.to_csv(index=False)
@@ -162,27 +337,25 @@ try:
             summary_parts.append(f"\nNumeric Column Statistics:")
             summary_parts.append(df.describe().to_string())
 
-        # Text column info (if position_text exists)
-        if 'position_text' in df.columns:
-            summary_parts.append(f"\nText Column ('position_text') Statistics:")
-            summary_parts.append(f"  - Non-null count: {df['position_text'].notna().sum()}")
-            summary_parts.append(f"  - Null count: {df['position_text'].isna().sum()}")
-            summary_parts.append(f"  - Avg length: {df['position_text'].str.len().mean():.1f} chars")
-            summary_parts.append(f"  - Min length: {df['position_text'].str.len().min()}")
-            summary_parts.append(f"  - Max length: {df['position_text'].str.len().max()}")
-
-            # Include a small sample of actual text
-            sample_texts = df['position_text'].dropna().head(20)
-            summary_parts.append(f"\nSample Text Entries (first 20):")
-            for idx, text in enumerate(sample_texts, 1):
+        # Text column profiles (lengths, vocabulary, n-grams, duplicates) in one pass
+        text_cols = text_columns(df)
+        if text_cols:
+            summary_parts.append(format_text_profile(profile_text_columns(df, columns=text_cols)))
+
+            # Include a few example entries from the main text column
+            example_col = 'position_text' if 'position_text' in text_cols else text_cols[0]
+            example_texts = df[example_col].dropna()
+            example_texts = example_texts.sample(n=min(TEXT_EXAMPLES, len(example_texts)), random_state=RANDOM_SEED)
+            summary_parts.append(f"\nExample '{example_col}' Entries ({len(example_texts)} random):")
+            for idx, text in enumerate(example_texts, 1):
                 # Truncate long texts
                 display_text = text[:200] + "..." if len(text) > 200 else text
                 summary_parts.append(f"{idx}. {display_text}")
 
         # Categorical columns value counts
-        categorical_cols = df.select_dtypes(include=['object', 'category']).columns
+        categorical_cols = df.select_dtypes(include=['object', 'category', 'string']).columns
         for col in categorical_cols:
-            if col != 'position_text':  # Already handled above
+            if col not in text_cols:  # Already profiled above
                 summary_parts.append(f"\nColumn '{col}' value counts:")
                 summary_parts.append(df[col].value_counts().head(20).to_string())
 
@@ -197,25 +370,39 @@ try:
         }
 
     elif len(full_csv) > FULL_DATA_THRESHOLD:  # Between 50KB and 500KB by default
-        # Use a larger random sample
+        # Use a larger sample
         sample_size = min(SAMPLE_SIZE, df.shape[0])  # Take up to configured sample size
+        sample_manifest = None
 
-        # Use random sampling instead of just head() for better representation
-        if df.shape[0] > sample_size:
-            df_sample = df.sample(n=sample_size, random_state=RANDOM_SEED)
-        else:
-            df_sample = df
+        if SAMPLING_STRATEGY == 'representative' and 'position_text' in df.columns:
+            # Embedding-cluster medoids plus per-cluster quotas
+            try:
+                df_sample, sample_manifest = representative_sample(df, sample_size, random_seed=RANDOM_SEED)
+                sample_size = len(df_sample)
+            except Exception as e:
+                print(f"⚠ Warning: Representative sampling failed, falling back to random sample: {e}")
+
+        if sample_manifest is None:
+            # Use random sampling instead of just head() for better representation
+            df_sample = random_sample(df, sample_size, random_seed=RANDOM_SEED)
 
         data_csv = df_sample.to_csv(index=False)
 
+        if sample_manifest:
+            note = f"NOTE: This is a representative sample of {sample_size} rows from {df.shape[0]} total rows, drawn across embedding clusters of 'position_text'.\n\n{format_sample_manifest(sample_manifest)}"
+        else:
+            note = f"NOTE: This is a random sample of {sample_size} rows from {df.shape[0]} total rows. The sample is representative of the full dataset."
+
         data_info = {
             'mode': 'sample',
             'sample_size': sample_size,
             'total_rows': df.shape[0],
             'csv_data': data_csv,
-            'note': f"NOTE: This is a random sample of {sample_size} rows from {df.shape[0]} total rows. The sample is representative of the full dataset."
+            'sample_manifest': sample_manifest,
+            'note': note
         }
-        print(f"  - Dataset is large ({csv_size_kb:.1f}KB), using random sample of {sample_size} rows")
+        strategy = 'representative' if sample_manifest else 'random'
+        print(f"  - Dataset is large ({csv_size_kb:.1f}KB), using {strategy} sample of {sample_size} rows")
     else:
         # Pass full dataset
         data_info = {
@@ -226,6 +413,13 @@ try:
         }
         print(f"  - Passing full dataset to Dev agent ({csv_size_kb:.1f}KB)")
 
+    # Short description of the dataset used to retrieve relevant lessons
+    dataset_profile = "\n".join([
+        " ".join(str(col) for col in df.columns),
+        data_info['note'],
+        data_info.get('data_summary', ''),
+    ])
+
 except FileNotFoundError:
     raise FileNotFoundError(f"Data file not found: {file_path}")
 except Exception as e:
@@ -233,9 +427,11 @@ except Exception as e:
 
 # Load prompt
 try:
+    # Register the prompt file with the versioned store (capping it if needed)
+    whisper_version = prompt_store.sync()
     with open("prompts/whisper_message.txt", "r") as f:
         whisper_message = f.read()
-    print("✓ Loaded whisper prompt")
+    print(f"✓ Loaded whisper prompt (v{whisper_version}, ~{estimate_tokens(whisper_message)} tokens)")
 except FileNotFoundError:
     raise FileNotFoundError("prompts/whisper_message.txt not found")
 except Exception as e:
@@ -246,7 +442,13 @@ os.makedirs("outputs", exist_ok=True)
 
 # Initialize agents
 try:
-    whisper, quant, dev, spec, critique = initialize_agents()
+    if LEARNING_RETRIEVAL_MODE == 'instructions':
+        whisper, quant, dev, spec, critique = initialize_agents(
+            learning_materials=baked_learning_materials(),
+            state_path=AGENT_STATE_PATH,
+        )
+    else:
+        whisper, quant, dev, spec, critique = initialize_agents()
     print("✓ Initialized all agents\n")
 except Exception as e:
     raise Exception(f"Error initializing agents: {e}")
@@ -258,51 +460,73 @@ print("=" * 80)
 print("CALLING WHISPER AGENT")
 print("=" * 80)
 
-# Load learning materials for Whisper and the agents she designs prompts for
-whisper_learning = load_learning_materials("whisper")
-spec_learning = load_learning_materials("spec")
-quant_learning = load_learning_materials("quant")
+# Load learning materials for Whisper and the agents she designs prompts for,
+# each retrieved against its own part of the Whisper prompt
+whisper_learning = retrieve_learning_materials("whisper", whisper_task(whisper_message))
+spec_learning = retrieve_learning_materials("spec", suggestion_section(whisper_message, "Spec"))
+quant_learning = retrieve_learning_materials("quant", suggestion_section(whisper_message, "Quant"))
 
-# Construct Whisper's prompt with learning materials
-whisper_prompt = whisper_message
-whisper_prompt += format_learning_materials(whisper_learning)
+# Construct Whisper's prompt with learning materials ahead of the message,
+# which Critique rewrites every run, so the materials form a cacheable prefix
+whisper_segments = [
+    segment("whisper_learning", format_learning_materials(whisper_learning), STABILITY_LEARNING),
+    segment("whisper_message", f"## Task\n\n{whisper_message}", STABILITY_RUN),
+]
 
 # Include learning materials for Spec and Quant so Whisper can incorporate them
 if spec_learning:
-    whisper_prompt += f"\n\n## Learning Materials for Spec Agent\n\nWhen designing the prompt for Spec, please incorporate these learning materials:\n\n{spec_learning}\n"
+    whisper_segments.append(segment("spec_learning", f"## Learning Materials for Spec Agent\n\nWhen designing the prompt for Spec, please incorporate these learning materials:\n\n{spec_learning}\n", STABILITY_LEARNING))
 
 if quant_learning:
-    whisper_prompt += f"\n\n## Learning Materials for Quant Agent\n\nWhen designing the prompt for Quant, please incorporate these learning materials:\n\n{quant_learning}\n"
-
-try:
-    whisper_response = client.beta.conversations.start(
-        agent_id=whisper.id,
-        inputs=whisper_prompt,
-    )
-    print(f"✓ Whisper responded with {len(whisper_response.outputs)} output(s)")
-except Exception as e:
-    raise Exception(f"Error calling Whisper agent: {e}")
-
-# Parse Whisper response
-try:
-    if not whisper_response.outputs:
-        raise ValueError("Whisper returned no outputs")
+    whisper_segments.append(segment("quant_learning", f"## Learning Materials for Quant Agent\n\nWhen designing the prompt for Quant, please incorporate these learning materials:\n\n{quant_learning}\n", STABILITY_LEARNING))
 
-    whisper_content = whisper_response.outputs[0].content
-    if not whisper_content:
-        raise ValueError("Whisper returned empty content")
+if STRUCTURED_OUTPUTS:
+    whisper_segments.append(segment("output_format", f"## Output Format\n\nDo not use 'PROMPT FOR SPEC' / 'PROMPT FOR QUANT' delimiters. {schema_instructions(WhisperOutput)}", STABILITY_RUN))
 
-    # Split the response to extract spec and quant messages
-    if "PROMPT FOR QUANT" not in whisper_content:
-        raise ValueError("Whisper response missing 'PROMPT FOR QUANT' delimiter")
+whisper_prompt = build_prompt("whisper", whisper_segments)
 
-    spec_message, quant_message = whisper_content.split("PROMPT FOR QUANT", 1)
+if STRUCTURED_OUTPUTS:
+    try:
+        whisper_output, _ = request_structured(client, whisper.id, whisper_prompt, WhisperOutput)
+    except Exception as e:
+        raise Exception(f"Error calling Whisper agent: {e}")
 
+    spec_message, quant_message = whisper_output.spec_prompt, whisper_output.quant_prompt
+    # Keep the delimited layout for whisper_out.md and Critique
+    whisper_content = f"PROMPT FOR SPEC\n\n{spec_message}\n\nPROMPT FOR QUANT\n\n{quant_message}"
+    print("✓ Validated Whisper JSON output")
     print(f"✓ Parsed Spec message ({len(spec_message)} chars)")
     print(f"✓ Parsed Quant message ({len(quant_message)} chars)")
+else:
+    try:
+        whisper_response = client.beta.conversations.start(
+            agent_id=whisper.id,
+            inputs=whisper_prompt,
+        )
+        print(f"✓ Whisper responded with {len(whisper_response.outputs)} output(s)")
+    except Exception as e:
+        raise Exception(f"Error calling Whisper agent: {e}")
 
-except Exception as e:
-    raise Exception(f"Error parsing Whisper response: {e}")
+    # Parse Whisper response
+    try:
+        if not whisper_response.outputs:
+            raise ValueError("Whisper returned no outputs")
+
+        whisper_content = whisper_response.outputs[0].content
+        if not whisper_content:
+            raise ValueError("Whisper returned empty content")
+
+        # Split the response to extract spec and quant messages
+        if "PROMPT FOR QUANT" not in whisper_content:
+            raise ValueError("Whisper response missing 'PROMPT FOR QUANT' delimiter")
+
+        spec_message, quant_message = whisper_content.split("PROMPT FOR QUANT", 1)
+
+        print(f"✓ Parsed Spec message ({len(spec_message)} chars)")
+        print(f"✓ Parsed Quant message ({len(quant_message)} chars)")
+
+    except Exception as e:
+        raise Exception(f"Error parsing Whisper response: {e}")
 
 # Save Whisper response to disk
 try:
@@ -322,7 +546,10 @@ print("=" * 80)
 try:
     spec_response = client.beta.conversations.start(
         agent_id=spec.id,
-        inputs=f"{spec_message}. The existing Python script to use as a starting point is: {script}",
+        inputs=build_prompt("spec", [
+            segment("script", f"The existing Python script to use as a starting point is:\n\n```python\n{script}\n```", STABILITY_SCRIPT),
+            segment("spec_message", spec_message, STABILITY_RUN),
+        ]),
     )
     print(f"✓ Spec responded with {len(spec_response.outputs)} output(s)")
 except Exception as e:
@@ -368,22 +595,51 @@ print("CALLING DEV AGENT")
 print("=" * 80)
 
 # Load learning materials for Dev
-dev_learning = load_learning_materials("dev")
+dev_learning = retrieve_learning_materials("dev", specification_text)
 
 try:
-    # Build Dev prompt based on data mode
-    if data_info['mode'] == 'summary':
-        # For very large files, pass summary statistics
-        dev_prompt = f"""
-{specification_text}
-
-## Existing Python Script to Extend and Run:
+    # Build Dev prompt from segments ordered most-stable first: instructions,
+    # script, learning materials, data, then the per-run specification
+    dev_segments = [
+        segment("instructions", DEV_INSTRUCTIONS, STABILITY_AGENT),
+        segment("script", f"## Existing Python Script to Extend and Run:\n\n```python\n{script}\n```", STABILITY_SCRIPT),
+        segment("dev_learning", format_learning_materials(dev_learning), STABILITY_LEARNING),
+    ]
+
+    if DEV_EXECUTION_BACKEND == 'local':
+        # The script runs locally against the dataset on disk, so Dev only
+        # needs its shape; non-CSV inputs are written out as a plain CSV once
+        run_output_dir = os.path.join("outputs", "runs", time.strftime("%Y%m%d-%H%M%S"))
+        os.makedirs(run_output_dir, exist_ok=True)
+        local_data_path = file_path
+        if load_report['format'] != 'csv' or load_report['compression']:
+            local_data_path = os.path.join(run_output_dir, "input_data.csv")
+            df.to_csv(local_data_path, index=False)
+
+        dev_segments.append(segment("data", f"""## Input Data:
+
+The dataset has {df.shape[0]} rows and {df.shape[1]} columns.
+
+Column types:
+{df.dtypes.to_string()}
+
+First rows:
+```csv
+{df.head(5).to_csv(index=False)}```
 
+IMPORTANT: Do not run the code with code_interpreter. Your code will be executed locally after you reply.
+Load the full dataset from the path in the {DATA_PATH_ENV} environment variable:
 ```python
-{script}
-```
+import os
+import pandas as pd
 
-## Input Data Summary:
+df = pd.read_csv(os.environ["{DATA_PATH_ENV}"])
+```
+Save figures with relative paths (e.g. plt.savefig("cluster-map.png")); they are collected from the working directory.
+""", STABILITY_DATA))
+    elif data_info['mode'] == 'summary':
+        # For very large files, pass summary statistics
+        dev_segments.append(segment("data", f"""## Input Data Summary:
 
 {data_info['note']}
 
@@ -395,23 +651,10 @@ Since the dataset is too large to pass directly, use the summary statistics abov
 2. Design appropriate analyses and visualizations
 3. Generate synthetic or representative data if needed for demonstration purposes
 4. Focus on statistical insights that can be derived from the summary
-
-Execute the analysis and print all key results, metrics, and findings to stdout so they can be passed to the next agent.
-
-CRITICAL: In your response, include ALL Python code you write wrapped in markdown code blocks using ```python syntax. This allows the code to be extracted and saved for local execution. Include both the imports and the full implementation code in code blocks.
-"""
+""", STABILITY_DATA))
     else:
         # For full or sample data, embed CSV
-        dev_prompt = f"""
-{specification_text}
-
-## Existing Python Script to Extend and Run:
-
-```python
-{script}
-```
-
-## Input CSV Data:
+        dev_segments.append(segment("data", f"""## Input CSV Data:
 
 {data_info['note']}
 
@@ -430,18 +673,16 @@ csv_data = '''
 
 df = pd.read_csv(StringIO(csv_data))
 ```
+""", STABILITY_DATA))
 
-Execute the analysis code and print all key results, metrics, and findings to stdout so they can be passed to the next agent.
-
-CRITICAL: In your response, include ALL Python code you write wrapped in markdown code blocks using ```python syntax. This allows the code to be extracted and saved for local execution. Include both the imports and the full implementation code in code blocks.
-"""
-
-    # Append learning materials to Dev prompt
-    dev_prompt += format_learning_materials(dev_learning)
+    dev_segments.append(segment("specification", f"## Technical Specification to Implement:\n\n{specification_text}", STABILITY_RUN))
+    dev_prompt = build_prompt("dev", dev_segments)
 
     dev_response = client.beta.conversations.start(
         agent_id=dev.id,
         inputs=dev_prompt,
+        # Code-only stage when executing locally: no remote code_interpreter runs
+        completion_args={'tool_choice': 'none'} if DEV_EXECUTION_BACKEND == 'local' else None,
     )
     print(f"✓ Dev responded with {len(dev_response.outputs)} output(s)")
 except Exception as e:
@@ -489,6 +730,99 @@ if not dev_text_content and not dev_code_executions:
 print(f"\n✓ Collected {len(dev_text_content)} text message(s)")
 print(f"✓ Collected {len(dev_code_executions)} code execution(s)")
 
+# Extract and save Python code from Dev's output
+python_code = None
+code_file_path = "generated_code/analysis.py"
+try:
+    python_code, merge_stats = merge_code_blocks(find_code_blocks(dev_text_content))
+    if merge_stats['blocks']:
+        print(f"✓ Merged {merge_stats['blocks']} code block(s): {merge_stats['imports']} unique import(s), "
+              f"{merge_stats['duplicates']} duplicate(s) and {merge_stats['superseded']} superseded definition(s) dropped")
+    if merge_stats['rejected']:
+        print(f"⚠ Warning: Skipped {merge_stats['rejected']} code block(s) that are not valid Python")
+
+    if python_code:
+        # Create generated_code directory if it doesn't exist
+        os.makedirs("generated_code", exist_ok=True)
+
+        if EXTERNALIZE_DATA_LITERALS:
+            try:
+                python_code, moved_data = externalize_data_literals(python_code, file_path)
+                for entry in moved_data:
+                    print(f"✓ Moved embedded dataset '{entry['name']}' ({entry['rows']} rows) "
+                          f"to the data cache as {entry['cache']}")
+            except Exception as e:
+                print(f"⚠ Warning: Could not move embedded data out of the code: {e}")
+
+        # Save the extracted code to analysis.py
+        with open(code_file_path, "w") as f:
+            # Add a header comment
+            f.write("#!/usr/bin/env python3\n")
+            f.write('"""\n')
+            f.write("Analysis code generated by Dev agent.\n")
+            f.write("This file can be executed locally to generate visualizations.\n")
+            f.write('"""\n\n')
+            f.write(python_code)
+
+        print(f"✓ Saved extracted Python code to {code_file_path}")
+        print(f"  You can run this code with: python {code_file_path}\n")
+    else:
+        print("⚠ Warning: No Python code blocks found in Dev's output\n")
+except Exception as e:
+    print(f"⚠ Warning: Could not extract and save Python code: {e}\n")
+
+# Run the extracted script locally in place of the remote code_interpreter
+if DEV_EXECUTION_BACKEND == 'local':
+    if python_code:
+        print(f"Running {code_file_path} locally in {run_output_dir}...")
+        if PROFILE_GENERATED_CODE:
+            runner = functools.partial(run_script, profile_path=os.path.join(run_output_dir, "profile.json"))
+        else:
+            runner = functools.partial(run_script, parallel_cells=LOCAL_EXECUTION_PARALLEL_CELLS)
+        if EXECUTION_CACHE and not PROFILE_GENERATED_CODE:
+            local_execution = cached_run(ExecutionCache(), code_file_path, local_data_path, run_output_dir,
+                                         limits=LOCAL_EXECUTION_LIMITS, runner=runner)
+        else:
+            local_execution = runner(code_file_path, local_data_path, run_output_dir, limits=LOCAL_EXECUTION_LIMITS)
+        dev_code_executions.append({key: local_execution[key] for key in ('stdout', 'stderr', 'result')})
+        if local_execution.get('cached'):
+            print(f"✓ Replayed cached execution ({len(local_execution['artifacts'])} artifact(s)); "
+                  f"the original run took {local_execution['duration_seconds']:.1f}s")
+        else:
+            print(f"✓ Local execution finished in {local_execution['duration_seconds']:.1f}s "
+                  f"(exit code {local_execution['returncode']}, {len(local_execution['artifacts'])} artifact(s))")
+        if local_execution['result']:
+            print(f"⚠ Warning: {local_execution['result']}")
+        for artifact in local_execution['artifacts']:
+            print(f"  - {artifact}")
+        print()
+    else:
+        print("⚠ Warning: No code to run locally\n")
+
+# Profile the extracted script so Critique and Dev see where its time and memory go
+code_profile = None
+if PROFILE_GENERATED_CODE and python_code:
+    if DEV_EXECUTION_BACKEND == 'local':
+        profile_path = os.path.join(run_output_dir, "profile.json")
+    else:
+        profile_dir = os.path.join("outputs", "runs", time.strftime("%Y%m%d-%H%M%S"))
+        profile_path = os.path.join(profile_dir, "profile.json")
+        print(f"Profiling {code_file_path} locally in {profile_dir}...")
+        run_script(code_file_path, file_path, profile_dir, limits=LOCAL_EXECUTION_LIMITS, profile_path=profile_path)
+    try:
+        code_profile = load_profile(profile_path)
+    except Exception as e:
+        print(f"⚠ Warning: Could not load the code profile: {e}")
+    if code_profile:
+        print(f"✓ Profiled generated code: {code_profile['total_seconds']:.1f}s, "
+              f"peak traced memory {code_profile['peak_memory_mb']:.0f} MB ({profile_path})")
+        with open("outputs/code_profile.md", "w") as f:
+            f.write("# Generated Code Profile\n\n" + format_profile(code_profile) + "\n")
+        save_learning_materials("dev", format_profile_lesson(code_profile))
+        print()
+    else:
+        print("⚠ Warning: No profile was written for the generated code\n")
+
 # Save Dev output to file
 try:
     with open("outputs/dev.md", "w") as f:
@@ -524,31 +858,23 @@ try:
 except Exception as e:
     print(f"⚠ Warning: Could not save dev.md: {e}\n")
 
-# Extract and save Python code from Dev's output
-try:
-    python_code = extract_python_code(dev_text_content)
+# Extract the structured results block(s) Dev's code printed
+dev_results, result_errors = extract_results(exec_result['stdout'] for exec_result in dev_code_executions)
+for error in result_errors:
+    print(f"⚠ Warning: {error}")
 
-    if python_code:
-        # Create generated_code directory if it doesn't exist
-        os.makedirs("generated_code", exist_ok=True)
-
-        # Save the extracted code to analysis.py
-        code_file_path = "generated_code/analysis.py"
-        with open(code_file_path, "w") as f:
-            # Add a header comment
-            f.write("#!/usr/bin/env python3\n")
-            f.write('"""\n')
-            f.write("Analysis code generated by Dev agent.\n")
-            f.write("This file can be executed locally to generate visualizations.\n")
-            f.write('"""\n\n')
-            f.write(python_code)
-
-        print(f"✓ Saved extracted Python code to {code_file_path}")
-        print(f"  You can run this code with: python {code_file_path}\n")
-    else:
-        print("⚠ Warning: No Python code blocks found in Dev's output\n")
-except Exception as e:
-    print(f"⚠ Warning: Could not extract and save Python code: {e}\n")
+if dev_results and not dev_results.is_empty():
+    print(f"✓ Extracted structured results: {len(dev_results.metrics)} metric(s), {len(dev_results.tables)} table(s), "
+          f"{len(dev_results.figures)} figure(s), {len(dev_results.findings)} finding(s)")
+    try:
+        with open("outputs/dev_results.json", "w") as f:
+            f.write(dev_results.model_dump_json(indent=2))
+        print("✓ Saved dev_results.json\n")
+    except Exception as e:
+        print(f"⚠ Warning: Could not save dev_results.json: {e}\n")
+else:
+    dev_results = None
+    print("⚠ Warning: No valid structured results block found; Quant will receive raw stdout\n")
 
 # ============================================================================
 # QUANT AGENT - Data Analysis & Reporting
@@ -557,38 +883,50 @@ print("=" * 80)
 print("CALLING QUANT AGENT")
 print("=" * 80)
 
-# Prepare data for Quant agent - combine all text and execution results
+# Prepare data for Quant agent - combine Quant's view of Dev's messages and
+# execution results. Headings and the quant message are kept whole; Dev
+# output may be shrunk to fit the context budget
+quant_messages = project_messages(dev_text_content, QUANT_PROJECTION)
+quant_executions = project_executions(dev_code_executions, QUANT_PROJECTION)
 quant_input_parts = []
 
 # Add quant message
-quant_input_parts.append(str(quant_message))
-quant_input_parts.append("\n## Dev Agent Analysis Results\n")
-
-if dev_text_content:
-    quant_input_parts.append("\n### Dev Messages\n")
-    # Ensure each item is a string
-    for content in dev_text_content:
-        quant_input_parts.append(str(content))
-
-if dev_code_executions:
-    quant_input_parts.append("\n## Code Execution Output\n")
-    for idx, exec_result in enumerate(dev_code_executions, 1):
-        quant_input_parts.append(f"\n### Execution {idx}\n")
+quant_input_parts.append(part("quant_message", quant_message, shrinkable=False))
+quant_input_parts.append(part("results_heading", "\n## Dev Agent Analysis Results\n", shrinkable=False))
+
+if quant_messages:
+    quant_input_parts.append(part("messages_heading", "\n### Dev Messages\n", shrinkable=False))
+    for idx, content in enumerate(quant_messages, 1):
+        quant_input_parts.append(part(f"dev_message_{idx}", content))
+
+if dev_results:
+    # Structured results replace the raw stdout; errors are still passed on
+    quant_input_parts.append(part("structured_results_heading", "\n## Structured Results\n", shrinkable=False))
+    quant_input_parts.append(part("structured_results", render_results(dev_results)))
+    for idx, exec_result in enumerate(quant_executions, 1):
+        if exec_result['stderr']:
+            quant_input_parts.append(part(f"execution_{idx}_stderr", f"\n**stderr (execution {idx}):**\n```\n{str(exec_result['stderr'])}\n```\n"))
+elif quant_executions:
+    quant_input_parts.append(part("executions_heading", "\n## Code Execution Output\n", shrinkable=False))
+    for idx, exec_result in enumerate(quant_executions, 1):
+        quant_input_parts.append(part(f"execution_{idx}_heading", f"\n### Execution {idx}\n", shrinkable=False))
         if exec_result['stdout']:
-            quant_input_parts.append(f"\n**stdout:**\n```\n{str(exec_result['stdout'])}\n```\n")
+            quant_input_parts.append(part(f"execution_{idx}_stdout", f"\n**stdout:**\n```\n{str(exec_result['stdout'])}\n```\n"))
         if exec_result['stderr']:
-            quant_input_parts.append(f"\n**stderr:**\n```\n{str(exec_result['stderr'])}\n```\n")
+            quant_input_parts.append(part(f"execution_{idx}_stderr", f"\n**stderr:**\n```\n{str(exec_result['stderr'])}\n```\n"))
         if exec_result['result']:
             # Convert result to string (handles lists, dicts, etc.)
-            result_str = str(exec_result['result'])
-            quant_input_parts.append(f"\n**result:** {result_str}\n")
+            quant_input_parts.append(part(f"execution_{idx}_result", f"\n**result:** {exec_result['result']}\n"))
 else:
-    quant_input_parts.append("\n⚠ Note: No code execution results available from Dev agent.\n")
+    quant_input_parts.append(part("no_executions", "\n⚠ Note: No code execution results available from Dev agent.\n", shrinkable=False))
 
-# Ensure all parts are strings before joining
-quant_input_parts = [str(part) for part in quant_input_parts]
-quant_input_data = "\n".join(quant_input_parts)
-print(f"Prepared Quant input ({len(quant_input_data)} chars)")
+quant_input_data, _ = fit_to_budget(
+    quant_input_parts,
+    token_budget=CONTEXT_TOKEN_BUDGET,
+    summarizer=summarize_input if CONTEXT_SUMMARIZE else None,
+    label="quant",
+)
+print(f"Prepared Quant input ({len(quant_input_data)} chars, ~{estimate_tokens(quant_input_data)} tokens)")
 
 # Call Quant agent
 try:
@@ -638,61 +976,74 @@ print("=" * 80)
 print("CALLING CRITIQUE AGENT")
 print("=" * 80)
 
-# Prepare comprehensive input for Critique agent
-critique_input = f"""
+# Prepare comprehensive input for Critique agent from its view of Dev's
+# prompt and output. Instructions, headings and the response format are kept
+# whole; prompts and outputs may be shrunk to fit the context budget
+critique_dev_prompt = project_prompt(
+    dev_segments,
+    CRITIQUE_PROJECTION,
+    description=f"{data_info['mode']} mode, dataset of {df.shape[0]} rows x {df.shape[1]} columns",
+)
+critique_messages = project_messages(dev_text_content, CRITIQUE_PROJECTION)
+# With valid structured results, Critique reads them rendered once below
+# instead of as raw JSON inside each stdout
+critique_executions = project_executions(
+    [{**exec_result, 'stdout': strip_result_blocks(str(exec_result['stdout'] or ""))} for exec_result in dev_code_executions]
+    if dev_results else dev_code_executions,
+    CRITIQUE_PROJECTION,
+)
+critique_parts = [
+    part("intro", """
 You are being provided with the prompts and outputs from a 4-agent pipeline. Your task is to audit the quality of work and provide learning materials and updated prompts for each agent.
 
 ## WHISPER AGENT
 
 ### Prompt Provided to Whisper:
-{whisper_message}
-
-### Whisper's Output:
-{whisper_content}
-
-## SPEC AGENT
-
-### Prompt Provided to Spec (designed by Whisper):
-{spec_message}
-
-### Spec's Output:
-{specification_text}
-
-## DEV AGENT
-
-### Prompt Provided to Dev:
-{dev_prompt}
-
-### Dev's Output:
-
-#### Dev Messages:
-{chr(10).join(str(content) for content in dev_text_content) if dev_text_content else "No text messages"}
-
-#### Code Execution Results:
-"""
-
-if dev_code_executions:
-    for idx, exec_result in enumerate(dev_code_executions, 1):
-        critique_input += f"\nExecution {idx}:\n"
+""", shrinkable=False),
+    part("whisper_message", whisper_message),
+    part("whisper_output_heading", "\n### Whisper's Output:\n", shrinkable=False),
+    part("whisper_content", whisper_content),
+    part("spec_heading", "\n## SPEC AGENT\n\n### Prompt Provided to Spec (designed by Whisper):\n", shrinkable=False),
+    part("spec_message", spec_message),
+    part("spec_output_heading", "\n### Spec's Output:\n", shrinkable=False),
+    part("specification", specification_text),
+    part("dev_heading", "\n## DEV AGENT\n\n### Prompt Provided to Dev:\n", shrinkable=False),
+    part("dev_prompt", critique_dev_prompt),
+    part("dev_output_heading", "\n### Dev's Output:\n\n#### Dev Messages:\n", shrinkable=False),
+    part("dev_messages", chr(10).join(critique_messages) if critique_messages else "No text messages"),
+    part("executions_heading", "\n#### Code Execution Results:\n", shrinkable=False),
+]
+
+if critique_executions:
+    for idx, exec_result in enumerate(critique_executions, 1):
+        critique_parts.append(part(f"execution_{idx}_heading", f"\nExecution {idx}:\n", shrinkable=False))
         if exec_result['stdout']:
-            critique_input += f"stdout:\n{exec_result['stdout']}\n\n"
+            critique_parts.append(part(f"execution_{idx}_stdout", f"stdout:\n{exec_result['stdout']}\n\n"))
         if exec_result['stderr']:
-            critique_input += f"stderr:\n{exec_result['stderr']}\n\n"
+            critique_parts.append(part(f"execution_{idx}_stderr", f"stderr:\n{exec_result['stderr']}\n\n"))
         if exec_result['result']:
-            critique_input += f"result: {exec_result['result']}\n\n"
+            critique_parts.append(part(f"execution_{idx}_result", f"result: {exec_result['result']}\n\n"))
 else:
-    critique_input += "No code execution results\n"
-
-critique_input += f"""
-
-## QUANT AGENT
-
-### Prompt Provided to Quant (designed by Whisper):
-{quant_message}
-
-### Quant's Output:
-{quant_report}
-
+    critique_parts.append(part("no_executions", "No code execution results\n", shrinkable=False))
+
+if dev_results:
+    critique_parts += [
+        part("structured_results_heading", "\n#### Structured Results:\n", shrinkable=False),
+        part("structured_results", render_results(dev_results) + "\n"),
+    ]
+
+if code_profile:
+    critique_parts += [
+        part("profile_heading", "\n#### Execution Profile of the Extracted Script:\n", shrinkable=False),
+        part("code_profile", format_profile(code_profile) + "\n"),
+    ]
+
+critique_parts += [
+    part("quant_heading", "\n\n## QUANT AGENT\n\n### Prompt Provided to Quant (designed by Whisper):\n", shrinkable=False),
+    part("quant_message", quant_message),
+    part("quant_output_heading", "\n### Quant's Output:\n", shrinkable=False),
+    part("quant_report", quant_report),
+    part("response_format", """
 ---
 
 Please provide your assessment in the following format:
@@ -724,27 +1075,55 @@ Please provide your assessment in the following format:
 
 ### Quant Prompt Suggestions
 [Suggestions for improving Quant's prompt - these will be provided to Whisper when she designs Quant's prompt]
-"""
+""", shrinkable=False),
+]
+
+if STRUCTURED_OUTPUTS:
+    # Replace the markdown response format with the JSON schema
+    critique_parts[-1] = part("response_format", f"""
+---
+
+Please provide your assessment as JSON. Put your overall audit in "assessment". For each agent, give learning materials in "learning_materials" and suggestions for its prompt in "prompt_suggestions". Spec and Quant suggestions will be provided to Whisper when she designs their prompts; Dev suggestions will be included in Dev's prompt construction. "updated_whisper_prompt" is the complete updated prompt for Whisper, which will overwrite prompts/whisper_message.txt.
+
+{schema_instructions(CritiqueOutput)}
+""", shrinkable=False)
+
+critique_input, _ = fit_to_budget(
+    critique_parts,
+    token_budget=CONTEXT_TOKEN_BUDGET,
+    summarizer=summarize_input if CONTEXT_SUMMARIZE else None,
+    label="critique",
+)
+print(f"Prepared Critique input ({len(critique_input)} chars, ~{estimate_tokens(critique_input)} tokens)")
 
 # Call Critique agent
+critique_response = None
+critique_output = None
 try:
-    critique_response = client.beta.conversations.start(
-        agent_id=critique.id,
-        inputs=critique_input
-    )
-    print(f"✓ Critique responded with {len(critique_response.outputs)} output(s)")
+    if STRUCTURED_OUTPUTS:
+        critique_output, _ = request_structured(client, critique.id, critique_input, CritiqueOutput)
+        print("✓ Validated Critique JSON output")
+    else:
+        critique_response = client.beta.conversations.start(
+            agent_id=critique.id,
+            inputs=critique_input
+        )
+        print(f"✓ Critique responded with {len(critique_response.outputs)} output(s)")
 except Exception as e:
     print(f"⚠ Warning: Error calling Critique agent: {e}")
-    critique_response = None
 
 # Parse Critique response if successful
-if critique_response and critique_response.outputs:
+if critique_output or (critique_response and critique_response.outputs):
     critique_content = ""
-    for output in critique_response.outputs:
-        if hasattr(output, 'content') and output.content:
-            # Ensure content is a string (handle lists or other types)
-            content_str = str(output.content) if not isinstance(output.content, str) else output.content
-            critique_content += content_str + "\n\n"
+    if critique_output:
+        # Rendered with the usual headings so critique_out.md reads the same
+        critique_content = critique_output.to_markdown()
+    else:
+        for output in critique_response.outputs:
+            if hasattr(output, 'content') and output.content:
+                # Ensure content is a string (handle lists or other types)
+                content_str = str(output.content) if not isinstance(output.content, str) else output.content
+                critique_content += content_str + "\n\n"
 
     if critique_content:
         # Save full critique output
@@ -758,132 +1137,40 @@ if critique_response and critique_response.outputs:
         # Parse and save learning materials
         print("\nExtracting learning materials...")
 
-        # Extract learning materials for each agent
-        # Try different heading formats (###, ##, **)
-        learning_patterns = [
-            ('whisper', ['## **Whisper Learning Materials**', '### Whisper Learning Materials'], ['## **Spec Learning Materials**', '### Spec Learning Materials']),
-            ('spec', ['## **Spec Learning Materials**', '### Spec Learning Materials'], ['## **Dev Learning Materials**', '### Dev Learning Materials']),
-            ('dev', ['## **Dev Learning Materials**', '### Dev Learning Materials'], ['## **Quant Learning Materials**', '### Quant Learning Materials']),
-            ('quant', ['## **Quant Learning Materials**', '### Quant Learning Materials'], ['## **UPDATED PROMPTS**', '## UPDATED PROMPTS', '### **UPDATED PROMPTS**'])
-        ]
+        # Take the validated fields, or index Critique's sections once and
+        # read each agent's materials by lookup
+        critique_sections = critique_output.sections() if critique_output else parse_critique(critique_content)
 
-        for agent_name, start_markers, end_markers in learning_patterns:
-            try:
-                # Find which marker exists
-                start_marker = None
-                start_idx = -1
-                for marker in start_markers:
-                    idx = critique_content.find(marker)
-                    if idx != -1:
-                        start_marker = marker
-                        start_idx = idx + len(marker)
-                        break
-
-                end_marker = None
-                end_idx = -1
-                for marker in end_markers:
-                    idx = critique_content.find(marker)
-                    if idx != -1 and (start_idx == -1 or idx > start_idx):
-                        end_marker = marker
-                        end_idx = idx
-                        break
-
-                if start_idx != -1 and end_idx != -1:
-                    learning_content = critique_content[start_idx:end_idx].strip()
-                    if learning_content:
-                        save_learning_materials(agent_name, learning_content)
-                else:
-                    print(f"⚠ Warning: Could not find learning materials section for {agent_name}")
-            except Exception as e:
-                print(f"⚠ Warning: Error extracting learning materials for {agent_name}: {e}")
+        for agent_name in ("whisper", "spec", "dev", "quant"):
+            learning_content = critique_sections['learning'].get(agent_name)
+            if learning_content:
+                save_learning_materials(agent_name, learning_content)
+            else:
+                print(f"⚠ Warning: Could not find learning materials section for {agent_name}")
 
         # Parse and save updated prompts
         print("\nExtracting updated prompts...")
 
-        # Extract Whisper's updated prompt
         try:
-            # Try different formats
-            whisper_prompt_markers = ['### **Updated Whisper Prompt**', '### Updated Whisper Prompt']
-            spec_suggestions_markers = ['### **Spec Prompt Suggestions**', '### Spec Prompt Suggestions']
-            dev_suggestions_markers = ['### **Dev Prompt Suggestions**', '### Dev Prompt Suggestions']
-            quant_suggestions_markers = ['### **Quant Prompt Suggestions**', '### Quant Prompt Suggestions']
-
-            # Find Whisper prompt
-            whisper_start_idx = -1
-            whisper_marker = None
-            for marker in whisper_prompt_markers:
-                idx = critique_content.find(marker)
-                if idx != -1:
-                    whisper_marker = marker
-                    whisper_start_idx = idx + len(marker)
-                    break
-
-            # Find Spec suggestions (marks end of Whisper prompt)
-            spec_start_idx = -1
-            spec_marker = None
-            for marker in spec_suggestions_markers:
-                idx = critique_content.find(marker)
-                if idx != -1 and (whisper_start_idx == -1 or idx > whisper_start_idx):
-                    spec_marker = marker
-                    spec_start_idx = idx
-                    break
-
-            if whisper_start_idx != -1 and spec_start_idx != -1:
-                updated_whisper_prompt = critique_content[whisper_start_idx:spec_start_idx].strip()
-
-                if updated_whisper_prompt:
-                    # Overwrite whisper_message.txt with new prompt
-                    with open("prompts/whisper_message.txt", "w") as f:
-                        f.write(updated_whisper_prompt)
-                    print("✓ Updated prompts/whisper_message.txt with new Whisper prompt")
-
-                    # Append Spec, Dev, Quant prompt suggestions to the whisper prompt
-                    prompt_suggestions = []
-
-                    # Extract Spec suggestions
-                    dev_start_idx = -1
-                    for marker in dev_suggestions_markers:
-                        idx = critique_content.find(marker)
-                        if idx != -1 and idx > spec_start_idx:
-                            dev_start_idx = idx
-                            break
-
-                    if spec_start_idx != -1 and dev_start_idx != -1:
-                        spec_suggestions = critique_content[spec_start_idx + len(spec_marker):dev_start_idx].strip()
-                        if spec_suggestions:
-                            prompt_suggestions.append(f"\n\n## Spec Agent Prompt Suggestions\n\nWhen designing the prompt for Spec, consider these suggestions:\n\n{spec_suggestions}")
-
-                    # Extract Dev suggestions
-                    quant_start_idx = -1
-                    quant_marker_found = None
-                    for marker in quant_suggestions_markers:
-                        idx = critique_content.find(marker)
-                        if idx != -1 and (dev_start_idx == -1 or idx > dev_start_idx):
-                            quant_start_idx = idx
-                            quant_marker_found = marker
-                            break
-
-                    if dev_start_idx != -1 and quant_start_idx != -1:
-                        dev_suggestions = critique_content[dev_start_idx + len([m for m in dev_suggestions_markers if m in critique_content][0]):quant_start_idx].strip()
-                        if dev_suggestions:
-                            prompt_suggestions.append(f"\n\n## Dev Agent Prompt Suggestions\n\nWhen constructing prompts for Dev, consider these suggestions:\n\n{dev_suggestions}")
-
-                    # Extract Quant suggestions
-                    if quant_start_idx != -1:
-                        quant_suggestions = critique_content[quant_start_idx + len(quant_marker_found):].strip()
-                        if quant_suggestions:
-                            prompt_suggestions.append(f"\n\n## Quant Agent Prompt Suggestions\n\nWhen designing the prompt for Quant, consider these suggestions:\n\n{quant_suggestions}")
-
-                    # Append all suggestions to whisper_message.txt
-                    if prompt_suggestions:
-                        with open("prompts/whisper_message.txt", "a") as f:
-                            for suggestion in prompt_suggestions:
-                                f.write(suggestion)
-                        print("✓ Appended Spec, Dev, and Quant prompt suggestions to whisper_message.txt")
-                else:
-                    print("⚠ Warning: Updated Whisper prompt was empty")
+            updated_whisper_prompt = critique_sections['whisper_prompt']
+            if updated_whisper_prompt:
+                # Combine the new Whisper prompt with Spec, Dev, Quant prompt suggestions
+                prompt_suggestions = []
+                suggestion_intros = [
+                    ("spec", "Spec Agent Prompt Suggestions", "When designing the prompt for Spec, consider these suggestions:"),
+                    ("dev", "Dev Agent Prompt Suggestions", "When constructing prompts for Dev, consider these suggestions:"),
+                    ("quant", "Quant Agent Prompt Suggestions", "When designing the prompt for Quant, consider these suggestions:"),
+                ]
+                for agent_name, heading, intro in suggestion_intros:
+                    suggestions = critique_sections['suggestions'].get(agent_name)
+                    if suggestions:
+                        prompt_suggestions.append(f"\n\n## {heading}\n\n{intro}\n\n{suggestions}")
+
+                # Store as a new capped revision; this overwrites whisper_message.txt
+                new_version = prompt_store.commit(updated_whisper_prompt + "".join(prompt_suggestions), note="critique")
+                print(f"✓ Updated prompts/whisper_message.txt with Whisper prompt v{new_version} ({len(prompt_suggestions)} suggestion section(s))")
             else:
-                print("⚠ Warning: Could not find updated prompt sections in Critique output")
+                print("⚠ Warning: Could not find updated Whisper prompt section in Critique output")
         except Exception as e:
             print(f"⚠ Warning: Error extracting and saving updated prompts: {e}")
 
@@ -896,6 +1183,11 @@ else:
 # ============================================================================
 # PIPELINE COMPLETE
 # ============================================================================
+try:
+    prompt_store.record_run(whisper_version, time.time() - pipeline_start)
+except Exception as e:
+    print(f"⚠ Warning: Could not record run for Whisper prompt v{whisper_version}: {e}")
+
 print("=" * 80)
 print("PIPELINE COMPLETED SUCCESSFULLY")
 print("=" * 80)
@@ -0,0 +1 @@
+"""Helper modules used by main.py to load data, build prompts and process agent outputs."""
@@ -0,0 +1,159 @@
+"""Extract Dev's Python code blocks and merge them into one minimal script.
+
+Dev's messages repeat snippets (the data loading code from its prompt) and
+redefine functions as it iterates, so concatenating every block gives a
+script that re-imports modules and re-does work. Each block is parsed with
+``ast`` instead: blocks that don't parse are rejected, a block identical to
+an earlier one is dropped, imports are hoisted and deduplicated, a function
+or class redefined in a later block replaces the earlier definition in
+place, and the last ``if __name__ == "__main__"`` guard wins. Other
+statements are always kept, since repeating one (a second ``plt.figure()``)
+is usually intended.
+"""
+import ast
+import re
+
+_CODE_BLOCK = re.compile(r"```[ \t]*(python|py|python3)[ \t]*\n(.*?)```", re.DOTALL | re.IGNORECASE)
+
+_MAIN_GUARD = "__main__"
+
+
+def find_code_blocks(text_content_list):
+    """Return the Python code blocks (```python, ```py or ```python3) in some messages.
+
+    Untagged fences are skipped: Dev is asked to tag its code, and untagged
+    blocks are usually printed output or data.
+    """
+    blocks = []
+    for content in text_content_list:
+        for match in _CODE_BLOCK.finditer(str(content)):
+            code = match.group(2).strip()
+            if code:
+                blocks.append(code)
+    return blocks
+
+
+def _is_main_guard(node):
+    return (
+        isinstance(node, ast.If)
+        and isinstance(node.test, ast.Compare)
+        and isinstance(node.test.left, ast.Name)
+        and node.test.left.id == "__name__"
+        and any(isinstance(c, ast.Constant) and c.value == "__main__" for c in node.test.comparators)
+    )
+
+
+def _definition_key(node):
+    """Return the name a later statement can supersede this one by, or None."""
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return node.name
+    if _is_main_guard(node):
+        return _MAIN_GUARD
+    return None
+
+
+def _import_lines(node):
+    """Split an import statement into one normalized line per imported name."""
+    if isinstance(node, ast.Import):
+        return [f"import {a.name}" + (f" as {a.asname}" if a.asname else "") for a in node.names]
+    module = "." * node.level + (node.module or "")
+    return [f"from {module} import {a.name}" + (f" as {a.asname}" if a.asname else "") for a in node.names]
+
+
+def _statements(code, tree):
+    """Yield (node, source) for each top-level statement, with leading comments."""
+    lines = code.splitlines()
+    previous_end = 0
+    for node in tree.body:
+        start = node.lineno - 1
+        if getattr(node, "decorator_list", None):
+            start = min(d.lineno for d in node.decorator_list) - 1
+        # Attach comment lines directly above the statement
+        while start > previous_end and lines[start - 1].lstrip().startswith("#"):
+            start -= 1
+        yield node, "\n".join(lines[start:node.end_lineno])
+        previous_end = node.end_lineno
+
+
+def merge_code_blocks(blocks):
+    """Merge code blocks into a single script.
+
+    Args:
+        blocks: Python source strings in the order Dev wrote them
+
+    Returns:
+        Tuple of (merged script or None if no block parsed, dict of counts:
+        blocks, rejected, duplicates (repeated blocks, imports and
+        identical definitions), superseded and imports)
+    """
+    stats = {'blocks': len(blocks), 'rejected': 0, 'duplicates': 0, 'superseded': 0, 'imports': 0}
+    future_imports = []
+    imports = []
+    seen_imports = set()
+    body = []            # [key, source, dump] in first-seen order
+    definitions = {}     # definition key -> index into body
+    seen_blocks = set()
+
+    for code in blocks:
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            stats['rejected'] += 1
+            continue
+
+        block_dump = ast.dump(tree)
+        if block_dump in seen_blocks:
+            stats['duplicates'] += 1
+            continue
+        seen_blocks.add(block_dump)
+
+        for node, source in _statements(code, tree):
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                target = future_imports if isinstance(node, ast.ImportFrom) and node.module == "__future__" else imports
+                for line in _import_lines(node):
+                    if line in seen_imports:
+                        stats['duplicates'] += 1
+                    else:
+                        seen_imports.add(line)
+                        target.append(line)
+                continue
+
+            dump = ast.dump(node)
+            key = _definition_key(node)
+            if key in definitions:
+                entry = body[definitions[key]]
+                if entry[2] == dump:
+                    stats['duplicates'] += 1
+                else:
+                    # The latest definition replaces the earlier one where it stood
+                    entry[1:] = [source, dump]
+                    stats['superseded'] += 1
+                continue
+            if key:
+                definitions[key] = len(body)
+            body.append([key, source, dump])
+
+    if not future_imports and not imports and not body:
+        return None, stats
+
+    # The __main__ guard runs last, after everything it may call is defined
+    body.sort(key=lambda entry: entry[0] == _MAIN_GUARD)
+
+    stats['imports'] = len(future_imports) + len(imports)
+    sections = ["\n".join(future_imports), "\n".join(imports)] + [entry[1] for entry in body]
+    merged = "\n\n".join(section for section in sections if section) + "\n"
+    ast.parse(merged)
+    return merged, stats
+
+
+def extract_python_code(text_content_list):
+    """Extract Python code blocks from Dev's messages and merge them.
+
+    Args:
+        text_content_list: List of text content strings from Dev agent
+
+    Returns:
+        String containing the merged script, or None if no code found
+    """
+    merged, _ = merge_code_blocks(find_code_blocks(text_content_list))
+    return merged
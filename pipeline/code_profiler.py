@@ -0,0 +1,204 @@
+"""Profile generated analysis scripts.
+
+Critique otherwise judges Dev's code only by reading it. The profiler runs
+the script statement by statement under ``cProfile`` and ``tracemalloc``
+and records the time and peak traced memory of each top-level statement,
+the script's hottest functions and the library calls that took the most
+time. A compact summary goes to Critique's input and a short lesson to
+Dev's learning materials, so slow or memory-hungry steps in generated code
+get noticed and fixed in later runs.
+
+The harness runs inside the local executor's subprocess and limits:
+``local_executor.run_script(..., profile_path=...)`` writes the profile as
+JSON next to the run's other outputs.
+
+Usage:
+    python -m pipeline.code_profiler generated_code/analysis.py --output profile.json
+"""
+import argparse
+import ast
+import builtins
+import cProfile
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+import traceback
+import types
+
+# Number of statements and functions kept in summaries
+PROFILE_TOP_N = 8
+
+_MB = 1024 * 1024
+
+
+def _source_line(code, node, width=80):
+    """Return the first line of a statement, shortened for display."""
+    line = code.splitlines()[node.lineno - 1].strip()
+    return line if len(line) <= width else line[:width - 3] + "..."
+
+
+def _function_label(key):
+    filename, line, name = key
+    if filename == "~":
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def _functions(profiler, script_path, top):
+    """Return the script's hottest functions and the slowest other calls."""
+    entries = []
+    for key, (_, calls, own, cumulative, _) in pstats.Stats(profiler).stats.items():
+        entries.append({
+            'function': _function_label(key),
+            'calls': calls,
+            'own_seconds': round(own, 4),
+            'cumulative_seconds': round(cumulative, 4),
+            'in_script': key[0] == script_path and key[2] != "<module>",
+        })
+    script = sorted((e for e in entries if e['in_script']), key=lambda e: -e['cumulative_seconds'])
+    library = sorted((e for e in entries if not e['in_script'] and e['function'] != "<module>"),
+                     key=lambda e: -e['own_seconds'])
+    return script[:top] + library[:top]
+
+
+def profile_code(code, script_path="<script>", top=PROFILE_TOP_N):
+    """Run a script as ``__main__`` and profile it.
+
+    Output and errors go to stdout and stderr as in a plain run; a failing
+    statement stops the script and is reported in the profile.
+
+    Returns:
+        Dict with 'total_seconds', 'peak_memory_mb', 'returncode',
+        'statements' (line, source, import, seconds and peak_memory_mb for
+        every top-level statement that ran) and 'functions'
+    """
+    tree = ast.parse(code)
+    module = types.ModuleType("__main__")
+    module.__file__ = script_path
+    module.__builtins__ = builtins
+    real_main = sys.modules["__main__"]
+    sys.modules["__main__"] = module
+
+    statements = []
+    returncode = 0
+    stopped = False
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        for node in tree.body:
+            compiled = compile(ast.Module(body=[node], type_ignores=[]), script_path, "exec")
+            # Imports are timed but not profiled, so import machinery doesn't crowd out the hot calls
+            is_import = isinstance(node, (ast.Import, ast.ImportFrom))
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            statement_start = time.perf_counter()
+            if not is_import:
+                profiler.enable()
+            try:
+                exec(compiled, module.__dict__)
+            except SystemExit as e:
+                returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                stopped = True
+            except BaseException as e:
+                traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+                returncode, stopped = 1, True
+            finally:
+                profiler.disable()
+            _, peak = tracemalloc.get_traced_memory()
+            statements.append({
+                'line': node.lineno,
+                'source': _source_line(code, node),
+                'import': is_import,
+                'seconds': round(time.perf_counter() - statement_start, 4),
+                'peak_memory_mb': round(max(peak - before, 0) / _MB, 2),
+            })
+            if stopped:
+                break
+    finally:
+        total = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        sys.modules["__main__"] = real_main
+
+    return {
+        'script': script_path,
+        'total_seconds': round(total, 4),
+        'peak_memory_mb': round(peak / _MB, 2),
+        'returncode': returncode,
+        'statements': statements,
+        'functions': _functions(profiler, script_path, top),
+    }
+
+
+def load_profile(path):
+    """Load a profile written by the harness, or None if there is none."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def format_profile(profile, top=PROFILE_TOP_N):
+    """Render a profile as a compact markdown summary for Critique."""
+    total = profile['total_seconds'] or 1e-9
+    lines = [
+        f"Total {profile['total_seconds']:.2f}s, peak traced memory {profile['peak_memory_mb']:.1f} MB"
+        + (f", exited with code {profile['returncode']}" if profile['returncode'] else ""),
+        "",
+        "Slowest statements:",
+    ]
+    for statement in sorted(profile['statements'], key=lambda s: -s['seconds'])[:top]:
+        lines.append(f"- line {statement['line']} `{statement['source']}`: {statement['seconds']:.2f}s "
+                     f"({statement['seconds'] / total:.0%}), peak {statement['peak_memory_mb']:.1f} MB")
+
+    script_functions = [f for f in profile['functions'] if f['in_script']]
+    if script_functions:
+        lines += ["", "Hottest script functions (cumulative time):"]
+        lines += [f"- {f['function']}: {f['cumulative_seconds']:.2f}s over {f['calls']} call(s)"
+                  for f in script_functions[:top]]
+    library = [f for f in profile['functions'] if not f['in_script']]
+    if library:
+        lines += ["", "Slowest library calls (own time):"]
+        lines += [f"- {f['function']}: {f['own_seconds']:.2f}s over {f['calls']} call(s)" for f in library[:top]]
+    return "\n".join(lines)
+
+
+def format_profile_lesson(profile, top=3):
+    """Summarize a profile as a short learning-materials section for Dev."""
+    total = profile['total_seconds'] or 1e-9
+    steps = [s for s in profile['statements'] if not s['import']]
+    slowest = sorted(steps, key=lambda s: -s['seconds'])[:top]
+    hungriest = max(steps, key=lambda s: s['peak_memory_mb'], default=None)
+    bullets = [f"- The last generated script ran in {profile['total_seconds']:.1f}s with "
+               f"{profile['peak_memory_mb']:.0f} MB peak traced memory."]
+    bullets += [f"- `{s['source']}` took {s['seconds']:.1f}s ({s['seconds'] / total:.0%} of the run); "
+                f"look for vectorized or cached alternatives." for s in slowest if s['seconds'] / total >= 0.2]
+    if hungriest and hungriest['peak_memory_mb'] >= 100:
+        bullets.append(f"- `{hungriest['source']}` peaked at {hungriest['peak_memory_mb']:.0f} MB; "
+                       f"avoid materializing large intermediates.")
+    return "### Performance Profile\n\n" + "\n".join(bullets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a script under cProfile and tracemalloc.")
+    parser.add_argument("script", help="Script to profile, e.g. generated_code/analysis.py")
+    parser.add_argument("--output", required=True, help="Where to write the profile as JSON")
+    parser.add_argument("--top", type=int, default=PROFILE_TOP_N)
+    args = parser.parse_args()
+
+    with open(args.script, "r") as f:
+        code = f.read()
+    sys.argv = [args.script]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    profile = profile_code(code, args.script, top=args.top)
+    with open(args.output, "w") as f:
+        json.dump(profile, f, indent=2)
+    sys.exit(profile['returncode'])
+
+
+if __name__ == "__main__":
+    main()
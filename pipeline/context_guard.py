@@ -0,0 +1,223 @@
+"""Pre-flight guard that keeps agent inputs within the model's context window.
+
+Inputs are built from named parts. Parts marked shrinkable (Dev stdout,
+reports, earlier prompts) are shrunk when the input is over budget, in
+order: repeated log lines are collapsed, oversized parts are optionally
+summarized chunk by chunk, and finally each is cut to its share of the
+budget keeping its head and tail. Every truncation is printed and appended
+to a JSONL log so a run degrades gracefully instead of failing at the API.
+"""
+import json
+import os
+import re
+import time
+
+from pipeline.tokens import estimate_tokens, CHARS_PER_TOKEN
+
+# Input token budget; mistral-medium has a 128k window and the rest is left
+# for the response
+CONTEXT_TOKEN_BUDGET = 96000
+
+# Tokens per chunk when summarizing an oversized part
+SUMMARY_CHUNK_TOKENS = 8000
+
+# Runs of at least this many similar lines are collapsed
+MIN_REPEATED_RUN = 3
+
+CONTEXT_LOG_PATH = "outputs/context_truncations.jsonl"
+
+_DIGITS = re.compile(r"\d+")
+# Lines that differ only in their numbers are treated as repeats only when
+# they look like progress output; other numbered lines, such as result rows,
+# carry information and are kept
+_PROGRESS = re.compile(
+    r"\d+\s*/\s*\d+|^\W*(processing|processed|epoch|batch|iteration|iter|step|loading|downloading|fitting)\b",
+    re.IGNORECASE,
+)
+_OMITTED = "\n[... {} characters omitted ...]\n"
+
+
+def part(name, text, shrinkable=True):
+    """Create a named input part; only shrinkable parts are ever cut."""
+    return {'name': name, 'text': str(text) if text is not None else "", 'shrinkable': shrinkable}
+
+
+def _repeat_key(line):
+    """Return the key under which a line counts as a repeat of its neighbours."""
+    line = line.strip()
+    return _DIGITS.sub("#", line) if _PROGRESS.search(line) else line
+
+
+def collapse_repeated_lines(text, min_run=MIN_REPEATED_RUN):
+    """Collapse runs of identical lines and of progress lines.
+
+    Progress lines such as ``Processing batch 3/200`` or ``Epoch 12 done``
+    that differ only in their numbers count as repeats, as do exact
+    duplicates. Runs are reduced to their first and last line with a count
+    of those omitted. Other lines that differ in their numbers, such as
+    ``Round 1: 0.45``, are results and are kept.
+    """
+    lines = text.splitlines()
+    kept = []
+    i = 0
+    while i < len(lines):
+        key = _repeat_key(lines[i])
+        j = i + 1
+        while j < len(lines) and _repeat_key(lines[j]) == key:
+            j += 1
+        if key and j - i >= min_run:
+            kept.extend([lines[i], f"[... {j - i - 2} similar lines omitted ...]", lines[j - 1]])
+        else:
+            kept.extend(lines[i:j])
+        i = j
+    return "\n".join(kept)
+
+
+def head_tail(text, token_cap, head_fraction=0.5):
+    """Cut text to a token budget keeping its beginning and end.
+
+    Cuts fall on line boundaries where possible and the removed middle is
+    replaced by a marker giving the number of characters omitted.
+    """
+    max_chars = token_cap * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+
+    budget = max(0, max_chars - len(_OMITTED.format(len(text))))
+    head = text[:int(budget * head_fraction)]
+    if "\n" in head[len(head) // 2:]:
+        head = head[:head.rindex("\n")]
+    tail = text[len(text) - (budget - len(head)):] if budget > len(head) else ""
+    if "\n" in tail[:len(tail) // 2]:
+        tail = tail[tail.index("\n") + 1:]
+    return head + _OMITTED.format(len(text) - len(head) - len(tail)) + tail
+
+
+def _chunks(text, chunk_tokens):
+    """Split text into chunks of about ``chunk_tokens`` on line boundaries."""
+    chunks = []
+    current = []
+    size = 0
+    for line in text.splitlines(keepends=True):
+        if current and size + len(line) > chunk_tokens * CHARS_PER_TOKEN:
+            chunks.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def summarize_hierarchically(text, token_cap, summarizer, chunk_tokens=SUMMARY_CHUNK_TOKENS):
+    """Summarize text chunk by chunk, then summarize the summaries, until it fits.
+
+    Args:
+        text: Text to shrink
+        token_cap: Target size in tokens
+        summarizer: Function taking (text, token_cap) and returning a summary
+        chunk_tokens: Size of the chunks summarized independently
+
+    Returns:
+        The summary, cut with ``head_tail`` if summarizing stops making progress
+    """
+    while estimate_tokens(text) > token_cap:
+        chunks = _chunks(text, chunk_tokens)
+        chunk_cap = max(1, token_cap // len(chunks))
+        summary = "\n\n".join(summarizer(chunk, chunk_cap).strip() for chunk in chunks)
+        if len(summary) >= len(text):
+            break
+        text = summary
+    return head_tail(text, token_cap)
+
+
+def _log(truncations, label, log_path):
+    for t in truncations:
+        print(f"⚠ Context guard ({label}): {t['part']} {t['method']} from {t['tokens_before']} to {t['tokens_after']} tokens")
+    if not log_path or not truncations:
+        return
+    try:
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        with open(log_path, "a") as f:
+            for t in truncations:
+                f.write(json.dumps({'at': time.time(), 'input': label, **t}) + "\n")
+    except Exception as e:
+        print(f"⚠ Warning: Could not write context guard log: {e}")
+
+
+def fit_to_budget(parts, token_budget=CONTEXT_TOKEN_BUDGET, summarizer=None, label="input",
+                  separator="\n", log_path=CONTEXT_LOG_PATH):
+    """Join input parts, shrinking the shrinkable ones if over the token budget.
+
+    Args:
+        parts: List of parts created with ``part``
+        token_budget: Maximum tokens for the joined input
+        summarizer: Optional function taking (text, token_cap) and returning
+            a summary; used before falling back to head/tail trimming
+        label: Name of the input, used in log messages
+        separator: String placed between parts
+        log_path: JSONL file every truncation is appended to (None to skip)
+
+    Returns:
+        Tuple of (joined text, list of truncation records)
+    """
+    texts = {p['name']: p['text'] for p in parts}
+    truncations = []
+
+    def total():
+        return estimate_tokens(separator.join(texts.values()))
+
+    def record(name, method, before):
+        truncations.append({
+            'part': name,
+            'method': method,
+            'tokens_before': before,
+            'tokens_after': estimate_tokens(texts[name]),
+        })
+
+    shrinkable = [p['name'] for p in parts if p['shrinkable']]
+
+    if total() > token_budget:
+        for name in shrinkable:
+            collapsed = collapse_repeated_lines(texts[name])
+            if len(collapsed) < len(texts[name]):
+                before = estimate_tokens(texts[name])
+                texts[name] = collapsed
+                record(name, "collapsed repeated lines", before)
+
+    if total() > token_budget:
+        # Share what fixed parts leave: small parts stay whole, large parts
+        # split the rest equally
+        fixed = estimate_tokens(separator.join(texts[p['name']] for p in parts if not p['shrinkable']))
+        remaining = max(0, token_budget - fixed - len(parts) * estimate_tokens(separator))
+        if remaining == 0:
+            print(f"⚠ Context guard ({label}): fixed parts alone exceed the {token_budget} token budget")
+
+        allowances = {}
+        pending = sorted(shrinkable, key=lambda name: estimate_tokens(texts[name]))
+        while pending:
+            share = remaining // len(pending)
+            name = pending.pop(0)
+            tokens = estimate_tokens(texts[name])
+            if tokens <= share:
+                remaining -= tokens
+            else:
+                allowances[name] = share
+                for other in pending:
+                    allowances[other] = share
+                break
+
+        for name, allowance in allowances.items():
+            before = estimate_tokens(texts[name])
+            if summarizer:
+                try:
+                    texts[name] = summarize_hierarchically(texts[name], allowance, summarizer)
+                    record(name, "summarized", before)
+                    continue
+                except Exception as e:
+                    print(f"⚠ Warning: Could not summarize {name}, trimming instead: {e}")
+            texts[name] = head_tail(texts[name], allowance)
+            record(name, "trimmed to head and tail", before)
+
+    _log(truncations, label, log_path)
+    return separator.join(texts.values()), truncations
@@ -0,0 +1,157 @@
+"""Single-pass section index for parsing Critique's output.
+
+Critique's response is split into learning materials per agent and updated
+prompt sections. Its headings vary (``## **Dev Learning Materials**``,
+``### Dev Learning Materials``, ``**Dev Learning Materials:**``), so every
+heading line is found in one regex pass and its title normalized. Sections
+are then read by lookup: a known section runs from its heading to the next
+known section heading, so sub-headings inside a section don't end it.
+
+The updated Whisper prompt often echoes the current one, which ends with
+``## Spec Agent Prompt Suggestions`` style sections of its own. So prompt
+suggestions only count under a ``###`` heading, and when a key repeats its
+last heading wins; the earlier ones don't end the section they sit in.
+Parsing is linear in the size of the critique.
+
+Usage:
+    python -m pipeline.critique_parsing --benchmark 8
+"""
+import argparse
+import re
+import time
+
+AGENTS = ("whisper", "spec", "dev", "quant")
+
+LEARNING_MATERIALS = "learning materials"
+UPDATED_PROMPTS = "updated prompts"
+UPDATED_WHISPER_PROMPT = "updated whisper prompt"
+
+# Normalized titles of every section Critique is asked to write
+SECTION_KEYS = frozenset(
+    [LEARNING_MATERIALS, UPDATED_PROMPTS, UPDATED_WHISPER_PROMPT]
+    + [f"{agent} learning materials" for agent in AGENTS]
+    + [f"{agent} prompt suggestions" for agent in AGENTS]
+)
+
+# Heading level Critique is asked to use for prompt suggestions
+SUGGESTION_LEVEL = 3
+
+# A markdown heading, or a line that is entirely bold text
+_HEADING = re.compile(r"^[ \t]*(?:(?P<hashes>#{1,6})[ \t]*(?P<hashed>[^\n]*?)|\*\*(?P<bold>[^\n]+?)\*\*:?)[ \t]*$", re.MULTILINE)
+_NUMBERING = re.compile(r"^\d+[.)]\s*")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_title(title):
+    """Normalize a heading title for lookup.
+
+    Emphasis, numbering, punctuation, case and the word 'agent' are
+    ignored, so '### **1. Dev Agent Learning Materials:**' becomes
+    'dev learning materials'.
+    """
+    title = _NUMBERING.sub("", title.strip(" \t#*_:"))
+    words = _NON_WORD.sub(" ", title.lower()).split()
+    return " ".join(word for word in words if word != "agent")
+
+
+class SectionIndex:
+    """Index of the known sections of a markdown document.
+
+    When a key has several headings the last one is used, and only the
+    headings in use end the section before them.
+
+    Args:
+        text: Markdown text to index
+        keys: Normalized titles of the sections to index
+    """
+
+    def __init__(self, text, keys=SECTION_KEYS):
+        self.text = text
+        # (key, heading start, content start) for every known heading, in order
+        self.headings = []
+        for match in _HEADING.finditer(text):
+            key = normalize_title(match.group("hashed") or match.group("bold") or "")
+            if key not in keys:
+                continue
+            if key.endswith("prompt suggestions") and len(match.group("hashes") or "") != SUGGESTION_LEVEL:
+                continue
+            self.headings.append((key, match.start(), match.end()))
+
+        # Last occurrence of each key, ending where the next one in use starts
+        last = sorted({key: i for i, (key, _, _) in enumerate(self.headings)}.values())
+        self.sections = {}
+        for n, i in enumerate(last):
+            key, _, content_start = self.headings[i]
+            end = self.headings[last[n + 1]][1] if n + 1 < len(last) else len(text)
+            self.sections[key] = (content_start, end)
+
+    def __contains__(self, key):
+        return key in self.sections
+
+    def get(self, key):
+        """Return the stripped content of a section, or None if it is missing or empty."""
+        if key not in self.sections:
+            return None
+        start, end = self.sections[key]
+        return self.text[start:end].strip() or None
+
+
+def parse_critique(text):
+    """Split Critique's output into learning materials and prompt updates.
+
+    Returns:
+        Dict with 'learning' (agent name to materials), 'whisper_prompt'
+        (the updated Whisper prompt or None) and 'suggestions' (agent name to
+        prompt suggestions). Missing or empty sections are left out.
+    """
+    index = SectionIndex(text)
+    learning = {}
+    suggestions = {}
+    for agent in AGENTS:
+        materials = index.get(f"{agent} learning materials")
+        if materials:
+            learning[agent] = materials
+        suggestion = index.get(f"{agent} prompt suggestions")
+        if suggestion:
+            suggestions[agent] = suggestion
+    return {
+        'learning': learning,
+        'whisper_prompt': index.get(UPDATED_WHISPER_PROMPT),
+        'suggestions': suggestions,
+    }
+
+
+def synthetic_critique(target_bytes):
+    """Build a critique of roughly ``target_bytes`` for benchmarking."""
+    filler = "\n".join(
+        f"- **Point {i}:** The analysis of cluster {i} should report silhouette scores and sample sizes."
+        for i in range(50)
+    ) + "\n\n#### Details\n\n" + "Narrative text about the run. " * 40 + "\n\n"
+    sections = [f"### {agent.title()} Learning Materials" for agent in AGENTS]
+    sections += ["## UPDATED PROMPTS", "### Updated Whisper Prompt"]
+    sections += [f"### **{agent.title()} Prompt Suggestions**" for agent in ("spec", "dev", "quant")]
+    repeats = max(1, target_bytes // (len(filler) * len(sections)))
+    body = filler * repeats
+    return "## LEARNING MATERIALS\n\n" + "".join(f"{heading}\n\n{body}" for heading in sections)
+
+
+def benchmark(megabytes=(1, 4, 16)):
+    """Time parse_critique on synthetic critiques of several sizes."""
+    for size in megabytes:
+        text = synthetic_critique(size * 1024 * 1024)
+        start = time.perf_counter()
+        parse_critique(text)
+        elapsed = time.perf_counter() - start
+        print(f"{len(text) / 1024 / 1024:.1f} MB: {elapsed * 1000:.1f} ms ({len(text) / 1024 / 1024 / elapsed:.0f} MB/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Critique output parsing.")
+    parser.add_argument("--benchmark", type=int, nargs="*", default=[1, 4, 16], metavar="MB",
+                        help="Sizes of synthetic critiques to parse, in megabytes")
+    args = parser.parse_args()
+    benchmark(args.benchmark)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Move datasets embedded in generated code out into a data cache.
+
+Dev often copies the CSV from its prompt into the script as a triple-quoted
+string and parses it with ``pd.read_csv(StringIO(csv_data))``. The saved
+script then grows with the dataset, is slow to parse and can't be re-run on
+updated data. Before the script is saved, each such literal is stored once
+in ``generated_code/data_cache/`` (Parquet when pyarrow is installed) and
+the read is rewritten to ``load_data("<fingerprint>")`` from
+``generated_code/data_loader.py``. Literals used in any other way, or read
+with extra ``read_csv`` options, are left as they are.
+
+Usage:
+    python -m pipeline.data_literals generated_code/analysis.py --source data.csv
+"""
+import argparse
+import ast
+import json
+import os
+import time
+from io import StringIO
+
+import pandas as pd
+
+from generated_code.data_loader import CACHE_DIR, MANIFEST_FILE, load_manifest
+from pipeline.projections import data_fingerprint
+
+LOADER_IMPORT = "from data_loader import load_data"
+
+# Smallest literal (in lines, header included) treated as an embedded dataset
+MIN_DATA_LINES = 3
+
+
+def _is_csv_literal(node):
+    """Return True for a string constant that looks like CSV with a header."""
+    if not (isinstance(node, ast.Constant) and isinstance(node.value, str)):
+        return False
+    lines = [line for line in node.value.strip().splitlines() if line.strip()]
+    return len(lines) >= MIN_DATA_LINES and "," in lines[0]
+
+
+def _called_name(node):
+    func = node.func
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    if isinstance(func, ast.Name):
+        return func.id
+    return None
+
+
+def _stringio_read(node):
+    """Return the variable read by ``read_csv(StringIO(name))``, or None."""
+    if not (isinstance(node, ast.Call) and _called_name(node) == "read_csv"):
+        return None
+    if len(node.args) != 1 or node.keywords:
+        return None
+    inner = node.args[0]
+    if not (isinstance(inner, ast.Call) and _called_name(inner) == "StringIO"):
+        return None
+    if len(inner.args) != 1 or inner.keywords or not isinstance(inner.args[0], ast.Name):
+        return None
+    return inner.args[0].id
+
+
+def find_data_literals(code):
+    """Find embedded datasets that can be replaced by the loader.
+
+    Returns:
+        List of dicts with the variable 'name', its 'assignment' node, its
+        'text' and the ``read_csv`` call nodes in 'reads'
+    """
+    tree = ast.parse(code)
+    assignments = {}
+    reads = {}
+    loads = {}
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name) and _is_csv_literal(node.value)):
+            assignments.setdefault(node.targets[0].id, []).append(node)
+        name = _stringio_read(node)
+        if name:
+            reads.setdefault(name, []).append(node)
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+            loads[node.id] = loads.get(node.id, 0) + 1
+
+    literals = []
+    for name, nodes in assignments.items():
+        # Only a variable assigned once and used nothing but as read_csv(StringIO(...)) input
+        if len(nodes) == 1 and name in reads and loads.get(name, 0) == len(reads[name]):
+            literals.append({'name': name, 'assignment': nodes[0], 'text': nodes[0].value.value,
+                             'reads': reads[name]})
+    return literals
+
+
+def cache_dataset(text, source_path=None, cache_dir=CACHE_DIR):
+    """Store CSV text in the data cache and record it in the manifest.
+
+    Returns:
+        Manifest entry, including the dataset's 'fingerprint'
+    """
+    fingerprint = data_fingerprint(text.strip())
+    df = pd.read_csv(StringIO(text))
+    os.makedirs(cache_dir, exist_ok=True)
+    try:
+        import pyarrow  # noqa: F401
+        cache_name = f"{fingerprint}.parquet"
+        df.to_parquet(os.path.join(cache_dir, cache_name), index=False)
+    except ImportError:
+        cache_name = f"{fingerprint}.csv"
+        df.to_csv(os.path.join(cache_dir, cache_name), index=False)
+
+    entry = {
+        'fingerprint': fingerprint,
+        'cache': cache_name,
+        'source': os.path.abspath(source_path) if source_path else None,
+        'rows': len(df),
+        'columns': [str(col) for col in df.columns],
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    manifest = load_manifest(cache_dir)
+    manifest[fingerprint] = entry
+    manifest_path = os.path.join(cache_dir, MANIFEST_FILE)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return entry
+
+
+def _source_lines(code):
+    """Split source into lines with their endings, numbered the way ast numbers them.
+
+    ``str.splitlines`` also breaks on characters such as U+2028 or form
+    feeds, which can appear inside string literals but don't start a new
+    line for ast.
+    """
+    lines = code.split("\n")
+    return [line + "\n" for line in lines[:-1]] + ([lines[-1]] if lines[-1] else [])
+
+
+def _offset(lines, lineno, col):
+    """Convert an ast (line, UTF-8 byte column) position to a string offset."""
+    return sum(len(line) for line in lines[:lineno - 1]) + len(lines[lineno - 1].encode("utf-8")[:col].decode("utf-8"))
+
+
+def _add_loader_import(code):
+    """Add the loader import after the script's last top-level import."""
+    if LOADER_IMPORT in code:
+        return code
+    tree = ast.parse(code)
+    imports = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    lines = _source_lines(code)
+    at = imports[-1].end_lineno if imports else 0
+    if at and not lines[at - 1].endswith("\n"):
+        lines[at - 1] += "\n"
+    lines.insert(at, LOADER_IMPORT + "\n")
+    return "".join(lines)
+
+
+def externalize_data_literals(code, source_path=None, cache_dir=CACHE_DIR):
+    """Replace embedded CSV datasets in a script with calls to the loader.
+
+    Args:
+        code: Script source
+        source_path: Dataset file the embedded data came from, recorded so
+            the loader can fall back to it
+        cache_dir: Data cache directory
+
+    Returns:
+        Tuple of (rewritten code, list of manifest entries of the moved
+        datasets with the variable 'name' they were assigned to)
+    """
+    lines = _source_lines(code)
+    edits = []
+    moved = []
+    for literal in find_data_literals(code):
+        assignment = literal['assignment']
+        prefix = lines[assignment.lineno - 1].encode("utf-8")[:assignment.col_offset]
+        if prefix.strip():
+            continue  # Shares its line with another statement
+        try:
+            entry = cache_dataset(literal['text'], source_path, cache_dir)
+        except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeError):
+            continue
+
+        # Drop the assignment's lines entirely, then point each read at the loader
+        start = _offset(lines, assignment.lineno, 0)
+        end = _offset(lines, assignment.end_lineno, 0) + len(lines[assignment.end_lineno - 1])
+        edits.append((start, end, ""))
+        for read in literal['reads']:
+            edits.append((_offset(lines, read.lineno, read.col_offset),
+                          _offset(lines, read.end_lineno, read.end_col_offset),
+                          f'load_data("{entry["fingerprint"]}")'))
+        moved.append({**entry, 'name': literal['name']})
+
+    if not moved:
+        return code, moved
+    for start, end, text in sorted(edits, reverse=True):
+        code = code[:start] + text + code[end:]
+    return _add_loader_import(code), moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move datasets embedded in a script into the data cache.")
+    parser.add_argument("script", help="Script to rewrite in place, e.g. generated_code/analysis.py")
+    parser.add_argument("--source", help="Dataset file the embedded data came from")
+    args = parser.parse_args()
+
+    with open(args.script, "r") as f:
+        code = f.read()
+    rewritten, moved = externalize_data_literals(code, args.source)
+    if not moved:
+        print(f"No embedded datasets found in {args.script}")
+        return
+    with open(args.script, "w") as f:
+        f.write(rewritten)
+    for entry in moved:
+        print(f"✓ Moved {entry['name']} ({entry['rows']} rows) to {os.path.join(CACHE_DIR, entry['cache'])}")
+    print(f"  {args.script}: {len(code) / 1024:.1f}KB → {len(rewritten) / 1024:.1f}KB")
+
+
+if __name__ == "__main__":
+    main()
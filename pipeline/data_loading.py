@@ -0,0 +1,236 @@
+"""Memory-compact loading of consultation exports into pandas DataFrames.
+
+CSV, JSONL and Parquet inputs are supported. CSV and JSONL may be gzip, bz2
+or zstd compressed; they are decompressed as a stream while parsing, so a
+decompressed copy never touches disk.
+"""
+import bz2
+import gzip
+import io
+import pandas as pd
+
+# Columns known to hold a small set of repeated values in our exports
+CATEGORICAL_COLUMNS = ['participant', 'question', 'position_type', 'strength']
+
+# Columns known to hold long free text
+TEXT_COLUMNS = ['position_text']
+
+# Object columns with a unique/non-null ratio below this become 'category'
+CATEGORY_RATIO = 0.5
+
+# Rows per chunk when loading; the schema is inferred from the first chunk
+CHUNK_ROWS = 50000
+
+# Leading bytes identifying compressed and columnar files
+MAGIC_BYTES = {
+    b'\x1f\x8b': 'gzip',
+    b'BZh': 'bz2',
+    b'\x28\xb5\x2f\xfd': 'zstd',
+}
+PARQUET_MAGIC = b'PAR1'
+
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson', '.json')
+
+
+def string_dtype():
+    """Return the most compact string dtype available.
+
+    Arrow-backed strings store text in one contiguous buffer instead of one
+    Python object per cell. pyarrow is optional; without it we fall back to
+    pandas' own string dtype.
+    """
+    try:
+        import pyarrow  # noqa: F401
+        return pd.StringDtype("pyarrow")
+    except ImportError:
+        return pd.StringDtype("python")
+
+
+def frame_memory(df):
+    """Return the deep memory usage of a DataFrame in bytes."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def infer_schema(df, categorical_ratio=CATEGORY_RATIO):
+    """Infer a compact dtype for every text-like column of a DataFrame.
+
+    Args:
+        df: DataFrame (usually a sample of the file) loaded with default dtypes
+        categorical_ratio: Unique/non-null ratio below which a column is
+            treated as categorical
+
+    Returns:
+        Dict mapping column name to dtype. Numeric columns are left out so
+        pandas keeps inferring them.
+    """
+    schema = {}
+    text_dtype = string_dtype()
+
+    for col in df.columns:
+        if col in CATEGORICAL_COLUMNS:
+            schema[col] = 'category'
+        elif col in TEXT_COLUMNS:
+            schema[col] = text_dtype
+        elif df[col].dtype == object:
+            non_null = df[col].notna().sum()
+            unique = df[col].nunique(dropna=True)
+            if non_null and unique / non_null < categorical_ratio:
+                schema[col] = 'category'
+            else:
+                schema[col] = text_dtype
+
+    return schema
+
+
+def compact_dataframe(df, schema):
+    """Cast the columns of a DataFrame to the dtypes given in a schema."""
+    casts = {col: dtype for col, dtype in schema.items() if col in df.columns}
+    return df.astype(casts) if casts else df
+
+
+def concat_compact(chunks):
+    """Concatenate compacted chunks without losing categorical dtypes.
+
+    Chunks rarely share identical categories, and a plain ``pd.concat``
+    would silently turn those columns back into objects.
+    """
+    if len(chunks) == 1:
+        return chunks[0]
+
+    df = pd.concat(chunks, ignore_index=True)
+    for col in chunks[0].columns:
+        if isinstance(chunks[0][col].dtype, pd.CategoricalDtype) and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = pd.api.types.union_categoricals([chunk[col] for chunk in chunks], ignore_order=True)
+    return df
+
+
+def open_decompressed(file_path, compression):
+    """Open a file as a binary stream, decompressing it on the fly."""
+    if compression == 'gzip':
+        return gzip.open(file_path, 'rb')
+    if compression == 'bz2':
+        return bz2.open(file_path, 'rb')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Reading zstd-compressed input requires the 'zstandard' package")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True))
+    return open(file_path, 'rb')
+
+
+def detect_format(file_path):
+    """Detect the format and compression of a data file.
+
+    Compression and Parquet are recognised from their magic bytes. For text
+    formats the first decompressed character decides between JSONL and CSV,
+    with the file extension as a tie-breaker.
+
+    Returns:
+        Tuple of (format, compression) where format is 'csv', 'jsonl' or
+        'parquet' and compression is 'gzip', 'bz2', 'zstd' or None
+    """
+    with open(file_path, 'rb') as f:
+        magic = f.read(4)
+
+    if magic == PARQUET_MAGIC:
+        return 'parquet', None
+
+    compression = None
+    for prefix, name in MAGIC_BYTES.items():
+        if magic.startswith(prefix):
+            compression = name
+            break
+
+    with open_decompressed(file_path, compression) as f:
+        head = f.read(1024).lstrip()
+
+    stem = file_path.lower()
+    for suffix in ('.gz', '.gzip', '.bz2', '.zst', '.zstd'):
+        if stem.endswith(suffix):
+            stem = stem[:-len(suffix)]
+            break
+
+    if head.startswith(b'{') or (not head and stem.endswith(JSONL_EXTENSIONS)):
+        return 'jsonl', compression
+    return 'csv', compression
+
+
+def iter_chunks(file_path, usecols=None, chunk_rows=CHUNK_ROWS):
+    """Yield DataFrame chunks from a CSV, JSONL or Parquet file.
+
+    Args:
+        file_path: Path to the data file, optionally compressed
+        usecols: Optional list of columns to keep
+        chunk_rows: Number of rows per chunk (Parquet uses this as the
+            batch size within each row group)
+    """
+    fmt, compression = detect_format(file_path)
+
+    if fmt == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet input requires the 'pyarrow' package")
+        parquet_file = pq.ParquetFile(file_path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=usecols):
+            yield batch.to_pandas()
+
+    elif fmt == 'jsonl':
+        with open_decompressed(file_path, compression) as f:
+            for chunk in pd.read_json(f, lines=True, chunksize=chunk_rows):
+                yield chunk[usecols] if usecols else chunk
+
+    else:
+        with open_decompressed(file_path, compression) as f:
+            yield from pd.read_csv(f, usecols=usecols, chunksize=chunk_rows)
+
+
+def load_dataframe(file_path, schema=None, usecols=None, chunk_rows=CHUNK_ROWS):
+    """Load a data file with compact dtypes and report the memory saved.
+
+    The file is streamed in chunks; each chunk is cast to the compact schema
+    before the next one is parsed, so the object-dtype copy of the whole
+    file is never held in memory. See ``detect_format`` for supported inputs.
+
+    Args:
+        file_path: Path to the data file
+        schema: Optional dict of column name -> dtype. Inferred from the
+            first chunk when omitted.
+        usecols: Optional list of columns to load; others are dropped as
+            early as the format allows
+        chunk_rows: Number of rows parsed per chunk
+
+    Returns:
+        Tuple of (DataFrame, report dict with format, compression, rows,
+        bytes_before, bytes_after and the schema that was applied)
+    """
+    fmt, compression = detect_format(file_path)
+
+    chunks = []
+    bytes_before = 0
+    for chunk in iter_chunks(file_path, usecols=usecols, chunk_rows=chunk_rows):
+        if schema is None:
+            schema = infer_schema(chunk)
+        bytes_before += frame_memory(chunk)
+        chunks.append(compact_dataframe(chunk, schema))
+
+    df = concat_compact(chunks) if chunks else pd.DataFrame(columns=usecols)
+
+    report = {
+        'format': fmt,
+        'compression': compression,
+        'rows': len(df),
+        'bytes_before': bytes_before,
+        'bytes_after': frame_memory(df),
+        'schema': {col: str(dtype) for col, dtype in (schema or {}).items()},
+    }
+    return df, report
+
+
+def format_memory_report(report):
+    """Format a load report as a one-line summary."""
+    before_kb = report['bytes_before'] / 1024
+    after_kb = report['bytes_after'] / 1024
+    ratio = report['bytes_before'] / report['bytes_after'] if report['bytes_after'] else 0
+    return f"Memory: {before_kb:.1f}KB → {after_kb:.1f}KB ({ratio:.1f}x smaller)"
@@ -0,0 +1,308 @@
+"""Cache of analysis script executions.
+
+Re-running ``generated_code/analysis.py`` recomputes everything even when
+neither the code nor the data changed. Executions are cached under a key
+made of the normalized code (its AST, so comments and formatting don't
+matter), the content hashes of the local modules it imports from its own
+directory (such as ``generated_code/consensus_metrics.py``) and of the
+cached datasets it loads with ``load_data("<fingerprint>")``, the dataset's
+content hash and the versions of Python and the analysis libraries. A hit replays stdout, stderr, the result
+and the files the script produced instead of running it again.
+
+Usage:
+    python -m pipeline.execution_cache generated_code/analysis.py --data data.csv --output outputs/runs/latest
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from importlib import metadata
+
+from generated_code.data_loader import load_manifest
+from pipeline.local_executor import run_script
+
+EXECUTION_CACHE_DIR = "outputs/execution_cache"
+
+# Libraries whose versions are part of the cache key
+KEY_PACKAGES = (
+    "pandas", "numpy", "scipy", "scikit-learn", "matplotlib", "seaborn",
+    "textblob", "nltk", "mistralai",
+)
+
+# Directory next to the script holding the datasets moved out of generated
+# code by pipeline.data_literals
+LOCAL_DATA_DIR = "data_cache"
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def normalized_code_hash(code):
+    """Hash code by its AST so comments and formatting don't change the key."""
+    try:
+        normalized = ast.dump(ast.parse(code))
+    except SyntaxError:
+        normalized = "\n".join(line.rstrip() for line in code.strip().splitlines())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def file_hash(path):
+    """Return the SHA-256 of a file's contents, or '' if there is no file."""
+    if not path or not os.path.exists(path):
+        return ""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _module_path(name, script_dir):
+    """Return the file for a module imported from script_dir, or None."""
+    parts = name.split(".")
+    if len(parts) > 1 and parts[0] == os.path.basename(script_dir):
+        # e.g. 'generated_code.data_loader' from a script in generated_code/
+        parts = parts[1:]
+    base = os.path.join(script_dir, *parts)
+    for path in (base + ".py", os.path.join(base, "__init__.py")):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _imported_names(tree):
+    """Yield every module name an AST imports, including submodules of 'from' imports."""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name
+        elif isinstance(node, ast.ImportFrom) and node.level <= 1:
+            if node.module:
+                yield node.module
+            for alias in node.names:
+                yield f"{node.module}.{alias.name}" if node.module else alias.name
+
+
+def local_modules(code, script_dir):
+    """Return the modules in script_dir that some code imports, directly or through each other.
+
+    Imports anywhere in the code count, including ones inside functions or
+    ``try`` blocks, since either branch may run.
+    """
+    found = set()
+    pending = [code]
+    while pending:
+        try:
+            tree = ast.parse(pending.pop())
+        except SyntaxError:
+            continue
+        for name in _imported_names(tree):
+            path = _module_path(name, script_dir)
+            if path and path not in found:
+                found.add(path)
+                with open(path, "r") as f:
+                    pending.append(f.read())
+    return sorted(found)
+
+
+def _loaded_fingerprints(tree):
+    """Yield the fingerprints an AST passes as literals to ``load_data``."""
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        func = node.func
+        name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+        if name != "load_data":
+            continue
+        for arg in node.args[:1] + [kw.value for kw in node.keywords if kw.arg == "fingerprint"]:
+            if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                yield arg.value
+
+
+def local_datasets(code, script_dir, data_dir=LOCAL_DATA_DIR):
+    """Return the dataset files that some code and its local modules load by fingerprint.
+
+    Each fingerprint maps to the file ``load_data`` would read for it: the
+    cached copy, or the source file it came from when the copy is gone.
+    Other datasets in the cache and the manifest itself are not included,
+    so caching another run's data doesn't change the result.
+
+    Returns:
+        Dict mapping fingerprint to file path, or to None when the
+        fingerprint is unknown
+    """
+    sources = [code]
+    for path in local_modules(code, script_dir):
+        with open(path, "r") as f:
+            sources.append(f.read())
+    fingerprints = set()
+    for source in sources:
+        try:
+            fingerprints.update(_loaded_fingerprints(ast.parse(source)))
+        except SyntaxError:
+            continue
+    if not fingerprints:
+        return {}
+
+    cache_dir = os.path.join(script_dir, data_dir)
+    manifest = load_manifest(cache_dir)
+    datasets = {}
+    for fingerprint in sorted(fingerprints):
+        entry = manifest.get(fingerprint) or {}
+        cached = os.path.join(cache_dir, entry['cache']) if entry.get('cache') else None
+        if cached and os.path.exists(cached):
+            datasets[fingerprint] = cached
+        else:
+            datasets[fingerprint] = entry.get('source')
+    return datasets
+
+
+def library_versions(packages=KEY_PACKAGES):
+    """Return the Python version and installed versions of some packages."""
+    versions = {'python': sys.version.split()[0]}
+    for package in packages:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+class ExecutionCache:
+    """Directory of cached executions, one subdirectory per key.
+
+    Args:
+        cache_dir: Directory holding ``<key>/execution.json`` and
+            ``<key>/artifacts/``
+    """
+
+    def __init__(self, cache_dir=EXECUTION_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def key(self, code, data_path=None, versions=None, script_dir=None):
+        """Return the cache key for some code run against a dataset.
+
+        If ``script_dir`` is given, the local modules the code imports from
+        it and the cached datasets it loads are part of the key.
+        """
+        parts = {
+            'code': normalized_code_hash(code),
+            'data': file_hash(data_path),
+            'versions': versions if versions is not None else library_versions(),
+        }
+        if script_dir:
+            parts['local'] = {os.path.relpath(path, script_dir): file_hash(path)
+                              for path in local_modules(code, script_dir)}
+            parts['datasets'] = {fingerprint: file_hash(path)
+                                 for fingerprint, path in local_datasets(code, script_dir).items()}
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key, output_dir):
+        """Replay a cached execution, copying its artifacts into output_dir.
+
+        Returns:
+            The cached execution dict with artifact paths in output_dir, or
+            None on a miss
+        """
+        entry_path = os.path.join(self._entry_dir(key), "execution.json")
+        if not os.path.exists(entry_path):
+            return None
+        with open(entry_path, "r") as f:
+            execution = json.load(f)
+
+        artifacts = []
+        os.makedirs(output_dir, exist_ok=True)
+        for name in execution['artifacts']:
+            target = os.path.join(output_dir, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(os.path.join(self._entry_dir(key), "artifacts", name), target)
+            artifacts.append(target)
+        return {**execution, 'artifacts': artifacts, 'cached': True}
+
+    def put(self, key, execution, output_dir):
+        """Store an execution and copies of its artifacts.
+
+        Artifact paths are stored relative to ``output_dir``; artifacts
+        outside it are not cached.
+        """
+        entry_dir = self._entry_dir(key)
+        staging = f"{entry_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(os.path.join(staging, "artifacts"))
+
+        names = []
+        for path in execution.get('artifacts', []):
+            name = os.path.relpath(path, output_dir)
+            if name.startswith(os.pardir):
+                continue
+            target = os.path.join(staging, "artifacts", name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(path, target)
+            names.append(name)
+
+        entry = {
+            'stdout': execution.get('stdout', ""),
+            'stderr': execution.get('stderr', ""),
+            'result': None if execution.get('result') is None else str(execution['result']),
+            'returncode': execution.get('returncode'),
+            'duration_seconds': execution.get('duration_seconds'),
+            'artifacts': names,
+            'cached_at': time.time(),
+        }
+        with open(os.path.join(staging, "execution.json"), "w") as f:
+            json.dump(entry, f, indent=2)
+
+        # Swap the finished entry into place so readers never see a partial one
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(staging, entry_dir)
+
+
+def cached_run(cache, script_path, data_path, output_dir, limits=None, runner=run_script):
+    """Run a script through the cache.
+
+    Successful runs are stored; failed runs are not, so they are retried
+    next time.
+
+    Returns:
+        Execution dict as from ``run_script``, with 'cached' True on a hit
+    """
+    with open(script_path, "r") as f:
+        key = cache.key(f.read(), data_path, script_dir=os.path.dirname(os.path.abspath(script_path)))
+
+    cached = cache.get(key, output_dir)
+    if cached is not None:
+        return cached
+
+    execution = runner(script_path, data_path, output_dir, limits=limits)
+    if execution.get('returncode') == 0:
+        try:
+            cache.put(key, execution, output_dir)
+        except Exception as e:
+            print(f"⚠ Warning: Could not cache execution: {e}")
+    return {**execution, 'cached': False}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an analysis script, replaying cached results when nothing changed.")
+    parser.add_argument("script", help="Script to run, e.g. generated_code/analysis.py")
+    parser.add_argument("--data", help="Dataset file passed to the script as DATA_FILE_PATH")
+    parser.add_argument("--output", default="outputs/runs/latest", help="Directory for the run and its artifacts")
+    parser.add_argument("--cache-dir", default=EXECUTION_CACHE_DIR)
+    args = parser.parse_args()
+
+    execution = cached_run(ExecutionCache(args.cache_dir), args.script, args.data, args.output)
+    sys.stdout.write(execution['stdout'])
+    sys.stderr.write(execution['stderr'])
+    source = "cache" if execution['cached'] else f"run in {execution['duration_seconds']:.1f}s"
+    print(f"\n✓ {source}: {len(execution['artifacts'])} artifact(s) in {args.output}", file=sys.stderr)
+    sys.exit(0 if execution['returncode'] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
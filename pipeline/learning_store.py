@@ -0,0 +1,273 @@
+"""Bounded store of learning materials produced by the Critique agent.
+
+Critique's materials are split into individual lessons (one per bullet or
+paragraph) and kept per agent in ``<agent>_lessons.json``. New lessons that
+repeat an existing one are merged into it instead of appended, and when an
+agent's lessons exceed a token cap the oldest ones are compacted (optionally
+by a summarization callable) and the lowest-scoring ones evicted. The
+rendered ``<agent>_learning.md`` is what goes into prompts, so its size is
+bounded no matter how many runs have happened.
+"""
+import json
+import os
+import re
+
+from pipeline.tokens import estimate_tokens
+
+# Token budget for one agent's rendered learning materials
+LEARNING_TOKEN_CAP = 1500
+
+# Word-set Jaccard similarity above which two lessons are considered the same
+DEDUP_THRESHOLD = 0.6
+
+# Lower similarity needed when two lessons share a bold label, compared on
+# the text after the label
+LABELED_DEDUP_THRESHOLD = 0.2
+
+# Per-run decay applied to a lesson's score when choosing what to evict
+RECENCY_DECAY = 0.8
+
+# Number of most recent runs never compacted by the summarizer
+KEEP_RECENT_RUNS = 2
+
+DEFAULT_SECTION = "Lessons"
+CONSOLIDATED_SECTION = "Consolidated Lessons"
+
+_BOLD_LINE = re.compile(r"^\*\*[^*]+\*\*:?$")
+_BULLET = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+_LABEL = re.compile(r"^\*\*(?P<label>[^*]+?):?\*\*")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _words(text):
+    return set(_WORD.findall(text.lower()))
+
+
+def _heading_title(line):
+    """Return the title of a markdown heading or whole-line bold text, else None."""
+    if line.startswith("#") or _BOLD_LINE.match(line):
+        return line.strip("#*: ").rstrip("*:") or None
+    return None
+
+
+def _label(text):
+    match = _LABEL.match(text)
+    return match.group("label").strip().lower() if match else None
+
+
+def section_importance(section):
+    """Weight lessons by the kind of section Critique put them in."""
+    title = section.lower()
+    if any(word in title for word in ("improve", "critical", "must", "error", "issue", "weakness")):
+        return 2.0
+    if any(word in title for word in ("strength", "resource")):
+        return 0.5
+    return 1.0
+
+
+def split_lessons(materials):
+    """Split Critique's markdown materials into (section, lesson) pairs.
+
+    Headings (``###`` or a bold line) name the section; every bullet point or
+    paragraph below becomes one lesson. Separators are dropped.
+    """
+    lessons = []
+    section = DEFAULT_SECTION
+    current = []
+
+    def flush():
+        text = " ".join(line.strip() for line in current).strip()
+        if text:
+            lessons.append((section, text))
+        current.clear()
+
+    for line in materials.replace("\\n", "\n").splitlines():
+        stripped = line.strip()
+        if not stripped or stripped == "---":
+            flush()
+        elif _heading_title(stripped):
+            flush()
+            section = _heading_title(stripped)
+        elif _BULLET.match(stripped):
+            flush()
+            current.append(_BULLET.sub("", stripped))
+        else:
+            current.append(stripped)
+    flush()
+
+    return lessons
+
+
+def _similarity(a, b):
+    words_a, words_b = _words(a), _words(b)
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def is_duplicate(a, b, threshold=DEDUP_THRESHOLD, labeled_threshold=LABELED_DEDUP_THRESHOLD):
+    """Return True if two lessons say the same thing.
+
+    Lessons match when their word sets overlap by at least ``threshold``
+    (Jaccard). Lessons sharing a bold label (e.g. ``**Logging:**``) only
+    need their text after the label to overlap by ``labeled_threshold``,
+    so different lessons under a broad label are kept apart.
+    """
+    label_a, label_b = _label(a), _label(b)
+    if label_a and label_a == label_b:
+        body_a, body_b = _LABEL.sub("", a), _LABEL.sub("", b)
+        return _similarity(body_a, body_b) >= labeled_threshold
+    return _similarity(a, b) >= threshold
+
+
+class LearningStore:
+    """Per-agent lesson store with deduplication, compaction and a token cap.
+
+    Args:
+        base_dir: Directory holding ``<agent>_lessons.json`` and the rendered
+            ``<agent>_learning.md`` files
+        token_cap: Token budget for each agent's rendered materials
+        summarizer: Optional function taking a list of lesson strings and
+            returning a shorter markdown summary, used to compact old lessons
+    """
+
+    def __init__(self, base_dir, token_cap=LEARNING_TOKEN_CAP, summarizer=None):
+        self.base_dir = base_dir
+        self.token_cap = token_cap
+        self.summarizer = summarizer
+
+    def _lessons_path(self, agent_name):
+        return os.path.join(self.base_dir, f"{agent_name}_lessons.json")
+
+    def _materials_path(self, agent_name):
+        return os.path.join(self.base_dir, f"{agent_name}_learning.md")
+
+    def load(self, agent_name):
+        """Load an agent's lessons, importing a legacy markdown file if needed."""
+        path = self._lessons_path(agent_name)
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                return json.load(f)
+
+        state = {'run': 0, 'lessons': []}
+        legacy_path = self._materials_path(agent_name)
+        if os.path.exists(legacy_path):
+            # Each '---'-separated block of the old append-only file was one run
+            with open(legacy_path, "r") as f:
+                blocks = re.split(r"\n\s*---\s*\n", f.read())
+            for block in blocks:
+                if block.strip():
+                    self._merge(state, block)
+        return state
+
+    def save(self, agent_name, state):
+        """Write an agent's lessons and re-render its markdown materials."""
+        os.makedirs(self.base_dir, exist_ok=True)
+        with open(self._lessons_path(agent_name), "w") as f:
+            json.dump(state, f, indent=2)
+        with open(self._materials_path(agent_name), "w") as f:
+            f.write(self.render(state))
+
+    def _merge(self, state, materials):
+        """Merge one run's materials into the state as a new run."""
+        state['run'] += 1
+        run = state['run']
+        for section, text in split_lessons(materials):
+            for lesson in state['lessons']:
+                if is_duplicate(lesson['text'], text):
+                    # The latest wording wins; repetition raises the score
+                    lesson.update(text=text, section=section, last_seen=run)
+                    lesson['hits'] += 1
+                    lesson['importance'] = max(lesson['importance'], section_importance(section))
+                    break
+            else:
+                state['lessons'].append({
+                    'section': section,
+                    'text': text,
+                    'first_seen': run,
+                    'last_seen': run,
+                    'hits': 1,
+                    'importance': section_importance(section),
+                })
+
+    def materials(self, agent_name):
+        """Return an agent's rendered materials within the token cap, or None.
+
+        If compaction changes the lessons they are saved, so a configured
+        summarizer is not called again on the next load.
+        """
+        state = self.load(agent_name)
+        before = json.dumps(state, sort_keys=True)
+        self.compact(state)
+        if json.dumps(state, sort_keys=True) != before:
+            self.save(agent_name, state)
+        return self.render(state) or None
+
+    def add(self, agent_name, materials):
+        """Add a run's materials for an agent and enforce the token cap.
+
+        Returns:
+            The rendered materials after deduplication and compaction
+        """
+        state = self.load(agent_name)
+        self._merge(state, materials)
+        self.compact(state)
+        self.save(agent_name, state)
+        return self.render(state)
+
+    def score(self, lesson, run):
+        """Score a lesson for eviction; higher scores are kept longer."""
+        age = run - lesson['last_seen']
+        return lesson['importance'] * lesson['hits'] * (RECENCY_DECAY ** age)
+
+    def compact(self, state):
+        """Shrink the lessons until their rendering fits the token cap.
+
+        Old lessons are first summarized into one consolidated lesson if a
+        summarizer is configured; then the lowest-scoring lessons are
+        evicted until the cap is met.
+        """
+        if estimate_tokens(self.render(state)) <= self.token_cap:
+            return
+
+        run = state['run']
+        if self.summarizer:
+            old = [l for l in state['lessons'] if l['last_seen'] <= run - KEEP_RECENT_RUNS]
+            if len(old) > 1:
+                try:
+                    summary = self.summarizer([l['text'] for l in old]).strip()
+                except Exception as e:
+                    print(f"⚠ Warning: Could not summarize old lessons: {e}")
+                    summary = ""
+                if summary:
+                    state['lessons'] = [l for l in state['lessons'] if l not in old]
+                    state['lessons'].append({
+                        'section': CONSOLIDATED_SECTION,
+                        'text': summary,
+                        'first_seen': min(l['first_seen'] for l in old),
+                        'last_seen': max(l['last_seen'] for l in old),
+                        'hits': max(l['hits'] for l in old),
+                        'importance': max(l['importance'] for l in old),
+                    })
+
+        while state['lessons'] and estimate_tokens(self.render(state)) > self.token_cap:
+            weakest = min(state['lessons'], key=lambda l: (self.score(l, run), l['last_seen']))
+            state['lessons'].remove(weakest)
+
+    def render(self, state):
+        """Render an agent's lessons as markdown."""
+        return render_lessons(state['lessons'])
+
+
+def render_lessons(lessons):
+    """Render lesson dicts as markdown grouped by section, in the order given."""
+    sections = {}
+    for lesson in lessons:
+        sections.setdefault(lesson['section'], []).append(lesson['text'])
+
+    parts = []
+    for section, texts in sections.items():
+        parts.append(f"### {section}")
+        parts.extend(f"- {text}" for text in texts)
+        parts.append("")
+    return "\n".join(parts).strip()
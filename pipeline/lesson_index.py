@@ -0,0 +1,182 @@
+"""SQLite full-text index of lessons for retrieval at prompt-assembly time.
+
+Instead of injecting every learning file wholesale, lessons are stored as
+individual rows and only the top-k most relevant to the current dataset and
+stage are retrieved, so prompt size stays constant however long the
+Critique feedback loop has been running. The database uses WAL mode and
+immediate transactions so parallel runs can write to it safely.
+"""
+import hashlib
+import re
+import sqlite3
+import time
+from collections import Counter
+from contextlib import closing
+
+from pipeline.learning_store import render_lessons, section_importance
+
+LESSON_INDEX_PATH = "outputs/agent_learning_materials/lessons.db"
+
+# Lessons retrieved per agent and stage
+LESSON_TOP_K = 12
+
+# Rank multiplier for lessons recorded in the same stage (data mode) as the
+# current run
+STAGE_BOOST = 2.0
+
+# Query terms kept when building a query from free text
+QUERY_TERMS = 40
+
+# Seconds a writer waits for another run's transaction to finish
+BUSY_TIMEOUT = 30
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can do does for from has have if in into is it its
+more most must not of on or our should so such than that the their them then there
+these this those to use used using was we were what when which will with you your
+""".split())
+
+_TERM = re.compile(r"[a-z][a-z0-9_]{2,}")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lessons (
+    id INTEGER PRIMARY KEY,
+    agent TEXT NOT NULL,
+    stage TEXT,
+    section TEXT NOT NULL,
+    text TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    importance REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 1,
+    updated_at REAL NOT NULL,
+    UNIQUE (agent, text_hash)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS lessons_fts USING fts5(
+    text, section, content='lessons', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS lessons_ai AFTER INSERT ON lessons BEGIN
+    INSERT INTO lessons_fts(rowid, text, section) VALUES (new.id, new.text, new.section);
+END;
+CREATE TRIGGER IF NOT EXISTS lessons_ad AFTER DELETE ON lessons BEGIN
+    INSERT INTO lessons_fts(lessons_fts, rowid, text, section) VALUES ('delete', old.id, old.text, old.section);
+END;
+"""
+
+
+def query_terms(*texts, limit=QUERY_TERMS):
+    """Pick the most frequent non-stopword terms from some texts."""
+    counts = Counter()
+    for text in texts:
+        if text:
+            counts.update(t for t in _TERM.findall(str(text).lower()) if t not in STOPWORDS)
+    return [term for term, _ in counts.most_common(limit)]
+
+
+def _text_hash(text):
+    return hashlib.sha256(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+
+
+class LessonIndex:
+    """Full-text index of lessons shared by all agents and runs.
+
+    Args:
+        db_path: Path of the SQLite database file
+    """
+
+    def __init__(self, db_path=LESSON_INDEX_PATH):
+        self.db_path = db_path
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT * 1000}")
+        return conn
+
+    def add(self, agent_name, lessons, stage=None):
+        """Insert lessons for an agent; repeated lessons bump their hit count.
+
+        Args:
+            agent_name: Agent the lessons are for
+            lessons: Iterable of (section, text) pairs, e.g. from
+                ``learning_store.split_lessons``
+            stage: Optional label for the run the lessons came from (e.g.
+                the data mode)
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            # Take the write lock up front so concurrent runs queue instead of failing
+            conn.execute("BEGIN IMMEDIATE")
+            for section, text in lessons:
+                conn.execute(
+                    """
+                    INSERT INTO lessons (agent, stage, section, text, text_hash, importance, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (agent, text_hash) DO UPDATE SET hits = hits + 1, updated_at = excluded.updated_at
+                    """,
+                    (agent_name, stage, section, text, _text_hash(text), section_importance(section), now),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def count(self, agent_name=None):
+        """Return the number of indexed lessons, optionally for one agent."""
+        with closing(self._connect()) as conn:
+            if agent_name is None:
+                return conn.execute("SELECT COUNT(*) FROM lessons").fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM lessons WHERE agent = ?", (agent_name,)).fetchone()[0]
+
+    def search(self, agent_name, terms, k=LESSON_TOP_K, stage=None):
+        """Return up to k lessons for an agent ranked by relevance to some terms.
+
+        Lessons are ranked by BM25 over the query terms weighted by their
+        section importance, with lessons from ``stage`` boosted by
+        ``STAGE_BOOST``. BM25 scores are negative (lower is better), so the
+        weights multiply them. If fewer than k match, the rest
+        are filled with the agent's lessons from the same stage first, then
+        its most important and most repeated lessons.
+
+        Returns:
+            List of lesson dicts with 'section' and 'text'
+        """
+        conn = self._connect()
+        try:
+            rows = []
+            if terms:
+                match = " OR ".join(f'"{term}"' for term in terms)
+                rows = conn.execute(
+                    """
+                    SELECT l.id, l.section, l.text FROM lessons_fts
+                    JOIN lessons l ON l.id = lessons_fts.rowid
+                    WHERE lessons_fts MATCH ? AND l.agent = ?
+                    ORDER BY bm25(lessons_fts) * l.importance
+                        * (CASE WHEN l.stage = ? THEN ? ELSE 1 END) LIMIT ?
+                    """,
+                    (match, agent_name, stage, STAGE_BOOST, k),
+                ).fetchall()
+
+            if len(rows) < k:
+                seen = [row[0] for row in rows] or [-1]
+                rows += conn.execute(
+                    f"""
+                    SELECT id, section, text FROM lessons
+                    WHERE agent = ? AND id NOT IN ({",".join("?" * len(seen))})
+                    ORDER BY COALESCE(stage = ?, 0) DESC, importance * hits DESC, updated_at DESC LIMIT ?
+                    """,
+                    (agent_name, *seen, stage, k - len(rows)),
+                ).fetchall()
+        finally:
+            conn.close()
+
+        return [{'section': section, 'text': text} for _, section, text in rows]
+
+    def retrieve(self, agent_name, *context, k=LESSON_TOP_K, stage=None):
+        """Return rendered markdown of the top-k lessons for some context texts, or None."""
+        lessons = self.search(agent_name, query_terms(*context), k=k, stage=stage)
+        return render_lessons(lessons) or None
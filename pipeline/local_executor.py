@@ -0,0 +1,153 @@
+"""Run generated analysis code locally instead of in the remote code_interpreter.
+
+The script runs in a subprocess with CPU time, memory and wall-clock limits,
+inside the run's output directory so any figures it saves end up there. The
+dataset is passed by path in the ``DATA_FILE_PATH`` environment variable
+rather than pasted into the prompt. Results come back in the same shape as
+the remote executions in ``dev_code_executions``.
+"""
+import os
+import signal
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; limits other than the timeout are skipped
+    resource = None
+
+DATA_PATH_ENV = "DATA_FILE_PATH"
+
+_PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Default limits for one execution
+LOCAL_EXECUTION_LIMITS = {
+    'timeout_seconds': 900,
+    'cpu_seconds': 900,
+    'memory_mb': 8192,
+}
+
+
+def _limit_resources(cpu_seconds, memory_mb):
+    """Return a preexec_fn that applies resource limits in the child process."""
+    if resource is None:
+        return None
+
+    def apply():
+        if cpu_seconds:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+        if memory_mb:
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    return apply
+
+
+def _kill_process_group(process):
+    """Kill a child started in its own session along with everything it spawned."""
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+            return
+        except ProcessLookupError:
+            return
+    process.kill()
+
+
+def _snapshot(directory):
+    """Map every file under a directory to its modification time."""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                files[path] = os.path.getmtime(path)
+            except OSError:
+                pass
+    return files
+
+
+def run_script(script_path, data_path, output_dir, limits=None, parallel_cells=0, profile_path=None):
+    """Run a Python script in a limited subprocess.
+
+    Args:
+        script_path: Script to run
+        data_path: Dataset file exposed to the script as ``DATA_FILE_PATH``
+        output_dir: Working directory for the run; files the script saves
+            with relative paths land here
+        limits: Dict with 'timeout_seconds', 'cpu_seconds' and 'memory_mb'
+            (defaults to ``LOCAL_EXECUTION_LIMITS``)
+        parallel_cells: If set, run the script with ``pipeline.parallel_cells``
+            using up to this many worker processes for independent cells
+        profile_path: If set, run the script under ``pipeline.code_profiler``
+            and write its profile to this path (takes precedence over
+            ``parallel_cells``)
+
+    Returns:
+        Dict with 'stdout', 'stderr' and 'result' like a remote execution,
+        plus 'returncode', 'duration_seconds' and 'artifacts' (files created
+        or modified in the output directory)
+    """
+    limits = {**LOCAL_EXECUTION_LIMITS, **(limits or {})}
+    os.makedirs(output_dir, exist_ok=True)
+    before = _snapshot(output_dir)
+
+    env = dict(os.environ)
+    env[DATA_PATH_ENV] = os.path.abspath(data_path) if data_path else ""
+    env["MPLBACKEND"] = "Agg"
+    env["PYTHONUNBUFFERED"] = "1"
+
+    command = [sys.executable, os.path.abspath(script_path)]
+    if profile_path:
+        command = [sys.executable, "-m", "pipeline.code_profiler", os.path.abspath(script_path),
+                   "--output", os.path.abspath(profile_path)]
+    elif parallel_cells:
+        command = [sys.executable, "-m", "pipeline.parallel_cells", os.path.abspath(script_path),
+                   "--workers", str(parallel_cells)]
+    if command[1] == "-m":
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [_PACKAGE_ROOT, env.get("PYTHONPATH")]))
+
+    start = time.perf_counter()
+    # A new session makes the child a process group leader, so a timeout can
+    # kill any processes the script started as well
+    process = subprocess.Popen(
+        command,
+        cwd=output_dir,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        start_new_session=True,
+        preexec_fn=_limit_resources(limits['cpu_seconds'], limits['memory_mb']),
+    )
+    try:
+        stdout, stderr = process.communicate(timeout=limits['timeout_seconds'])
+        returncode = process.returncode
+        result = None if returncode == 0 else f"Process exited with code {returncode}"
+    except subprocess.TimeoutExpired:
+        _kill_process_group(process)
+        stdout, stderr = process.communicate()
+        returncode = None
+        result = f"Timed out after {limits['timeout_seconds']} seconds"
+    duration = time.perf_counter() - start
+
+    after = _snapshot(output_dir)
+    artifacts = sorted(path for path, mtime in after.items() if before.get(path) != mtime)
+
+    return {
+        'stdout': stdout,
+        'stderr': stderr,
+        'result': result,
+        'returncode': returncode,
+        'duration_seconds': duration,
+        'artifacts': artifacts,
+    }
+
+
+def run_code(code, data_path, output_dir, limits=None, script_name="analysis.py"):
+    """Write code into the output directory and run it with ``run_script``."""
+    os.makedirs(output_dir, exist_ok=True)
+    script_path = os.path.join(output_dir, script_name)
+    with open(script_path, "w") as f:
+        f.write(code)
+    return run_script(script_path, data_path, output_dir, limits=limits)
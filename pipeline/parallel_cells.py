@@ -0,0 +1,568 @@
+"""Run a generated script's independent top-level statements in parallel.
+
+``generated_code/analysis.py`` is a flat script whose steps (sentiment,
+clustering, Jaccard similarity, the ``plot_*`` calls) run one after the
+other even when they don't depend on each other. This runner splits the
+script into cells, one per top-level statement, and works out what each
+cell reads and writes:
+
+- names it loads, assigns, deletes or imports;
+- ``df['column']`` subscripts with constant keys as separate resources, so
+  cells adding different columns to the same frame stay independent;
+- in-place changes: subscript and attribute assignment, ``inplace=True``
+  and list/dict/set methods such as ``append`` (``MUTATING_METHODS``);
+- for calls to functions defined in the script, the globals the function
+  reads and writes and the arguments it mutates.
+
+Calls into libraries are assumed not to mutate their arguments, except
+through the methods above. Top-level calls on modules (``plt.figure()``)
+count as writing the module, so cells relying on pyplot's global state
+keep their order.
+
+A cell runs as soon as every earlier cell it conflicts with has finished.
+Cells calling functions defined in the script (the analysis steps) each
+run in a worker process forked from the runner at that moment, so it sees
+the namespace as a serial run would; the values it writes are sent back
+and merged. Imports, definitions, cheap statements and cells whose values
+can't be sent back (unpicklable objects) run in the runner itself. Output
+is buffered per cell and printed in source order, and a failing cell stops
+the script with the output of every cell before it, as when the script
+runs serially.
+
+Usage:
+    python -m pipeline.parallel_cells generated_code/analysis.py --workers 4
+    python -m pipeline.parallel_cells generated_code/analysis.py --plan
+"""
+import argparse
+import ast
+import builtins
+import io
+import multiprocessing
+import multiprocessing.connection
+import os
+import pickle
+import sys
+import traceback
+import types
+
+# Methods assumed to change the object they're called on
+MUTATING_METHODS = frozenset({
+    "append", "extend", "insert", "pop", "popitem", "remove", "clear", "update",
+    "setdefault", "sort", "reverse", "add", "discard", "difference_update",
+    "intersection_update", "symmetric_difference_update",
+})
+
+POOL_SUPPORTED = "fork" in multiprocessing.get_all_start_methods()
+
+
+class _Deleted:
+    """Sent back in place of a value for a name a cell deleted."""
+
+
+def _constant_key(node):
+    """Return a subscript's key if it is a str or int constant, else None."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (str, int)) and not isinstance(node.value, bool):
+        return node.value
+    return None
+
+
+def _root_name(node):
+    """Return the name at the root of an attribute/subscript chain, or None."""
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def _resource(node):
+    """Return (name, key) for ``x['key']``, (name, None) for other chains on x."""
+    if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name):
+        key = _constant_key(node.slice)
+        if key is not None:
+            return node.value.id, key
+    name = _root_name(node)
+    return (name, None) if name else None
+
+
+class _Effects(ast.NodeVisitor):
+    """Collect the reads, writes and calls of some code.
+
+    Args:
+        modules: Names bound to modules; method calls on them count as
+            writes when ``module_calls_write`` is set
+        module_calls_write: Whether calls on modules change their state
+    """
+
+    def __init__(self, modules=(), module_calls_write=True):
+        self.modules = set(modules)
+        self.module_calls_write = module_calls_write
+        self.reads = set()       # (name, key or None)
+        self.writes = set()      # (name, key or None)
+        self.rebinds = set()     # names assigned, deleted or imported
+        self.mutated = set()     # names changed in place
+        self.calls = []          # (function name, [argument root names by position])
+        self.imports = {}        # bound name -> module name
+        self._ignored = set()    # comprehension variables
+
+    def _write(self, resource, mutation):
+        self.writes.add(resource)
+        (self.mutated if mutation else self.rebinds).add(resource[0])
+
+    def visit_Name(self, node):
+        if node.id in self._ignored:
+            return
+        if isinstance(node.ctx, ast.Load):
+            self.reads.add((node.id, None))
+        else:
+            self._write((node.id, None), mutation=False)
+
+    def _visit_chain(self, node):
+        resource = _resource(node)
+        if resource is None:
+            self.generic_visit(node)
+            return
+        if resource[0] not in self._ignored:
+            self.reads.add(resource)
+            if not isinstance(node.ctx, ast.Load):
+                # Assigning x[k] or x.attr changes x in place
+                self._write(resource, mutation=True)
+        # Subscripts inside the chain (x[i].y[j]) are read too
+        while isinstance(node, (ast.Attribute, ast.Subscript)):
+            if isinstance(node, ast.Subscript):
+                self.visit(node.slice)
+            node = node.value
+
+    visit_Subscript = _visit_chain
+    visit_Attribute = _visit_chain
+
+    def visit_AugAssign(self, node):
+        if isinstance(node.target, ast.Name):
+            self.reads.add((node.target.id, None))
+        self.visit(node.target)
+        self.visit(node.value)
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Attribute):
+            target = _root_name(func.value)
+            inplace = any(k.arg == "inplace" and isinstance(k.value, ast.Constant) and k.value.value is True
+                          for k in node.keywords)
+            if target in self.modules:
+                if self.module_calls_write:
+                    self._write((target, None), mutation=True)
+            elif target and target not in self._ignored and (func.attr in MUTATING_METHODS or inplace):
+                self._write((target, None), mutation=True)
+        elif isinstance(func, ast.Name):
+            self.calls.append((func.id, [_root_name(arg) for arg in node.args]))
+        self.generic_visit(node)
+
+    def _visit_import(self, node):
+        for alias in node.names:
+            bound = alias.asname or alias.name.split(".")[0]
+            self._write((bound, None), mutation=False)
+            self.imports[bound] = alias.name if isinstance(node, ast.Import) else f"{node.module}.{alias.name}"
+
+    visit_Import = _visit_import
+    visit_ImportFrom = _visit_import
+
+    def _visit_definition(self, node):
+        self._write((node.name, None), mutation=False)
+        self.generic_visit(node)
+
+    visit_FunctionDef = _visit_definition
+    visit_AsyncFunctionDef = _visit_definition
+    visit_ClassDef = _visit_definition
+
+    def _visit_comprehension(self, node):
+        targets = set()
+        for generator in node.generators:
+            targets |= {n.id for n in ast.walk(generator.target) if isinstance(n, ast.Name)}
+        ignored, self._ignored = self._ignored, self._ignored | targets
+        self.generic_visit(node)
+        self._ignored = ignored
+
+    visit_ListComp = _visit_comprehension
+    visit_SetComp = _visit_comprehension
+    visit_DictComp = _visit_comprehension
+    visit_GeneratorExp = _visit_comprehension
+
+
+class _Function:
+    """What calling a function defined in the script reads and writes."""
+
+    def __init__(self, node, modules):
+        self.params = []
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            args = node.args
+            self.params = [a.arg for a in args.posonlyargs + args.args]
+            local = set(self.params) | {a.arg for a in args.kwonlyargs}
+            local |= {a.arg for a in (args.vararg, args.kwarg) if a}
+        else:
+            local = set()
+
+        effects = _Effects(modules, module_calls_write=False)
+        for statement in node.body:
+            effects.visit(statement)
+        declared_global = {name for n in ast.walk(node) if isinstance(n, ast.Global) for name in n.names}
+        local |= effects.rebinds - declared_global
+
+        self.reads = {r for r in effects.reads if r[0] not in local}
+        self.writes = {w for w in effects.writes if w[0] not in local}
+        self.mutated_params = {i for i, p in enumerate(self.params) if p in effects.mutated}
+        self.calls = effects.calls
+        self.local = local
+
+
+def _resolve_functions(functions):
+    """Fold the effects of functions called by other script functions into their callers."""
+    changed = True
+    while changed:
+        changed = False
+        for function in functions.values():
+            for name, args in function.calls:
+                callee = functions.get(name)
+                if callee is None or name in function.local:
+                    continue
+                reads = function.reads | callee.reads
+                writes = function.writes | callee.writes
+                mutated = set(function.mutated_params)
+                for i in callee.mutated_params:
+                    if i < len(args) and args[i]:
+                        if args[i] in function.params:
+                            mutated.add(function.params.index(args[i]))
+                        elif args[i] not in function.local:
+                            writes.add((args[i], None))
+                if (reads, writes, mutated) != (function.reads, function.writes, function.mutated_params):
+                    function.reads, function.writes, function.mutated_params = reads, writes, mutated
+                    changed = True
+
+
+class Cell:
+    """One top-level statement of a script.
+
+    Attributes:
+        index: Position in the script
+        node: The statement's AST
+        reads: (name, key) resources read; key is None for the whole name
+        writes: (name, key) resources written
+        deps: Indices of the earlier cells this one must run after
+        parallel: Whether the cell may run in a worker process
+    """
+
+    def __init__(self, index, node, reads, writes, parallel):
+        self.index = index
+        self.node = node
+        self.reads = reads
+        self.writes = writes
+        self.deps = set()
+        self.parallel = parallel
+
+    @property
+    def line(self):
+        return self.node.lineno
+
+
+def split_cells(code):
+    """Split a script into cells and link each to the cells it depends on.
+
+    Raises:
+        SyntaxError: If the code doesn't parse
+    """
+    tree = ast.parse(code)
+    modules = set()
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            effects = _Effects()
+            effects.visit(node)
+            modules |= {name for name, module in effects.imports.items()
+                        if isinstance(node, ast.Import) or module == "matplotlib.pyplot"}
+
+    functions = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            functions[node.name] = _Function(node, modules)
+    _resolve_functions(functions)
+
+    cells = []
+    for index, node in enumerate(tree.body):
+        effects = _Effects(modules)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            # Only decorators, defaults and bases run at definition time
+            for part in getattr(node, "decorator_list", []) + getattr(node, "bases", []):
+                effects.visit(part)
+            if not isinstance(node, ast.ClassDef):
+                for default in node.args.defaults + [d for d in node.args.kw_defaults if d]:
+                    effects.visit(default)
+            effects.writes.add((node.name, None))
+        else:
+            effects.visit(node)
+
+        reads, writes = set(effects.reads), set(effects.writes)
+        for name, args in effects.calls:
+            function = functions.get(name)
+            if function is None:
+                continue
+            reads |= function.reads
+            writes |= function.writes
+            for i in function.mutated_params:
+                if i < len(args) and args[i]:
+                    writes.add((args[i], None))
+
+        # Only the script's own analysis steps are worth a worker process
+        calls_step = any(name in functions for name, _ in effects.calls)
+        parallel = calls_step and not any(name in modules for name, _ in writes)
+        cells.append(Cell(index, node, reads, writes, parallel))
+
+    _link(cells)
+    return cells
+
+
+def _link(cells):
+    """Add read-after-write, write-after-write and write-after-read dependencies."""
+    whole_writer = {}     # name -> last cell writing it as a whole
+    key_writers = {}      # name -> {key: last cell writing it}
+    whole_readers = {}    # name -> cells reading it since it was last written
+    key_readers = {}      # name -> {key: cells reading it since it was last written}
+
+    for cell in cells:
+        for name, key in cell.reads:
+            if name in whole_writer:
+                cell.deps.add(whole_writer[name])
+            writers = key_writers.get(name, {})
+            if key is None:
+                cell.deps.update(writers.values())
+            elif key in writers:
+                cell.deps.add(writers[key])
+        for name, key in cell.writes:
+            if name in whole_writer:
+                cell.deps.add(whole_writer[name])
+            writers = key_writers.get(name, {})
+            readers = key_readers.get(name, {})
+            if key is None:
+                cell.deps.update(writers.values())
+                for keyed in readers.values():
+                    cell.deps.update(keyed)
+            else:
+                if key in writers:
+                    cell.deps.add(writers[key])
+                cell.deps.update(readers.get(key, ()))
+            cell.deps.update(whole_readers.get(name, ()))
+        cell.deps.discard(cell.index)
+
+        for name, key in cell.reads:
+            if key is None:
+                whole_readers.setdefault(name, set()).add(cell.index)
+            else:
+                key_readers.setdefault(name, {}).setdefault(key, set()).add(cell.index)
+        for name, key in cell.writes:
+            if key is None:
+                whole_writer[name] = cell.index
+                key_writers.pop(name, None)
+                whole_readers.pop(name, None)
+                key_readers.pop(name, None)
+            else:
+                key_writers.setdefault(name, {})[key] = cell.index
+                key_readers.get(name, {}).pop(key, None)
+
+
+class _CellOutput(io.TextIOBase):
+    """Text stream that buffers writes per cell, so they can be printed in order."""
+
+    encoding = "utf-8"
+
+    def __init__(self):
+        self.buffers = {}
+        self.cell = None
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self.buffers.setdefault(self.cell, []).append(text)
+        return len(text)
+
+    def take(self, cell):
+        return "".join(self.buffers.pop(cell, []))
+
+
+# State inherited by forked workers: (cells, namespace, stdout, stderr, script path)
+_STATE = None
+
+
+def _exec_cell(cell, namespace, stdout, stderr, script_path):
+    """Run one cell; return None, or the exit code if the script should stop."""
+    stdout.cell = stderr.cell = cell.index
+    try:
+        exec(compile(ast.Module(body=[cell.node], type_ignores=[]), script_path, "exec"), namespace)
+        return None
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException as e:
+        # Leave this function's frame out, as in a plain run of the script
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        return 1
+
+
+def _written_values(cell, namespace):
+    """Pickle the values a cell wrote, or return None if they can't be sent back."""
+    values = {}
+    try:
+        for name, key in cell.writes:
+            if key is None:
+                values[(name, key)] = namespace.get(name, _Deleted)
+            elif name in namespace:
+                values[(name, key)] = namespace[name][key]
+        return pickle.dumps(values)
+    except Exception:
+        return None
+
+
+def _run_in_worker(index, connection):
+    """Run a cell in a forked worker and send back its output and written values."""
+    cells, namespace, stdout, stderr, script_path = _STATE
+    cell = cells[index]
+    status = _exec_cell(cell, namespace, stdout, stderr, script_path)
+    payload = _written_values(cell, namespace) if status is None else None
+    connection.send((status, stdout.take(index), stderr.take(index), payload))
+    connection.close()
+
+
+def _merge(payload, namespace):
+    for (name, key), value in pickle.loads(payload).items():
+        if key is not None:
+            namespace[name][key] = value
+        elif value is _Deleted:
+            namespace.pop(name, None)
+        else:
+            namespace[name] = value
+
+
+def run_cells(code, script_path="<script>", workers=None):
+    """Run a script cell by cell, with independent cells in parallel.
+
+    A cell starts as soon as the cells it depends on have finished; cells
+    calling the script's functions each get a worker process forked at that
+    moment, up to ``workers`` at a time.
+
+    Args:
+        code: Script source
+        script_path: File name for tracebacks and ``__file__``
+        workers: Maximum worker processes at once (default: CPU count)
+
+    Returns:
+        Exit code: 0, 1 if a cell raised, or the code passed to sys.exit
+    """
+    global _STATE
+    cells = split_cells(code)
+    workers = workers or os.cpu_count() or 1
+    context = multiprocessing.get_context("fork") if POOL_SUPPORTED and workers > 1 else None
+
+    # Run in a real __main__ module so classes defined by the script pickle
+    module = types.ModuleType("__main__")
+    module.__file__ = script_path
+    module.__builtins__ = builtins
+    namespace = module.__dict__
+    real_main, real_stdout, real_stderr = sys.modules["__main__"], sys.stdout, sys.stderr
+    stdout, stderr = _CellOutput(), _CellOutput()
+    sys.modules["__main__"], sys.stdout, sys.stderr = module, stdout, stderr
+    _STATE = (cells, namespace, stdout, stderr, script_path)
+
+    started, done = set(), set()
+    running = {}    # connection -> (process, cell index)
+    stop_at, exit_code = len(cells), 0
+    emitted = 0
+
+    def finish(index, status):
+        nonlocal stop_at, exit_code
+        done.add(index)
+        if status is not None and index < stop_at:
+            stop_at, exit_code = index, status
+
+    try:
+        while True:
+            progressed = True
+            while progressed:
+                progressed = False
+                for cell in cells:
+                    if cell.index in started or cell.index >= stop_at or not cell.deps <= done:
+                        continue
+                    if context and cell.parallel:
+                        if len(running) < workers:
+                            receiver, sender = context.Pipe(duplex=False)
+                            process = context.Process(target=_run_in_worker, args=(cell.index, sender))
+                            process.start()
+                            sender.close()
+                            running[receiver] = (process, cell.index)
+                            started.add(cell.index)
+                    else:
+                        started.add(cell.index)
+                        finish(cell.index, _exec_cell(cell, namespace, stdout, stderr, script_path))
+                        progressed = True
+
+            # Print every finished cell whose predecessors have all printed
+            while emitted <= min(stop_at, len(cells) - 1) and emitted in done:
+                real_stdout.write(stdout.take(emitted))
+                real_stderr.write(stderr.take(emitted))
+                emitted += 1
+            real_stdout.flush()
+            real_stderr.flush()
+
+            if not running:
+                break
+            for receiver in multiprocessing.connection.wait(list(running)):
+                process, index = running.pop(receiver)
+                try:
+                    status, out, err, payload = receiver.recv()
+                except EOFError:
+                    status, out, payload = 1, "", None
+                    err = f"Worker running line {cells[index].line} died (exit code {process.exitcode})\n"
+                receiver.close()
+                process.join()
+                if status is None and payload is None:
+                    # Its values can't be sent back, so run it again here
+                    status = _exec_cell(cells[index], namespace, stdout, stderr, script_path)
+                else:
+                    stdout.buffers[index], stderr.buffers[index] = [out], [err]
+                    if status is None:
+                        _merge(payload, namespace)
+                finish(index, status)
+    finally:
+        for receiver, (process, _) in running.items():
+            process.kill()
+            process.join()
+        _STATE = None
+        sys.modules["__main__"], sys.stdout, sys.stderr = real_main, real_stdout, real_stderr
+        stdout.cell = stderr.cell = None
+        real_stdout.write(stdout.take(None))
+        real_stderr.write(stderr.take(None))
+    return exit_code
+
+
+def describe_plan(cells):
+    """Return a readable summary of each cell's dependencies."""
+    lines = []
+    for cell in cells:
+        after = ", ".join(str(cells[d].line) for d in sorted(cell.deps)) or "-"
+        where = "worker" if cell.parallel else "runner"
+        lines.append(f"line {cell.line:>5} [{where}] after lines: {after}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a script with independent top-level statements in parallel.")
+    parser.add_argument("script", help="Script to run, e.g. generated_code/analysis.py")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes at once (default: CPU count)")
+    parser.add_argument("--plan", action="store_true", help="Print each cell's dependencies instead of running the script")
+    args = parser.parse_args()
+
+    with open(args.script, "r") as f:
+        code = f.read()
+    if args.plan:
+        print(describe_plan(split_cells(code)))
+        return
+    sys.argv = [args.script]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    sys.exit(run_cells(code, args.script, args.workers))
+
+
+if __name__ == "__main__":
+    main()
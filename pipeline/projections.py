@@ -0,0 +1,103 @@
+"""Stage-specific views of upstream artifacts for downstream agents.
+
+Quant and Critique need different parts of Dev's output: Quant interprets
+results and doesn't need code, while Critique audits the code but not a
+second copy of the dataset. A projection builds each agent's input from the
+parsed Dev messages, code executions and prompt segments, with its own
+settings for code, duplicates, stdout size and data.
+"""
+import hashlib
+import re
+
+from pipeline.context_guard import collapse_repeated_lines, head_tail
+from pipeline.prompts import assemble_prompt
+
+_CODE_BLOCK = re.compile(r"```[ \t]*([\w+-]*)[^\n]*\n(.*?)(?:```|\Z)", re.DOTALL)
+
+# Projection settings (QUANT_PROJECTION and CRITIQUE_PROJECTION in main.py):
+#   strip_code: replace fenced code blocks in Dev messages with a placeholder
+#   dedupe_messages: drop Dev messages that repeat an earlier one
+#   stdout_token_cap: cap on each execution's stdout (None for no cap)
+#   data: 'full' keeps the data in Dev's prompt, 'fingerprint' replaces it
+#       with a reference, 'omit' drops it
+
+
+def strip_code_blocks(text):
+    """Replace fenced code blocks with a one-line placeholder."""
+    def placeholder(match):
+        language = match.group(1) or "code"
+        lines = len(match.group(2).splitlines())
+        return f"[{language} code block omitted: {lines} lines]"
+    return _CODE_BLOCK.sub(placeholder, text)
+
+
+def collapse_duplicate_messages(messages):
+    """Drop messages whose whitespace-normalized text repeats an earlier one."""
+    seen = set()
+    unique = []
+    for message in messages:
+        key = " ".join(str(message).split())
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(message)
+    return unique
+
+
+def project_messages(messages, projection):
+    """Return Dev's text messages as strings, as seen by a downstream agent."""
+    projected = [str(m) for m in messages]
+    if projection.get('dedupe_messages'):
+        projected = collapse_duplicate_messages(projected)
+    if projection.get('strip_code'):
+        projected = [strip_code_blocks(m) for m in projected]
+    return [m for m in projected if m.strip()]
+
+
+def project_executions(executions, projection):
+    """Return code execution results with stdout capped for a downstream agent.
+
+    Repeated log lines are collapsed before the cap is applied.
+    """
+    cap = projection.get('stdout_token_cap')
+    projected = []
+    for execution in executions:
+        stdout = str(execution['stdout'] or "")
+        if cap:
+            stdout = head_tail(collapse_repeated_lines(stdout), cap)
+        projected.append({**execution, 'stdout': stdout})
+    return projected
+
+
+def data_fingerprint(text):
+    """Return a short fingerprint identifying some data text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def data_reference(text, description=""):
+    """Return a placeholder that stands in for data text in a prompt."""
+    detail = f"{description}; " if description else ""
+    return (f"[Input data omitted ({detail}{len(text)} chars, {len(text.splitlines())} lines, "
+            f"fingerprint {data_fingerprint(text)}). It is the same data Dev received.]")
+
+
+def project_prompt(segments, projection, data_segment="data", description=""):
+    """Assemble a prompt from its segments with the data segment projected.
+
+    Args:
+        segments: Segments the original prompt was built from
+        projection: Projection settings; its 'data' key is 'full',
+            'fingerprint' or 'omit'
+        data_segment: Name of the segment holding the data
+        description: Short description of the data for the reference
+    """
+    data = projection.get('data', 'full')
+    if data == 'full':
+        return assemble_prompt(segments)
+    projected = []
+    for s in segments:
+        if s['name'] == data_segment:
+            if data == 'omit':
+                continue
+            s = {**s, 'text': data_reference(s['text'], description)}
+        projected.append(s)
+    return assemble_prompt(projected)
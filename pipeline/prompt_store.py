@@ -0,0 +1,300 @@
+"""Versioned, size-capped store for the Whisper prompt.
+
+Critique rewrites ``prompts/whisper_message.txt`` after every run. Every
+revision is kept in a history directory with its token count, so revisions
+can be listed, diffed and rolled back. A hard token cap forces a new
+revision to be consolidated instead of growing without bound; the full
+text is still kept as its own revision, and deterministic trimming drops
+paragraphs from the least important sections first.
+
+Usage:
+    python -m pipeline.prompt_store history
+    python -m pipeline.prompt_store diff 3 5
+    python -m pipeline.prompt_store rollback 3
+    python -m pipeline.prompt_store best
+"""
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import re
+import time
+
+from pipeline.learning_store import section_importance
+from pipeline.tokens import estimate_tokens, CHARS_PER_TOKEN
+
+WHISPER_PROMPT_PATH = "prompts/whisper_message.txt"
+WHISPER_HISTORY_DIR = "prompts/whisper_history"
+
+# Hard cap on the Whisper prompt size
+WHISPER_PROMPT_TOKEN_CAP = 2500
+
+
+_HEADING = re.compile(r"^#{1,6}\s+(?P<title>.+)$")
+
+
+def split_sections(text):
+    """Split a markdown prompt into sections at heading paragraphs.
+
+    Returns:
+        List of (title, paragraphs) pairs; the text before the first heading
+        has title None. A titled section's first paragraph is its heading.
+    """
+    sections = [(None, [])]
+    for paragraph in text.split("\n\n"):
+        match = _HEADING.match(paragraph.strip().split("\n", 1)[0])
+        if match:
+            sections.append((match.group("title").strip("#*: "), []))
+        sections[-1][1].append(paragraph)
+    return [(title, paragraphs) for title, paragraphs in sections if paragraphs]
+
+
+def _join(sections):
+    return "\n\n".join(p for _, paragraphs in sections for p in paragraphs)
+
+
+def trim_to_tokens(text, token_cap):
+    """Cut text to a token budget by dropping whole paragraphs.
+
+    Paragraphs are dropped from the end of the least important section
+    (by ``section_importance`` of its heading, largest section first on
+    ties), so appended sections are not cut just for being last. The text
+    before the first heading goes last, and a titled section whose body is
+    gone loses its heading too.
+    """
+    if estimate_tokens(text) <= token_cap:
+        return text
+
+    sections = split_sections(text)
+
+    def rank(section):
+        title, paragraphs = section
+        importance = float("inf") if title is None else section_importance(title)
+        return importance, -estimate_tokens("\n\n".join(paragraphs))
+
+    while estimate_tokens(_join(sections)) > token_cap:
+        if len(sections) == 1 and len(sections[0][1]) == 1:
+            # A single oversized paragraph: cut it at the character budget
+            return sections[0][1][0][:token_cap * CHARS_PER_TOKEN]
+        section = min(sections, key=rank)
+        title, paragraphs = section
+        paragraphs.pop()
+        if not paragraphs or (title is not None and len(paragraphs) == 1):
+            sections.remove(section)
+    return _join(sections)
+
+
+class PromptStore:
+    """History of prompt revisions with a size cap and rollback.
+
+    Args:
+        prompt_path: File holding the active prompt
+        history_dir: Directory holding one file per revision and a manifest
+        token_cap: Maximum tokens a revision may have
+        consolidator: Optional function taking (text, token_cap) and returning
+            a consolidated prompt, e.g. an agent rewrite. Oversized revisions
+            are trimmed deterministically if it is missing or falls short.
+    """
+
+    def __init__(self, prompt_path=WHISPER_PROMPT_PATH, history_dir=WHISPER_HISTORY_DIR,
+                 token_cap=WHISPER_PROMPT_TOKEN_CAP, consolidator=None):
+        self.prompt_path = prompt_path
+        self.history_dir = history_dir
+        self.token_cap = token_cap
+        self.consolidator = consolidator
+        self.manifest_path = os.path.join(history_dir, "manifest.json")
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        return {'active': None, 'versions': []}
+
+    def _save_manifest(self, manifest):
+        os.makedirs(self.history_dir, exist_ok=True)
+        with open(self.manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    def _version_path(self, version):
+        return os.path.join(self.history_dir, f"v{version:04d}.txt")
+
+    def _write_active(self, text):
+        with open(self.prompt_path, "w") as f:
+            f.write(text)
+
+    def history(self):
+        """Return the metadata of every revision, oldest first."""
+        return self._load_manifest()['versions']
+
+    def active_version(self):
+        """Return the active revision number, or None if there is none."""
+        return self._load_manifest()['active']
+
+    def sync(self):
+        """Record the prompt file as a revision if it is new or was edited by hand.
+
+        Returns:
+            The active revision number
+        """
+        if os.path.exists(self.prompt_path):
+            with open(self.prompt_path, "r") as f:
+                return self.commit(f.read(), note="imported")
+        return self.active_version()
+
+    def read(self, version):
+        """Return the text of a revision."""
+        with open(self._version_path(version), "r") as f:
+            return f.read()
+
+    def consolidate(self, text):
+        """Bring a prompt under the token cap.
+
+        Returns:
+            Tuple of (text within the cap, description of what was done)
+        """
+        tokens = estimate_tokens(text)
+        if tokens <= self.token_cap:
+            return text, None
+
+        if self.consolidator:
+            try:
+                consolidated = self.consolidator(text, self.token_cap).strip()
+                if consolidated and estimate_tokens(consolidated) <= self.token_cap:
+                    return consolidated, f"consolidated from {tokens} tokens"
+                if consolidated:
+                    text = consolidated
+            except Exception as e:
+                print(f"⚠ Warning: Could not consolidate prompt: {e}")
+
+        return trim_to_tokens(text, self.token_cap), f"trimmed from {tokens} tokens"
+
+    def commit(self, text, note=""):
+        """Store a new revision, make it active and write the prompt file.
+
+        A revision over the token cap is stored in full first, then
+        consolidated and stored again as its child, which becomes active.
+        Committing text identical to the active revision, or to the full
+        text it was consolidated from, is a no-op.
+
+        Returns:
+            The active revision number
+        """
+        text = text.strip()
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        manifest = self._load_manifest()
+        active = next((v for v in manifest['versions'] if v['version'] == manifest['active']), None)
+        if active and digest in (active['sha256'], active.get('source_sha256')):
+            return active['version']
+
+        capped, action = self.consolidate(text)
+        if action:
+            print(f"⚠ Whisper prompt over {self.token_cap} tokens: {action}")
+            # Keep the full text so nothing Critique wrote is lost
+            raw_note = f"{note}; over cap" if note else "over cap"
+            manifest['active'] = self._add_version(manifest, text, raw_note)
+            note = f"{note}; {action}" if note else action
+            text = capped
+
+        manifest['active'] = self._add_version(manifest, text, note, source_sha256=digest if action else None)
+        self._save_manifest(manifest)
+        self._write_active(text)
+        return manifest['active']
+
+    def _add_version(self, manifest, text, note, source_sha256=None):
+        """Write a revision file and add it to the manifest as a child of the active revision."""
+        version = max((v['version'] for v in manifest['versions']), default=0) + 1
+        os.makedirs(self.history_dir, exist_ok=True)
+        with open(self._version_path(version), "w") as f:
+            f.write(text)
+
+        manifest['versions'].append({
+            'version': version,
+            'parent': manifest['active'],
+            'created_at': time.time(),
+            'chars': len(text),
+            'tokens': estimate_tokens(text),
+            'sha256': hashlib.sha256(text.encode("utf-8")).hexdigest(),
+            'source_sha256': source_sha256,
+            'note': note,
+            'runs': [],
+        })
+        return version
+
+    def diff(self, old_version, new_version):
+        """Return a unified diff between two revisions."""
+        return "".join(difflib.unified_diff(
+            self.read(old_version).splitlines(keepends=True),
+            self.read(new_version).splitlines(keepends=True),
+            fromfile=f"v{old_version}",
+            tofile=f"v{new_version}",
+        ))
+
+    def rollback(self, version):
+        """Make an earlier revision active again and restore the prompt file."""
+        manifest = self._load_manifest()
+        if not any(v['version'] == version for v in manifest['versions']):
+            raise ValueError(f"Unknown prompt version: {version}")
+        manifest['active'] = version
+        self._save_manifest(manifest)
+        self._write_active(self.read(version))
+        return version
+
+    def record_run(self, version, duration_seconds, succeeded=True):
+        """Record how a pipeline run using a revision performed."""
+        manifest = self._load_manifest()
+        for v in manifest['versions']:
+            if v['version'] == version:
+                v['runs'].append({'duration_seconds': duration_seconds, 'succeeded': succeeded, 'at': time.time()})
+                self._save_manifest(manifest)
+                return
+        raise ValueError(f"Unknown prompt version: {version}")
+
+    def best_version(self):
+        """Return the revision with the fastest mean successful run, smallest first on ties.
+
+        Revisions without a successful run are not considered; returns None
+        if there are none.
+        """
+        scored = []
+        for v in self.history():
+            durations = [r['duration_seconds'] for r in v['runs'] if r['succeeded']]
+            if durations:
+                scored.append((sum(durations) / len(durations), v['tokens'], v['version']))
+        return min(scored)[2] if scored else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and roll back Whisper prompt revisions.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("history", help="List revisions")
+    diff_parser = sub.add_parser("diff", help="Diff two revisions")
+    diff_parser.add_argument("old", type=int)
+    diff_parser.add_argument("new", type=int)
+    rollback_parser = sub.add_parser("rollback", help="Make a revision active")
+    rollback_parser.add_argument("version", type=int)
+    sub.add_parser("best", help="Roll back to the fastest revision")
+    args = parser.parse_args()
+
+    store = PromptStore()
+    if args.command == "history":
+        active = store.active_version()
+        for v in store.history():
+            marker = "*" if v['version'] == active else " "
+            runs = [r['duration_seconds'] for r in v['runs'] if r['succeeded']]
+            mean = f"{sum(runs) / len(runs):.0f}s over {len(runs)} run(s)" if runs else "no runs"
+            print(f"{marker} v{v['version']}: {v['tokens']} tokens, {mean} {v['note']}")
+    elif args.command == "diff":
+        print(store.diff(args.old, args.new))
+    elif args.command == "rollback":
+        print(f"✓ Rolled back to v{store.rollback(args.version)}")
+    elif args.command == "best":
+        best = store.best_version()
+        if best is None:
+            print("⚠ No revision has a successful recorded run")
+        else:
+            print(f"✓ Rolled back to v{store.rollback(best)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Prompt assembly ordered for provider-side prefix caching.
+
+Providers cache prompts by prefix, so a cache hit needs every byte up to the
+reused point to be identical to a previous request. Prompts are therefore
+built from named segments sorted from most to least stable, and the hash of
+each cumulative prefix is recorded so we can see how much of a prompt was
+shared with the previous run.
+"""
+import hashlib
+import json
+import os
+
+# Stability tiers, most stable first
+STABILITY_AGENT = 0      # Agent-level boilerplate that never changes
+STABILITY_SCRIPT = 1     # The template analysis script
+STABILITY_LEARNING = 2   # Learning materials (change when Critique runs)
+STABILITY_DATA = 3       # Dataset content (changes with FILE_PATH)
+STABILITY_RUN = 4        # Per-run content such as Spec's specification
+
+SEGMENT_SEPARATOR = "\n\n"
+
+PREFIX_HASHES_PATH = "outputs/prompt_prefix_hashes.json"
+
+
+def segment(name, text, stability):
+    """Create a named prompt segment with a stability tier."""
+    return {'name': name, 'text': text or "", 'stability': stability}
+
+
+def order_segments(segments):
+    """Sort segments from most to least stable, dropping empty ones.
+
+    The sort is stable, so segments within a tier keep the order given.
+    """
+    return sorted((s for s in segments if s['text'].strip()), key=lambda s: s['stability'])
+
+
+def assemble_prompt(segments):
+    """Join segments into a prompt, most stable first."""
+    return SEGMENT_SEPARATOR.join(s['text'].strip("\n") for s in order_segments(segments))
+
+
+def prefix_hashes(segments):
+    """Return the hash of the prompt prefix ending after each segment.
+
+    Returns:
+        List of dicts with segment name, cumulative character count and the
+        SHA-256 of the prompt up to and including that segment
+    """
+    digest = hashlib.sha256()
+    hashes = []
+    chars = 0
+    for i, s in enumerate(order_segments(segments)):
+        text = (SEGMENT_SEPARATOR if i else "") + s['text'].strip("\n")
+        digest.update(text.encode("utf-8"))
+        chars += len(text)
+        hashes.append({'segment': s['name'], 'chars': chars, 'hash': digest.copy().hexdigest()})
+    return hashes
+
+
+def record_prefix_hashes(prompt_name, segments, path=PREFIX_HASHES_PATH):
+    """Compare a prompt's prefix hashes with the previous run and store them.
+
+    Args:
+        prompt_name: Key for this prompt (e.g. the agent name)
+        segments: Segments the prompt was assembled from
+        path: JSON file holding the hashes of every prompt's last run
+
+    Returns:
+        Dict with the number of leading segments and characters shared with
+        the previous run, and the total segment and character counts
+    """
+    current = prefix_hashes(segments)
+
+    history = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                history = json.load(f)
+        except Exception as e:
+            print(f"⚠ Warning: Could not read prompt prefix hashes: {e}")
+
+    shared_segments = 0
+    shared_chars = 0
+    for previous, now in zip(history.get(prompt_name, []), current):
+        if previous['hash'] != now['hash']:
+            break
+        shared_segments += 1
+        shared_chars = now['chars']
+
+    history[prompt_name] = current
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(history, f, indent=2)
+    except Exception as e:
+        print(f"⚠ Warning: Could not save prompt prefix hashes: {e}")
+
+    return {
+        'shared_segments': shared_segments,
+        'total_segments': len(current),
+        'shared_chars': shared_chars,
+        'total_chars': current[-1]['chars'] if current else 0,
+    }
+
+
+def build_prompt(prompt_name, segments, path=PREFIX_HASHES_PATH):
+    """Assemble a prompt, record its prefix hashes and report prefix reuse."""
+    prompt = assemble_prompt(segments)
+    reuse = record_prefix_hashes(prompt_name, segments, path=path)
+    print(
+        f"✓ {prompt_name} prompt: {reuse['shared_segments']}/{reuse['total_segments']} segments "
+        f"({reuse['shared_chars']}/{reuse['total_chars']} chars) share a prefix with the previous run"
+    )
+    return prompt
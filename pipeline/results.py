@@ -0,0 +1,174 @@
+"""Structured results channel between Dev and the downstream agents.
+
+Dev's code prints one JSON block of results (metrics, tables, figure
+descriptions and findings) between two marker lines. The blocks are pulled
+out of the code_interpreter stdout, validated against ``AnalysisResults``
+and rendered compactly for Quant, so Quant reads the results instead of
+scraping them from code and log output.
+"""
+import json
+from typing import Any, List, Optional, Union
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+RESULTS_START = "=== RESULTS JSON START ==="
+RESULTS_END = "=== RESULTS JSON END ==="
+
+# Rows of each table shown to Quant
+MAX_TABLE_ROWS = 20
+
+RESULTS_INSTRUCTIONS = f"""RESULTS CONTRACT: Finish your code by printing every key result as one JSON object between these two lines:
+{RESULTS_START}
+{{"metrics": [{{"name": "...", "value": 0.0, "unit": "...", "description": "..."}}],
+ "tables": [{{"name": "...", "columns": ["..."], "rows": [["..."]], "description": "..."}}],
+ "figures": [{{"name": "...", "description": "what the figure shows"}}],
+ "findings": ["one sentence per key finding"]}}
+{RESULTS_END}
+Use json.dumps(results, default=str) so numpy values serialize. The next agent reads this block instead of your other output."""
+
+
+class Metric(BaseModel):
+    name: str
+    value: Union[float, int, str, bool, None]
+    unit: Optional[str] = None
+    description: Optional[str] = None
+
+
+class Table(BaseModel):
+    name: str
+    columns: List[str]
+    rows: List[List[Any]] = Field(default_factory=list)
+    description: Optional[str] = None
+
+
+class Figure(BaseModel):
+    name: str
+    description: str
+
+
+class AnalysisResults(BaseModel):
+    metrics: List[Metric] = Field(default_factory=list)
+    tables: List[Table] = Field(default_factory=list)
+    figures: List[Figure] = Field(default_factory=list)
+    findings: List[str] = Field(default_factory=list)
+
+    @field_validator("metrics", mode="before")
+    @classmethod
+    def _metrics_from_mapping(cls, value):
+        # Accept {"name": value} as shorthand for a list of metrics
+        if isinstance(value, dict):
+            return [{'name': name, 'value': v} for name, v in value.items()]
+        return value
+
+    def merge(self, other):
+        """Return these results extended with another block's."""
+        return AnalysisResults(
+            metrics=self.metrics + other.metrics,
+            tables=self.tables + other.tables,
+            figures=self.figures + other.figures,
+            findings=self.findings + other.findings,
+        )
+
+    def is_empty(self):
+        return not (self.metrics or self.tables or self.figures or self.findings)
+
+
+def find_result_blocks(stdout):
+    """Return the raw text of every results block in some stdout."""
+    blocks = []
+    position = 0
+    while True:
+        start = stdout.find(RESULTS_START, position)
+        if start == -1:
+            return blocks
+        end = stdout.find(RESULTS_END, start)
+        if end == -1:
+            # Unterminated block (e.g. the code crashed while printing)
+            blocks.append(stdout[start + len(RESULTS_START):])
+            return blocks
+        blocks.append(stdout[start + len(RESULTS_START):end])
+        position = end + len(RESULTS_END)
+
+
+def strip_result_blocks(stdout):
+    """Remove results blocks from stdout, leaving the rest of the output."""
+    parts = []
+    position = 0
+    while True:
+        start = stdout.find(RESULTS_START, position)
+        if start == -1:
+            parts.append(stdout[position:])
+            break
+        parts.append(stdout[position:start])
+        end = stdout.find(RESULTS_END, start)
+        if end == -1:
+            break
+        position = end + len(RESULTS_END)
+    return "".join(parts).strip("\n")
+
+
+def extract_results(stdouts):
+    """Parse and validate the results blocks printed across executions.
+
+    Args:
+        stdouts: Iterable of stdout strings from code executions
+
+    Returns:
+        Tuple of (merged AnalysisResults or None if no valid block was found,
+        list of error messages for blocks that failed to parse or validate)
+    """
+    results = None
+    errors = []
+    for stdout in stdouts:
+        for block in find_result_blocks(stdout or ""):
+            try:
+                parsed = AnalysisResults.model_validate(json.loads(block))
+            except json.JSONDecodeError as e:
+                errors.append(f"Results block is not valid JSON: {e}")
+                continue
+            except ValidationError as e:
+                errors.append(f"Results block does not match the schema: {e.error_count()} error(s)")
+                continue
+            results = parsed if results is None else results.merge(parsed)
+    return results, errors
+
+
+def _cell(value):
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def render_results(results, max_table_rows=MAX_TABLE_ROWS):
+    """Render results as compact markdown for an agent prompt."""
+    lines = []
+    if results.metrics:
+        lines.append("### Metrics")
+        for m in results.metrics:
+            value = _cell(m.value) + (f" {m.unit}" if m.unit else "")
+            lines.append(f"- {m.name}: {value}" + (f" ({m.description})" if m.description else ""))
+        lines.append("")
+
+    for table in results.tables:
+        lines.append(f"### Table: {table.name}")
+        if table.description:
+            lines.append(table.description)
+        lines.append("| " + " | ".join(_cell(c) for c in table.columns) + " |")
+        lines.append("|" + "---|" * len(table.columns))
+        for row in table.rows[:max_table_rows]:
+            lines.append("| " + " | ".join(_cell(v) for v in row) + " |")
+        if len(table.rows) > max_table_rows:
+            lines.append(f"({len(table.rows) - max_table_rows} more rows not shown)")
+        lines.append("")
+
+    if results.figures:
+        lines.append("### Figures")
+        lines.extend(f"- {f.name}: {f.description}" for f in results.figures)
+        lines.append("")
+
+    if results.findings:
+        lines.append("### Findings")
+        lines.extend(f"- {finding}" for finding in results.findings)
+        lines.append("")
+
+    return "\n".join(lines).strip()
@@ -0,0 +1,149 @@
+"""Row sampling strategies for the sample data tier."""
+import numpy as np
+import pandas as pd
+
+# Upper bound on clusters used by representative sampling
+MAX_SAMPLE_CLUSTERS = 50
+
+
+def random_sample(df, sample_size, random_seed=42):
+    """Return a uniform random sample of up to ``sample_size`` rows."""
+    if len(df) <= sample_size:
+        return df
+    return df.sample(n=sample_size, random_state=random_seed)
+
+
+def allocate_quotas(cluster_sizes, budget):
+    """Split a row budget across clusters.
+
+    Every cluster first gets one row (its medoid) so rare viewpoints are
+    always represented. The rest of the budget is shared in proportion to
+    cluster size using largest remainders, never exceeding a cluster's size.
+
+    Args:
+        cluster_sizes: Array of cluster sizes
+        budget: Total number of rows to pick
+
+    Returns:
+        Integer array of rows to pick from each cluster
+    """
+    sizes = np.asarray(cluster_sizes, dtype=np.int64)
+    quotas = np.minimum(sizes, 1)
+    remaining = budget - quotas.sum()
+
+    while remaining > 0:
+        capacity = sizes - quotas
+        if capacity.sum() == 0:
+            break
+        share = remaining * capacity / capacity.sum()
+        extra = np.minimum(np.floor(share).astype(np.int64), capacity)
+        if extra.sum() == 0:
+            # Hand out the last rows by largest remainder
+            order = np.argsort(-(share - np.floor(share)), kind="stable")
+            for idx in order[:remaining]:
+                if capacity[idx] > 0:
+                    extra[idx] = 1
+        quotas += extra
+        remaining = budget - quotas.sum()
+
+    return quotas
+
+
+def representative_sample(df, sample_size, text_column='position_text', embed=None, n_clusters=None, random_seed=42):
+    """Sample rows that cover the range of viewpoints in a text column.
+
+    Texts are embedded and clustered with K-means. Each cluster contributes
+    its medoid (the text closest to the centroid) plus a quota proportional
+    to its size; the other rows of a quota are drawn at random from the
+    cluster, skipping exact duplicate texts.
+
+    Args:
+        df: DataFrame to sample from
+        sample_size: Maximum number of rows in the sample
+        text_column: Column holding the text to embed
+        embed: Function mapping a list of texts to a list of vectors.
+            Defaults to ``consensus_metrics.embeddings_model``.
+        n_clusters: Number of clusters. Defaults to about sqrt(rows / 2).
+        random_seed: Seed for clustering and within-cluster draws
+
+    Returns:
+        Tuple of (sample DataFrame with 'sample_cluster' and 'sample_weight'
+        columns, manifest dict describing every cluster)
+    """
+    from sklearn.cluster import KMeans
+    from sklearn.metrics import pairwise_distances_argmin_min
+
+    if embed is None:
+        from generated_code.consensus_metrics import embeddings_model
+        embed = embeddings_model
+
+    candidates = df[df[text_column].notna()]
+    sample_size = min(sample_size, len(candidates))
+
+    if n_clusters is None:
+        n_clusters = int(round(np.sqrt(len(candidates) / 2)))
+    n_clusters = max(1, min(n_clusters, sample_size, MAX_SAMPLE_CLUSTERS))
+
+    embeddings = np.asarray(embed(candidates[text_column].astype(str).tolist()), dtype=np.float32)
+    kmeans = KMeans(n_clusters=n_clusters, random_state=random_seed, n_init=10)
+    labels = kmeans.fit_predict(embeddings)
+    medoids, _ = pairwise_distances_argmin_min(kmeans.cluster_centers_, embeddings)
+
+    sizes = np.bincount(labels, minlength=n_clusters)
+    quotas = allocate_quotas(sizes, sample_size)
+    rng = np.random.default_rng(random_seed)
+    normalized = candidates[text_column].astype(str).str.lower().str.split().str.join(" ").to_numpy()
+
+    picked = []
+    clusters = []
+    for cluster_id in range(n_clusters):
+        members = np.flatnonzero(labels == cluster_id)
+        medoid = medoids[cluster_id] if labels[medoids[cluster_id]] == cluster_id else members[0]
+        chosen = [medoid]
+        seen = {normalized[medoid]}
+
+        for idx in rng.permutation(members):
+            if len(chosen) >= quotas[cluster_id]:
+                break
+            if idx == medoid or normalized[idx] in seen:
+                continue
+            chosen.append(idx)
+            seen.add(normalized[idx])
+
+        picked.extend(chosen)
+        clusters.append({
+            'cluster': cluster_id,
+            'size': int(sizes[cluster_id]),
+            'sampled': len(chosen),
+            'weight': sizes[cluster_id] / len(chosen),
+            'medoid_index': candidates.index[medoid],
+        })
+
+    sample = candidates.iloc[picked].copy()
+    sample['sample_cluster'] = labels[picked]
+    sample['sample_weight'] = [clusters[c]['weight'] for c in labels[picked]]
+
+    manifest = {
+        'strategy': 'representative',
+        'total_rows': len(df),
+        'excluded_null_text': len(df) - len(candidates),
+        'sample_size': len(sample),
+        'clusters': clusters,
+    }
+    return sample, manifest
+
+
+def format_sample_manifest(manifest):
+    """Format a sampling manifest as a small plain-text table for Dev."""
+    lines = [
+        f"Sampling manifest ({manifest['strategy']}): {manifest['sample_size']} rows from {manifest['total_rows']}"
+        f" in {len(manifest['clusters'])} embedding clusters.",
+        "Each row carries 'sample_cluster' and 'sample_weight' (cluster size / rows sampled from it);"
+        " weight rows by 'sample_weight' to estimate full-dataset proportions.",
+        "cluster | size | sampled | weight",
+    ]
+    for c in manifest['clusters']:
+        lines.append(f"{c['cluster']} | {c['size']} | {c['sampled']} | {c['weight']:.2f}")
+    if manifest['excluded_null_text']:
+        lines.append(f"{manifest['excluded_null_text']} rows with empty text were not sampled.")
+    return "\n".join(lines)
@@ -0,0 +1,146 @@
+"""Schema-validated JSON outputs for Whisper and Critique.
+
+Instead of splitting Whisper's output on ``PROMPT FOR QUANT`` and finding
+Critique's sections by their headings, both agents can be asked for JSON
+matching a pydantic schema (sent as a JSON-schema response format). If the
+reply doesn't validate, the validation errors are sent back in the same
+conversation for one repair attempt, rather than re-running the pipeline.
+"""
+import json
+import re
+
+from pydantic import BaseModel, Field, ValidationError
+
+AGENTS = ("whisper", "spec", "dev", "quant")
+
+_JSON_FENCE = re.compile(r"^```(?:json)?\s*\n(.*?)\n?```\s*$", re.DOTALL)
+
+
+class StructuredOutputError(Exception):
+    """Raised when an agent's reply still fails validation after the repair attempt."""
+
+
+class WhisperOutput(BaseModel):
+    spec_prompt: str = Field(min_length=1, description="The complete prompt for Spec")
+    quant_prompt: str = Field(min_length=1, description="The complete prompt for Quant")
+
+
+class AgentFeedback(BaseModel):
+    learning_materials: str = Field("", description="Markdown learning materials for the agent")
+    prompt_suggestions: str = Field("", description="Markdown suggestions for the agent's prompt")
+
+
+class CritiqueOutput(BaseModel):
+    assessment: str = Field("", description="Markdown audit of the run")
+    whisper: AgentFeedback
+    spec: AgentFeedback
+    dev: AgentFeedback
+    quant: AgentFeedback
+    updated_whisper_prompt: str = Field(min_length=1, description="The complete updated prompt for Whisper")
+
+    def sections(self):
+        """Return the output in the shape of ``critique_parsing.parse_critique``."""
+        feedback = {agent: getattr(self, agent) for agent in AGENTS}
+        return {
+            'learning': {a: f.learning_materials.strip() for a, f in feedback.items() if f.learning_materials.strip()},
+            'whisper_prompt': self.updated_whisper_prompt.strip(),
+            'suggestions': {a: f.prompt_suggestions.strip() for a, f in feedback.items()
+                            if a != "whisper" and f.prompt_suggestions.strip()},
+        }
+
+    def to_markdown(self):
+        """Render the output with the headings of the free-text Critique format."""
+        parts = [self.assessment.strip(), "## LEARNING MATERIALS"]
+        for agent in AGENTS:
+            parts += [f"### {agent.title()} Learning Materials", getattr(self, agent).learning_materials.strip()]
+        parts += ["## UPDATED PROMPTS", "### Updated Whisper Prompt", self.updated_whisper_prompt.strip()]
+        for agent in AGENTS[1:]:
+            parts += [f"### {agent.title()} Prompt Suggestions", getattr(self, agent).prompt_suggestions.strip()]
+        return "\n\n".join(part for part in parts if part) + "\n"
+
+
+def response_format(model):
+    """Return completion args requesting JSON that matches a pydantic model.
+
+    The schema is not sent in strict mode: pydantic leaves fields with
+    defaults out of 'required', which strict mode can reject. Replies are
+    validated with pydantic instead, with one repair attempt.
+    """
+    return {
+        'response_format': {
+            'type': 'json_schema',
+            'json_schema': {'name': model.__name__, 'schema': model.model_json_schema()},
+        }
+    }
+
+
+def schema_instructions(model):
+    """Return prompt text asking for a JSON reply matching a pydantic model."""
+    schema = json.dumps(model.model_json_schema(), indent=2)
+    return f"Respond with a single JSON object, and nothing else, matching this JSON schema:\n\n```json\n{schema}\n```"
+
+
+def parse_output(text, model):
+    """Parse and validate a JSON reply, tolerating a surrounding code fence.
+
+    Raises:
+        ValueError: If the text is not JSON
+        ValidationError: If the JSON does not match the model
+    """
+    text = text.strip()
+    fenced = _JSON_FENCE.match(text)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Reply is not valid JSON: {e}") from e
+    return model.model_validate(data)
+
+
+def response_text(response):
+    """Join the text content of a conversation response's outputs."""
+    return "\n".join(str(output.content) for output in response.outputs if getattr(output, 'content', None))
+
+
+def repair_prompt(error):
+    """Return the message asking an agent to fix a reply that failed validation."""
+    if isinstance(error, ValidationError):
+        problems = "\n".join(f"- {'.'.join(str(p) for p in e['loc']) or 'reply'}: {e['msg']}" for e in error.errors())
+    else:
+        problems = f"- {error}"
+    return ("Your previous reply did not match the required JSON schema:\n"
+            f"{problems}\n\nReply again with only the corrected JSON object.")
+
+
+def request_structured(client, agent_id, inputs, model):
+    """Start a conversation and return its reply validated against a model.
+
+    On a validation failure the errors are sent back in the same
+    conversation for one repair attempt.
+
+    Returns:
+        Tuple of (validated model instance, raw reply text)
+
+    Raises:
+        StructuredOutputError: If the repaired reply still fails validation
+    """
+    completion_args = response_format(model)
+    response = client.beta.conversations.start(agent_id=agent_id, inputs=inputs, completion_args=completion_args)
+    text = response_text(response)
+    try:
+        return parse_output(text, model), text
+    except (ValueError, ValidationError) as e:
+        print(f"⚠ Warning: {model.__name__} reply failed validation, asking for a repair: {e}")
+        error = e
+
+    response = client.beta.conversations.append(
+        conversation_id=response.conversation_id,
+        inputs=repair_prompt(error),
+        completion_args=completion_args,
+    )
+    text = response_text(response)
+    try:
+        return parse_output(text, model), text
+    except (ValueError, ValidationError) as e:
+        raise StructuredOutputError(f"{model.__name__} reply failed validation after repair: {e}") from e
@@ -0,0 +1,196 @@
+"""Vectorized profiling of free-text columns for the summary data tier.
+
+Every text column is profiled in a single pass over fixed-size row chunks.
+Token and n-gram frequencies go into a count-min sketch and vocabulary size
+is estimated from the k smallest token hashes, so memory stays bounded no
+matter how many rows or distinct words the dataset has.
+"""
+import numpy as np
+import pandas as pd
+
+# Count-min sketch dimensions (error ~ e/width, failure probability ~ e^-depth)
+SKETCH_WIDTH = 2 ** 16
+SKETCH_DEPTH = 4
+
+# Number of smallest hashes kept for the vocabulary size estimate
+KMV_SIZE = 4096
+
+# Rows tokenized at a time, and heavy-hitter candidates kept between chunks
+PROFILE_CHUNK_ROWS = 20000
+CANDIDATE_POOL = 500
+
+TOKEN_PATTERN = r"[a-z0-9']+"
+
+# 16-character keys giving independent hash functions for the sketch rows
+HASH_KEYS = [f"cms-row-{i:08d}" for i in range(SKETCH_DEPTH)]
+
+
+def _hash(values, key="0123456789123456"):
+    """Hash an array of strings to uint64 with a given 16-character key."""
+    return pd.util.hash_array(np.asarray(values, dtype=object), hash_key=key, categorize=False)
+
+
+class CountMinSketch:
+    """Fixed-memory frequency estimator for a stream of string items."""
+
+    def __init__(self, width=SKETCH_WIDTH, depth=SKETCH_DEPTH):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+
+    def _columns(self, items):
+        return [_hash(items, HASH_KEYS[row]) % self.width for row in range(self.depth)]
+
+    def add(self, items, counts=None):
+        """Add items (with optional per-item counts) to the sketch."""
+        if len(items) == 0:
+            return
+        counts = np.ones(len(items), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        for row, cols in enumerate(self._columns(items)):
+            np.add.at(self.table[row], cols.astype(np.int64), counts)
+
+    def estimate(self, items):
+        """Return the estimated count of each item (never an undercount)."""
+        if len(items) == 0:
+            return np.zeros(0, dtype=np.int64)
+        rows = [self.table[row][cols.astype(np.int64)] for row, cols in enumerate(self._columns(items))]
+        return np.min(rows, axis=0)
+
+
+class _HeavyHitters:
+    """Count-min sketch plus a bounded pool of candidate frequent items."""
+
+    def __init__(self):
+        self.sketch = CountMinSketch()
+        self.candidates = set()
+
+    def update(self, items):
+        counts = pd.Series(items).value_counts()
+        self.sketch.add(counts.index.to_numpy(), counts.to_numpy())
+        pool = list(self.candidates | set(counts.index[:CANDIDATE_POOL]))
+        estimates = self.sketch.estimate(pool)
+        keep = np.argsort(-estimates)[:CANDIDATE_POOL]
+        self.candidates = {pool[i] for i in keep}
+
+    def top(self, n):
+        pool = sorted(self.candidates)
+        estimates = self.sketch.estimate(pool)
+        order = np.argsort(-estimates, kind="stable")[:n]
+        return [(pool[i], int(estimates[i])) for i in order]
+
+
+class _DistinctCounter:
+    """K-minimum-values estimator of the number of distinct items."""
+
+    def __init__(self, k=KMV_SIZE):
+        self.k = k
+        self.minima = np.zeros(0, dtype=np.uint64)
+
+    def update(self, items):
+        hashes = np.unique(np.concatenate([self.minima, _hash(items)]))
+        self.minima = hashes[:self.k]
+
+    def estimate(self):
+        if len(self.minima) < self.k:
+            return len(self.minima)
+        kth = self.minima[-1] / float(np.iinfo(np.uint64).max)
+        return int((self.k - 1) / kth)
+
+
+def text_columns(df):
+    """Return the names of free-text columns (string or object, not category)."""
+    return [
+        col for col in df.columns
+        if pd.api.types.is_string_dtype(df[col].dtype) and not isinstance(df[col].dtype, pd.CategoricalDtype)
+    ]
+
+
+def profile_text_column(series, top_n=15, chunk_rows=PROFILE_CHUNK_ROWS):
+    """Profile one text column.
+
+    Args:
+        series: Text Series
+        top_n: Number of top unigrams and bigrams to report
+        chunk_rows: Rows tokenized at a time
+
+    Returns:
+        Dict with counts, length distribution, token statistics, approximate
+        vocabulary size, top unigrams/bigrams and the duplicate rate
+    """
+    text = series.dropna().astype(str).reset_index(drop=True)
+    lengths = text.str.len()
+
+    unigrams = _HeavyHitters()
+    bigrams = _HeavyHitters()
+    vocabulary = _DistinctCounter()
+    text_hashes = []
+    total_tokens = 0
+
+    for start in range(0, len(text), chunk_rows):
+        chunk = text.iloc[start:start + chunk_rows].str.lower()
+        text_hashes.append(_hash(chunk.str.split().str.join(" ").to_numpy()))
+
+        tokens = chunk.str.findall(TOKEN_PATTERN)
+        flat = tokens.explode().dropna()
+        if flat.empty:
+            continue
+        total_tokens += len(flat)
+        words = flat.to_numpy(dtype=object)
+        unigrams.update(words)
+        vocabulary.update(words)
+
+        # Pair each token with the next one from the same row
+        doc_ids = flat.index.to_numpy()
+        same_doc = doc_ids[:-1] == doc_ids[1:]
+        pairs = words[:-1][same_doc] + " " + words[1:][same_doc]
+        bigrams.update(pairs)
+
+    non_null = len(text)
+    distinct_texts = len(np.unique(np.concatenate(text_hashes))) if text_hashes else 0
+    quantiles = lengths.quantile([0.05, 0.25, 0.5, 0.75, 0.95]) if non_null else pd.Series(dtype=float)
+
+    return {
+        'non_null': int(non_null),
+        'null': int(series.isna().sum()),
+        'length': {
+            'mean': float(lengths.mean()) if non_null else 0.0,
+            'min': int(lengths.min()) if non_null else 0,
+            'max': int(lengths.max()) if non_null else 0,
+            'quantiles': {f"p{int(q * 100)}": float(v) for q, v in quantiles.items()},
+        },
+        'tokens': {
+            'total': int(total_tokens),
+            'mean_per_text': total_tokens / non_null if non_null else 0.0,
+        },
+        'approx_vocabulary': vocabulary.estimate(),
+        'top_unigrams': unigrams.top(top_n),
+        'top_bigrams': bigrams.top(top_n),
+        'duplicate_rate': 1 - distinct_texts / non_null if non_null else 0.0,
+    }
+
+
+def profile_text_columns(df, columns=None, top_n=15):
+    """Profile every text column of a DataFrame.
+
+    Returns:
+        Dict mapping column name to its profile (see ``profile_text_column``)
+    """
+    columns = text_columns(df) if columns is None else columns
+    return {col: profile_text_column(df[col], top_n=top_n) for col in columns}
+
+
+def format_text_profile(profiles):
+    """Format text column profiles as a compact plain-text summary."""
+    parts = []
+    for col, p in profiles.items():
+        length = p['length']
+        quantiles = ", ".join(f"{k}={v:.0f}" for k, v in length['quantiles'].items())
+        parts.append(f"\nText Column ('{col}') Profile:")
+        parts.append(f"  - Non-null: {p['non_null']}, Null: {p['null']}")
+        parts.append(f"  - Length (chars): mean={length['mean']:.1f}, min={length['min']}, max={length['max']}, {quantiles}")
+        parts.append(f"  - Tokens: {p['tokens']['total']} total, {p['tokens']['mean_per_text']:.1f} per text")
+        parts.append(f"  - Approx. vocabulary size: {p['approx_vocabulary']}")
+        parts.append(f"  - Duplicate rate: {p['duplicate_rate']:.1%}")
+        parts.append("  - Top unigrams: " + ", ".join(f"{w} ({c})" for w, c in p['top_unigrams']))
+        parts.append("  - Top bigrams: " + ", ".join(f"{w} ({c})" for w, c in p['top_bigrams']))
+    return "\n".join(parts)
@@ -0,0 +1,12 @@
+"""Cheap token estimates for prompt budgeting."""
+import math
+
+# Average characters per token for English prose and code with Mistral tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Estimate the number of tokens in a string without calling a tokenizer."""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
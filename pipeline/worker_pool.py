@@ -0,0 +1,477 @@
+"""Pool of warm Python workers for running generated analysis code.
+
+A fresh ``python analysis.py`` spends seconds importing pandas, sklearn,
+scipy, seaborn, textblob and nltk before any analysis starts. This pool
+pays that once. A pool server (``python -m pipeline.worker_pool --serve``,
+started in the background) imports the libraries and loads the NLTK
+corpora, then keeps workers forked from itself ready ahead of time. Up to
+that many jobs run at once, each as ``__main__`` in a fresh namespace inside
+a worker that is retired after the one job, so no state leaks between jobs.
+The server enforces each job's wall-clock limit by killing its worker, and
+forks a replacement as soon as a worker is retired.
+
+The pool pays off when one long-lived client runs many scripts: batches of
+scripts from the command line, or a service that keeps a ``WarmWorkerPool``
+open. A single pipeline run executes one script, so ``main.py`` runs it with
+``local_executor.run_script`` instead.
+
+The server is a separate process rather than a fork of the caller, so the
+pipeline's own state (clients, threads) is never copied into a worker.
+Forking needs a POSIX system; elsewhere ``run_script`` falls back to
+``local_executor.run_script``.
+
+Usage:
+    python -m pipeline.worker_pool generated_code/analysis.py --data data.csv --workers 2
+"""
+import argparse
+import builtins
+import io
+import json
+import os
+import pickle
+import select
+import signal
+import subprocess
+import sys
+import time
+import traceback
+from collections import deque
+from contextlib import redirect_stdout, redirect_stderr
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; limits other than the timeout are skipped
+    resource = None
+
+from pipeline.local_executor import (
+    DATA_PATH_ENV,
+    LOCAL_EXECUTION_LIMITS,
+    _PACKAGE_ROOT,
+    _snapshot,
+    run_script as run_subprocess,
+)
+
+# Imported by the pool server before it forks workers (missing ones are skipped)
+WARM_MODULES = (
+    "pandas", "numpy", "matplotlib.pyplot", "seaborn", "scipy.stats",
+    "sklearn.feature_extraction.text", "sklearn.cluster", "sklearn.decomposition",
+    "sklearn.metrics", "textblob", "nltk",
+)
+
+# NLTK resources loaded up front (missing ones are skipped, never downloaded)
+NLTK_CORPORA = ("stopwords", "wordnet")
+
+# Seconds to wait for the server to import everything and report ready
+WARM_UP_TIMEOUT = 300
+
+# Extra seconds a client waits for a reply beyond the jobs' own timeouts
+# before it assumes the server is stuck
+REPLY_GRACE = 30
+
+POOL_SUPPORTED = hasattr(os, "fork")
+
+
+def warm_up(modules=WARM_MODULES, corpora=NLTK_CORPORA):
+    """Import the analysis libraries and load NLTK data in this process.
+
+    Returns:
+        List of the modules that could be imported
+    """
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    imported = []
+    for name in modules:
+        try:
+            __import__(name)
+            imported.append(name)
+        except ImportError:
+            pass
+
+    if "nltk" in imported:
+        import nltk
+        for name in corpora:
+            try:
+                getattr(nltk.corpus, name).fileids()
+            except (LookupError, AttributeError, OSError):
+                pass
+        try:
+            nltk.word_tokenize("warm up")
+        except LookupError:
+            pass
+    return imported
+
+
+def _cpu_limit_exceeded(signum, frame):
+    raise RuntimeError("CPU time limit exceeded")
+
+
+def _apply_limits(limits):
+    """Limit the worker's CPU time and address space for one job."""
+    if resource is None:
+        return
+    if limits['cpu_seconds']:
+        signal.signal(signal.SIGXCPU, _cpu_limit_exceeded)
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft = int(usage.ru_utime + usage.ru_stime) + limits['cpu_seconds']
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft if hard == resource.RLIM_INFINITY else min(soft, hard), hard))
+    if limits['memory_mb']:
+        soft = limits['memory_mb'] * 1024 * 1024
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (soft if hard == resource.RLIM_INFINITY else min(soft, hard), hard))
+
+
+def _run_job(script_path, code, data_path, output_dir, limits):
+    """Run code as ``__main__`` in a fresh namespace, capturing its output.
+
+    Runs in a single-use worker, so changes to the working directory,
+    environment and modules die with it.
+    """
+    _apply_limits(limits)
+    os.chdir(output_dir)
+    os.environ[DATA_PATH_ENV] = data_path
+    sys.argv = [script_path]
+    sys.path.insert(0, os.path.dirname(script_path))
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    namespace = {'__name__': "__main__", '__file__': script_path, '__builtins__': builtins}
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            exec(compile(code, script_path, "exec"), namespace)
+            returncode = 0
+        except SystemExit as e:
+            returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException:
+            traceback.print_exc()
+            returncode = 1
+    return stdout.getvalue(), stderr.getvalue(), returncode
+
+
+def _fork_worker():
+    """Fork a warm worker that waits for a single job on a pipe.
+
+    Returns:
+        Tuple of the worker's pid, the pipe to send its job on and the pipe
+        its result comes back on
+    """
+    job_read, job_write = os.pipe()
+    result_read, result_write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(job_write)
+        os.close(result_read)
+        try:
+            with os.fdopen(job_read, "rb") as f:
+                job = pickle.load(f)
+            reply = _run_job(job['script_path'], job['code'], job['data_path'], job['output_dir'], job['limits'])
+            with os.fdopen(result_write, "wb") as f:
+                pickle.dump(reply, f)
+        finally:
+            os._exit(0)
+    os.close(job_read)
+    os.close(result_write)
+    return pid, job_write, result_read
+
+
+def _start_job(worker, job):
+    """Send a job to a forked worker without waiting for it."""
+    pid, job_write, result_read = worker
+    with os.fdopen(job_write, "wb") as f:
+        pickle.dump(job, f)
+    return pid, result_read
+
+
+def _collect(pid, result_read):
+    """Read a finished worker's result and reap it."""
+    with os.fdopen(result_read, "rb") as f:
+        data = f.read()
+    _, status = os.waitpid(pid, 0)
+    if data:
+        return pickle.loads(data)
+    # The worker died without replying, e.g. killed for going over a hard limit
+    return "", f"Worker exited with status {status}\n", -os.WTERMSIG(status) if os.WIFSIGNALED(status) else 1
+
+
+def serve(workers):
+    """Run the pool server: read JSON jobs from stdin, write results to stdout.
+
+    Up to ``workers`` jobs run at once; further jobs wait for a worker.
+    Replies carry the job's 'id' and are sent as jobs finish, so they may
+    arrive out of order.
+    """
+    # Keep the real stdout for the protocol; anything else printed goes to stderr
+    protocol = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+
+    def send(message):
+        protocol.write(json.dumps(message) + "\n")
+        protocol.flush()
+
+    imported = warm_up()
+    # One job per worker: every job gets a freshly forked, already warm process.
+    # Workers are forked here, from the server's only thread, so no lock held by
+    # another thread can be copied into a worker in its locked state.
+    ready = [_fork_worker() for _ in range(workers)]
+    send({'ready': True, 'modules': imported})
+
+    queue = deque()
+    busy = {}  # result pipe -> (job id, worker pid, start time, deadline)
+    buffer = b""
+    stdin_open = True
+    try:
+        while stdin_open or queue or busy:
+            while queue and ready:
+                job = queue.popleft()
+                pid, result_read = _start_job(ready.pop(0), job)
+                timeout = job['limits'].get('timeout_seconds')
+                start = time.monotonic()
+                busy[result_read] = (job['id'], pid, start, start + timeout if timeout else None)
+
+            deadlines = [deadline for _, _, _, deadline in busy.values() if deadline is not None]
+            wait = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            readable, _, _ = select.select(([0] if stdin_open else []) + list(busy), [], [], wait)
+
+            for fd in readable:
+                if fd == 0:
+                    # Read stdin unbuffered so select never misses a buffered job
+                    data = os.read(0, 65536)
+                    if not data:
+                        stdin_open = False
+                    buffer += data
+                    *lines, buffer = buffer.split(b"\n")
+                    queue.extend(json.loads(line) for line in lines if line.strip())
+                    continue
+                job_id, pid, start, _ = busy.pop(fd)
+                try:
+                    stdout, stderr, returncode = _collect(pid, fd)
+                except Exception:
+                    stdout, stderr, returncode = "", traceback.format_exc(), 1
+                send({'id': job_id, 'stdout': stdout, 'stderr': stderr, 'returncode': returncode,
+                      'timed_out': False, 'duration_seconds': time.monotonic() - start})
+                ready.append(_fork_worker())
+
+            now = time.monotonic()
+            for fd, (job_id, pid, start, deadline) in list(busy.items()):
+                if deadline is not None and deadline <= now:
+                    os.kill(pid, signal.SIGKILL)
+                    os.waitpid(pid, 0)
+                    os.close(fd)
+                    del busy[fd]
+                    send({'id': job_id, 'stdout': "", 'stderr': "", 'returncode': None,
+                          'timed_out': True, 'duration_seconds': now - start})
+                    ready.append(_fork_worker())
+    finally:
+        for pid, job_write, result_read in ready:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            os.close(job_write)
+            os.close(result_read)
+        for fd, (_, pid, _, _) in busy.items():
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            os.close(fd)
+
+
+class WarmWorkerPool:
+    """Client for a pool server with the analysis libraries already imported.
+
+    The server is started on first use (or by ``start()``) and reused for
+    every job until ``close()``.
+
+    Args:
+        workers: Number of workers the server keeps forked and ready
+        limits: Default limits per job, as in ``LOCAL_EXECUTION_LIMITS``
+    """
+
+    def __init__(self, workers=2, limits=None):
+        self.workers = workers
+        self.limits = {**LOCAL_EXECUTION_LIMITS, **(limits or {})}
+        self._server = None
+        self._buffer = b""
+
+    def _receive(self, timeout):
+        """Read one message from the server, or None if none arrives in time.
+
+        The pipe is read with os.read into our own line buffer: a buffered
+        readline could pull several replies into the file object's buffer,
+        where select can no longer see them.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while b"\n" not in self._buffer:
+            wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self._server.stdout], [], [], wait)
+            if not ready:
+                return None
+            data = os.read(self._server.stdout.fileno(), 65536)
+            if not data:
+                raise RuntimeError(f"Worker pool server exited with code {self._server.wait()}")
+            self._buffer += data
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def _ensure_server(self):
+        if self._server is not None:
+            return
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [_PACKAGE_ROOT, env.get("PYTHONPATH")]))
+        self._server = subprocess.Popen(
+            [sys.executable, "-m", "pipeline.worker_pool", "--serve", "--workers", str(self.workers)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            env=env,
+            start_new_session=True,
+        )
+        if self._receive(WARM_UP_TIMEOUT) is None:
+            self.close()
+            raise RuntimeError(f"Worker pool did not warm up within {WARM_UP_TIMEOUT} seconds")
+
+    def start(self):
+        """Start the server and wait until its workers are warm.
+
+        Returns:
+            Seconds spent warming up
+        """
+        start = time.perf_counter()
+        self._ensure_server()
+        return time.perf_counter() - start
+
+    def run_scripts(self, jobs, data_path, limits=None):
+        """Run several scripts in warm workers, up to ``workers`` at a time.
+
+        Args:
+            jobs: List of (script_path, output_dir) pairs
+            data_path: Dataset file exposed to every script as ``DATA_FILE_PATH``
+            limits: Limits per job, as in ``LOCAL_EXECUTION_LIMITS``
+
+        Returns:
+            List of execution dicts in the order of ``jobs``, each like the
+            one returned by ``local_executor.run_script``
+        """
+        if not POOL_SUPPORTED:
+            return [run_subprocess(script_path, data_path, output_dir, limits=limits)
+                    for script_path, output_dir in jobs]
+
+        limits = {**self.limits, **(limits or {})}
+        self._ensure_server()
+
+        snapshots = []
+        for job_id, (script_path, output_dir) in enumerate(jobs):
+            script_path = os.path.abspath(script_path)
+            with open(script_path, "r") as f:
+                code = f.read()
+            os.makedirs(output_dir, exist_ok=True)
+            snapshots.append(_snapshot(output_dir))
+            job = {
+                'id': job_id,
+                'script_path': script_path,
+                'code': code,
+                'data_path': os.path.abspath(data_path) if data_path else "",
+                'output_dir': os.path.abspath(output_dir),
+                'limits': limits,
+            }
+            self._server.stdin.write(json.dumps(job) + "\n")
+        self._server.stdin.flush()
+
+        # The server times out each job; jobs queued behind others wait longer
+        rounds = -(-len(jobs) // self.workers)
+        wait = limits['timeout_seconds'] * rounds + REPLY_GRACE if limits['timeout_seconds'] else None
+        replies = {}
+        while len(replies) < len(jobs):
+            reply = self._receive(wait)
+            if reply is None:
+                # The server is stuck; stop it and its workers
+                self.close(force=True)
+                break
+            replies[reply['id']] = reply
+
+        executions = []
+        for job_id, (_, output_dir) in enumerate(jobs):
+            reply = replies.get(job_id, {'stdout': "", 'stderr': "", 'returncode': None,
+                                         'timed_out': True, 'duration_seconds': wait})
+            returncode = reply['returncode']
+            if reply['timed_out']:
+                result = f"Timed out after {limits['timeout_seconds']} seconds"
+            else:
+                result = None if returncode == 0 else f"Process exited with code {returncode}"
+
+            after = _snapshot(output_dir)
+            executions.append({
+                'stdout': reply['stdout'],
+                'stderr': reply['stderr'],
+                'result': result,
+                'returncode': returncode,
+                'duration_seconds': reply['duration_seconds'],
+                'artifacts': sorted(path for path, mtime in after.items() if snapshots[job_id].get(path) != mtime),
+            })
+        return executions
+
+    def run_script(self, script_path, data_path, output_dir, limits=None):
+        """Run a script in a warm worker.
+
+        Takes the same arguments and returns the same dict as
+        ``local_executor.run_script``, so it can replace it (e.g. as the
+        runner of ``execution_cache.cached_run``).
+        """
+        return self.run_scripts([(script_path, output_dir)], data_path, limits=limits)[0]
+
+    def run_code(self, code, data_path, output_dir, limits=None, script_name="analysis.py"):
+        """Write code into the output directory and run it with ``run_script``."""
+        os.makedirs(output_dir, exist_ok=True)
+        script_path = os.path.join(output_dir, script_name)
+        with open(script_path, "w") as f:
+            f.write(code)
+        return self.run_script(script_path, data_path, output_dir, limits=limits)
+
+    def close(self, force=False):
+        """Stop the server and its workers."""
+        if self._server is None:
+            return
+        server, self._server = self._server, None
+        self._buffer = b""
+        if not force:
+            server.stdin.close()
+            try:
+                server.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                force = True
+        if force:
+            try:
+                os.killpg(server.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            server.wait()
+        server.stdout.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run analysis scripts in a pool of warm workers.")
+    parser.add_argument("scripts", nargs="*", help="Scripts to run")
+    parser.add_argument("--data", help="Dataset file passed to the scripts as DATA_FILE_PATH")
+    parser.add_argument("--output", default="outputs/runs/pool", help="Directory for the runs and their artifacts")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.workers)
+        return
+
+    with WarmWorkerPool(args.workers) as pool:
+        print(f"✓ Warmed {args.workers} worker(s) in {pool.start():.1f}s")
+        jobs = [(script, os.path.join(args.output, os.path.splitext(os.path.basename(script))[0]))
+                for script in args.scripts]
+        for (script, output_dir), execution in zip(jobs, pool.run_scripts(jobs, args.data)):
+            status = execution['result'] or "ok"
+            print(f"  {script}: {status} in {execution['duration_seconds']:.2f}s, "
+                  f"{len(execution['artifacts'])} artifact(s) in {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -194,3 +194,20 @@ Consider these improvements for Dev prompts.
 
 Consider these improvements for Quant prompts.
 """
+
+
+@pytest.fixture
+def sample_consultation_csv(temp_dir):
+    """Create a CSV shaped like a consultation export."""
+    data = {
+        'participant': [f'P{i % 12}' for i in range(2000)],
+        'question': [f'Q{i % 4}' for i in range(2000)],
+        'position_type': ['support' if i % 3 else 'oppose' for i in range(2000)],
+        'strength': [['weak', 'moderate', 'strong'][i % 3] for i in range(2000)],
+        'position_text': [f'Position {i}: the proposal should consider option {i % 7} carefully' for i in range(2000)],
+        'round_number': [i % 3 for i in range(2000)]
+    }
+    df = pd.DataFrame(data)
+    csv_path = os.path.join(temp_dir, 'consultation.csv')
+    df.to_csv(csv_path, index=False)
+    return csv_path
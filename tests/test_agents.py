@@ -289,3 +289,65 @@ class TestAgentCompletionArgs:
 
         # Dev should have low temperature (0.1)
         assert temperature <= 0.2
+
+
+class TestPersistedAgents:
+    """Tests for baking learning materials into persisted agents."""
+
+    @patch('agents.agents.client')
+    def test_materials_baked_into_instructions(self, mock_client):
+        """Test that learning materials are appended to an agent's instructions."""
+        mock_client.beta.agents.create.return_value = Mock()
+
+        from agents.agents import initialize_agents
+        initialize_agents(learning_materials={'dev': '- Print every metric'})
+
+        calls = {call[1]['name']: call[1] for call in mock_client.beta.agents.create.call_args_list}
+        assert '- Print every metric' in calls['dev']['instructions']
+        assert 'Learning Materials' not in calls['quant']['instructions']
+
+    @patch('agents.agents.client')
+    def test_agents_reused_when_unchanged(self, mock_client, temp_dir):
+        """Test that a second run reuses persisted agents without updating them."""
+        import os
+        mock_client.beta.agents.create.side_effect = lambda **config: Mock(id=f"id-{config['name']}")
+        state_path = os.path.join(temp_dir, 'agent_state.json')
+
+        from agents.agents import initialize_agents
+        initialize_agents(learning_materials={'dev': '- Lesson'}, state_path=state_path)
+        initialize_agents(learning_materials={'dev': '- Lesson'}, state_path=state_path)
+
+        assert mock_client.beta.agents.create.call_count == 5
+        assert mock_client.beta.agents.get.call_count == 5
+        mock_client.beta.agents.update.assert_not_called()
+
+    @patch('agents.agents.client')
+    def test_agent_updated_when_materials_change(self, mock_client, temp_dir):
+        """Test that only the agent whose materials changed is updated."""
+        import os
+        mock_client.beta.agents.create.side_effect = lambda **config: Mock(id=f"id-{config['name']}")
+        mock_client.beta.agents.update.side_effect = lambda agent_id, **config: Mock(id=agent_id)
+        state_path = os.path.join(temp_dir, 'agent_state.json')
+
+        from agents.agents import initialize_agents
+        initialize_agents(learning_materials={'dev': '- Old lesson'}, state_path=state_path)
+        initialize_agents(learning_materials={'dev': '- New lesson'}, state_path=state_path)
+
+        assert mock_client.beta.agents.update.call_count == 1
+        update_call = mock_client.beta.agents.update.call_args
+        assert update_call[1]['agent_id'] == 'id-dev'
+        assert '- New lesson' in update_call[1]['instructions']
+
+    @patch('agents.agents.client')
+    def test_missing_agent_recreated(self, mock_client, temp_dir):
+        """Test that a persisted agent that can no longer be fetched is recreated."""
+        import os
+        mock_client.beta.agents.create.side_effect = lambda **config: Mock(id=f"id-{config['name']}")
+        mock_client.beta.agents.get.side_effect = Exception("not found")
+        state_path = os.path.join(temp_dir, 'agent_state.json')
+
+        from agents.agents import initialize_agents
+        initialize_agents(state_path=state_path)
+        initialize_agents(state_path=state_path)
+
+        assert mock_client.beta.agents.create.call_count == 10
@@ -0,0 +1,137 @@
+"""
+Tests for AST-aware extraction and merging of Dev code blocks.
+"""
+import ast
+
+from pipeline.code_extraction import find_code_blocks, merge_code_blocks, extract_python_code
+
+
+def fenced(code, language="python"):
+    return f"```{language}\n{code}\n```"
+
+
+class TestFindCodeBlocks:
+    """Tests for locating code blocks in messages."""
+
+    def test_python_blocks(self):
+        """Test that python, py and python3 blocks are found."""
+        message = "\n".join([fenced("a = 1"), fenced("b = 2", "py"), fenced("c = 3", "python3")])
+        assert find_code_blocks([message]) == ["a = 1", "b = 2", "c = 3"]
+
+    def test_untagged_blocks_skipped(self):
+        """Test that untagged fences, e.g. printed output, are not treated as Python."""
+        message = fenced("0.53", "") + "\n" + fenced("x = 1")
+        assert find_code_blocks([message]) == ["x = 1"]
+
+    def test_other_languages_skipped(self):
+        """Test that csv and bash blocks are not treated as Python."""
+        message = fenced("a,b\n1,2", "csv") + "\n" + fenced("pip install x", "bash")
+        assert find_code_blocks([message]) == []
+
+
+class TestMergeCodeBlocks:
+    """Tests for merging code blocks into one script."""
+
+    def test_imports_hoisted_and_deduplicated(self):
+        """Test that imports are moved to the top once each."""
+        merged, stats = merge_code_blocks([
+            "import pandas as pd\ndf = pd.DataFrame()",
+            "import numpy as np, pandas as pd\nfrom io import StringIO\nx = np.zeros(3)",
+        ])
+
+        assert merged.startswith("import pandas as pd\nimport numpy as np\nfrom io import StringIO\n\n")
+        assert merged.count("import pandas") == 1
+        assert stats['imports'] == 3
+
+    def test_future_imports_first(self):
+        """Test that __future__ imports come before other imports."""
+        merged, _ = merge_code_blocks(["import os\nfrom __future__ import annotations\nx = 1"])
+        assert merged.startswith("from __future__ import annotations\n\nimport os")
+
+    def test_repeated_block_dropped(self):
+        """Test that a repeated loading block is kept once."""
+        loading = "csv_data = '''a,b\n1,2\n'''\ndf = pd.read_csv(StringIO(csv_data))"
+        merged, stats = merge_code_blocks([loading, "# Same again\n" + loading, "print(df.shape)"])
+
+        assert merged.count("read_csv") == 1
+        assert "print(df.shape)" in merged
+        assert stats['duplicates'] == 1
+
+    def test_repeated_statements_kept(self):
+        """Test that a block making two figures keeps both."""
+        figure = "plt.figure()\nplt.plot(x)\nplt.close()\nprint('saved')"
+        merged, stats = merge_code_blocks([
+            f"import matplotlib.pyplot as plt\nx = [1, 2]\n{figure}\nx = [3, 4]\n{figure}",
+        ])
+
+        assert merged.count("plt.figure()") == 2
+        assert merged.count("plt.close()") == 2
+        assert merged.count("print('saved')") == 2
+        assert stats['duplicates'] == 0
+
+    def test_later_definition_wins_in_place(self):
+        """Test that a redefined function replaces the earlier one where it stood."""
+        merged, stats = merge_code_blocks([
+            "def analyse(df):\n    return 1\n\nresult = analyse(None)",
+            "def analyse(df):\n    # improved\n    return 2",
+        ])
+        tree = ast.parse(merged)
+
+        assert [type(node).__name__ for node in tree.body] == ["FunctionDef", "Assign"]
+        assert "return 2" in merged
+        assert "return 1" not in merged
+        assert stats['superseded'] == 1
+
+    def test_last_main_guard_runs_last(self):
+        """Test that only the latest __main__ guard is kept, at the end."""
+        merged, _ = merge_code_blocks([
+            "def main():\n    pass\n\nif __name__ == '__main__':\n    main()",
+            "def report():\n    pass\n\nif __name__ == '__main__':\n    main()\n    report()",
+        ])
+
+        assert merged.count("__main__") == 1
+        assert merged.rstrip().endswith("report()")
+        assert ast.parse(merged).body[-1].test.left.id == "__name__"
+
+    def test_non_parsing_blocks_rejected(self):
+        """Test that blocks with syntax errors are skipped and counted."""
+        merged, stats = merge_code_blocks(["x = 1", "def broken(:\n    pass", "y = 2"])
+
+        assert stats['rejected'] == 1
+        assert merged == "x = 1\n\ny = 2\n"
+
+    def test_comments_kept(self):
+        """Test that comments directly above a statement travel with it."""
+        merged, _ = merge_code_blocks(["# Compute the totals\ntotal = 1"])
+        assert merged == "# Compute the totals\ntotal = 1\n"
+
+    def test_decorated_definition_kept_whole(self):
+        """Test that decorators stay attached to their function."""
+        merged, _ = merge_code_blocks(["import functools\n\n@functools.lru_cache()\ndef f():\n    return 1"])
+        assert "@functools.lru_cache()\ndef f():" in merged
+
+    def test_no_blocks(self):
+        """Test that nothing to merge yields None."""
+        assert merge_code_blocks([])[0] is None
+        assert merge_code_blocks(["def broken(:"])[0] is None
+
+
+class TestExtractPythonCode:
+    """Tests for the end-to-end extractor."""
+
+    def test_merged_script_runs_once(self):
+        """Test that the extracted script executes without repeated work."""
+        messages = [
+            "Loading:\n" + fenced("import json\ncalls = []\ndef load():\n    calls.append(1)\n    return 1"),
+            "Improved:\n" + fenced("import json\ndef load():\n    calls.append(2)\n    return 2\n\nvalue = load()"),
+        ]
+        code = extract_python_code(messages)
+        namespace = {}
+        exec(compile(code, "analysis.py", "exec"), namespace)
+
+        assert namespace['calls'] == [2]
+        assert namespace['value'] == 2
+
+    def test_no_code(self):
+        """Test that messages without code yield None."""
+        assert extract_python_code(["No code here"]) is None
@@ -0,0 +1,94 @@
+"""
+Tests for profiling generated analysis scripts.
+"""
+import os
+import textwrap
+
+from pipeline.code_profiler import profile_code, load_profile, format_profile, format_profile_lesson
+from pipeline.local_executor import run_script
+
+
+SLOW_SCRIPT = textwrap.dedent("""
+    import time
+    def slow_step():
+        time.sleep(0.3)
+        return 1
+    data = [0] * 5_000_000
+    value = slow_step()
+    print(value)
+""")
+
+
+class TestProfileCode:
+    """Tests for running a script under the profiler."""
+
+    def test_statement_timings_and_memory(self, capsys):
+        """Test that each top-level statement is timed and the slow and memory-hungry ones stand out."""
+        profile = profile_code(SLOW_SCRIPT, "analysis.py")
+        statements = {s['line']: s for s in profile['statements']}
+
+        assert capsys.readouterr().out == "1\n"
+        assert profile['returncode'] == 0
+        assert statements[2]['import']
+        assert statements[7]['seconds'] >= 0.3
+        assert statements[6]['peak_memory_mb'] >= 30
+        assert profile['peak_memory_mb'] >= 30
+
+    def test_hot_script_functions(self):
+        """Test that the script's own functions are reported with their cumulative time."""
+        profile = profile_code(SLOW_SCRIPT, "analysis.py")
+        script_functions = [f for f in profile['functions'] if f['in_script']]
+
+        assert script_functions[0]['function'] == "slow_step (analysis.py:3)"
+        assert script_functions[0]['cumulative_seconds'] >= 0.3
+
+    def test_failure_stops_the_script(self, capsys):
+        """Test that a failing statement ends the run with exit code 1."""
+        profile = profile_code("print('before')\nraise ValueError('boom')\nprint('after')\n")
+        captured = capsys.readouterr()
+
+        assert profile['returncode'] == 1
+        assert len(profile['statements']) == 2
+        assert captured.out == "before\n"
+        assert "ValueError: boom" in captured.err
+
+
+class TestFormatProfile:
+    """Tests for the Critique summary and Dev lesson."""
+
+    def test_summary_lists_slowest_statements(self):
+        """Test that the summary shows totals, slow statements and hot functions."""
+        summary = format_profile(profile_code(SLOW_SCRIPT, "analysis.py"))
+
+        assert summary.startswith("Total ")
+        assert "line 7 `value = slow_step()`" in summary
+        assert "slow_step (analysis.py:3)" in summary
+
+    def test_lesson_flags_dominant_statements(self):
+        """Test that the lesson names statements that dominate the run and skips imports."""
+        lesson = format_profile_lesson(profile_code(SLOW_SCRIPT, "analysis.py"))
+
+        assert lesson.startswith("### Performance Profile")
+        assert "`value = slow_step()`" in lesson
+        assert "import time" not in lesson
+
+
+class TestLocalExecutorProfiling:
+    """Tests for profiling through the local executor."""
+
+    def test_profile_written_as_artifact(self, temp_dir):
+        """Test that a profiled run keeps the script's output and writes the profile."""
+        script = os.path.join(temp_dir, "analysis.py")
+        with open(script, "w") as f:
+            f.write("print(sum(range(10)))\n")
+        profile_path = os.path.join(temp_dir, "profile.json")
+        result = run_script(script, None, temp_dir, profile_path=profile_path)
+
+        assert result['stdout'] == "45\n"
+        assert result['returncode'] == 0
+        assert profile_path in result['artifacts']
+        assert load_profile(profile_path)['statements'][0]['source'] == "print(sum(range(10)))"
+
+    def test_missing_profile(self, temp_dir):
+        """Test that loading a profile that wasn't written returns None."""
+        assert load_profile(os.path.join(temp_dir, "profile.json")) is None
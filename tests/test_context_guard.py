@@ -0,0 +1,165 @@
+"""
+Tests for the context-window guard.
+"""
+import json
+import os
+
+from pipeline.context_guard import (
+    part,
+    collapse_repeated_lines,
+    head_tail,
+    summarize_hierarchically,
+    fit_to_budget,
+)
+from pipeline.tokens import estimate_tokens
+
+
+class TestCollapseRepeatedLines:
+    """Tests for collapsing repeated log lines."""
+
+    def test_collapses_numbered_progress(self):
+        """Test that lines differing only in numbers are collapsed."""
+        text = "start\n" + "\n".join(f"Processing batch {i}/100" for i in range(1, 101)) + "\nend"
+        collapsed = collapse_repeated_lines(text)
+
+        assert collapsed.splitlines() == [
+            "start",
+            "Processing batch 1/100",
+            "[... 98 similar lines omitted ...]",
+            "Processing batch 100/100",
+            "end",
+        ]
+
+    def test_numeric_results_kept(self):
+        """Test that result rows differing only in their numbers are not collapsed."""
+        text = "\n".join(f"Round {i}: 0.{40 + i}" for i in range(1, 10))
+        assert collapse_repeated_lines(text) == text
+
+    def test_exact_duplicates_collapsed(self):
+        """Test that runs of identical lines are collapsed."""
+        text = "\n".join(["Warning: convergence not reached"] * 5)
+        assert collapse_repeated_lines(text).splitlines()[1] == "[... 3 similar lines omitted ...]"
+
+    def test_short_runs_kept(self):
+        """Test that runs shorter than the minimum are left alone."""
+        text = "a 1\na 2\nb"
+        assert collapse_repeated_lines(text) == text
+
+    def test_blank_lines_kept(self):
+        """Test that runs of blank lines are not collapsed."""
+        text = "a\n\n\n\nb"
+        assert collapse_repeated_lines(text) == text
+
+
+class TestHeadTail:
+    """Tests for head/tail trimming."""
+
+    def test_short_text_unchanged(self):
+        """Test that text within the cap is returned as-is."""
+        assert head_tail("short", 10) == "short"
+
+    def test_keeps_head_and_tail(self):
+        """Test that the start and end survive and the middle is marked."""
+        text = "\n".join(f"line {i}" for i in range(1000))
+        trimmed = head_tail(text, 200)
+
+        assert estimate_tokens(trimmed) <= 200
+        assert trimmed.startswith("line 0\n")
+        assert trimmed.endswith("line 999")
+        assert "characters omitted" in trimmed
+
+
+class TestSummarizeHierarchically:
+    """Tests for chunked summarization."""
+
+    def test_summarizes_chunks(self):
+        """Test that every chunk is summarized and the result fits."""
+        calls = []
+
+        def summarizer(text, token_cap):
+            calls.append(len(text))
+            return "summary"
+
+        text = "\n".join("x" * 100 for _ in range(1000))
+        result = summarize_hierarchically(text, 50, summarizer, chunk_tokens=5000)
+
+        assert len(calls) == 6
+        assert estimate_tokens(result) <= 50
+
+    def test_no_progress_falls_back_to_trim(self):
+        """Test that a summarizer that does not shrink text ends in trimming."""
+        text = "y" * 4000
+        result = summarize_hierarchically(text, 100, lambda t, cap: t)
+        assert estimate_tokens(result) <= 100
+
+
+class TestFitToBudget:
+    """Tests for fitting parts to a token budget."""
+
+    def test_under_budget_unchanged(self, temp_dir):
+        """Test that inputs within budget are joined unchanged."""
+        log_path = os.path.join(temp_dir, "log.jsonl")
+        text, truncations = fit_to_budget([part("a", "one"), part("b", "two")], 100, log_path=log_path)
+
+        assert text == "one\ntwo"
+        assert truncations == []
+        assert not os.path.exists(log_path)
+
+    def test_fixed_parts_kept(self, temp_dir):
+        """Test that only shrinkable parts are cut and the result fits."""
+        prompt = "Analyse the results below."
+        stdout = "\n".join(f"value {i}: {'z' * (i % 7)}" * 3 for i in range(5000))
+        text, truncations = fit_to_budget(
+            [part("prompt", prompt, shrinkable=False), part("stdout", stdout)],
+            1000,
+            log_path=os.path.join(temp_dir, "log.jsonl"),
+        )
+
+        assert text.startswith(prompt + "\n")
+        assert estimate_tokens(text) <= 1000
+        assert truncations[-1]['part'] == "stdout"
+
+    def test_small_parts_kept_whole(self, temp_dir):
+        """Test that small parts are not cut to share the budget."""
+        big = "\n".join(f"row {i} " + "q" * 50 for i in range(2000))
+        text, truncations = fit_to_budget(
+            [part("small", "keep me"), part("big", big)],
+            500,
+            log_path=os.path.join(temp_dir, "log.jsonl"),
+        )
+
+        assert text.startswith("keep me\n")
+        assert [t['part'] for t in truncations] == ["big"]
+
+    def test_collapsing_can_be_enough(self, temp_dir):
+        """Test that collapsing repeated lines alone can bring input under budget."""
+        log = "\n".join(f"Epoch {i} done" for i in range(2000))
+        text, truncations = fit_to_budget([part("log", log)], 100, log_path=os.path.join(temp_dir, "log.jsonl"))
+
+        assert truncations[0]['method'] == "collapsed repeated lines"
+        assert len(truncations) == 1
+        assert "Epoch 1999 done" in text
+
+    def test_uses_summarizer(self, temp_dir):
+        """Test that the summarizer is preferred over trimming."""
+        text, truncations = fit_to_budget(
+            [part("report", "w " * 5000)],
+            100,
+            summarizer=lambda t, cap: "short summary",
+            log_path=os.path.join(temp_dir, "log.jsonl"),
+        )
+
+        assert text == "short summary"
+        assert truncations[-1]['method'] == "summarized"
+
+    def test_truncations_logged(self, temp_dir):
+        """Test that every truncation is appended to the JSONL log."""
+        log_path = os.path.join(temp_dir, "log.jsonl")
+        fit_to_budget([part("report", "w " * 5000)], 100, label="quant", log_path=log_path)
+
+        with open(log_path) as f:
+            records = [json.loads(line) for line in f]
+
+        assert records[0]['input'] == "quant"
+        assert records[0]['part'] == "report"
+        assert records[0]['tokens_after'] <= 100
@@ -0,0 +1,169 @@
+"""
+Tests for the Critique output section indexer.
+"""
+import os
+import time
+
+from pipeline.critique_parsing import (
+    normalize_title,
+    SectionIndex,
+    parse_critique,
+    synthetic_critique,
+)
+
+
+CRITIQUE = """# Audit
+
+Overall the run was solid.
+
+## LEARNING MATERIALS
+
+## **Whisper Learning Materials**
+**Strengths**
+- Clear delimiters
+
+### Spec Learning Materials
+- Reference the script's functions by name
+
+**Dev Learning Materials:**
+#### Details
+- Print silhouette scores
+
+### 4. Quant Agent Learning Materials
+- Quote sample sizes
+
+## UPDATED PROMPTS
+
+### **Updated Whisper Prompt**
+You are Whisper.
+
+## Learning Materials from Previous Runs
+Keep prompts short.
+
+### Spec Prompt Suggestions
+- Ask for a data dictionary
+
+### **Dev Prompt Suggestions**
+
+### Quant Prompt Suggestions
+- Require confidence intervals
+"""
+
+
+class TestNormalizeTitle:
+    """Tests for heading normalization."""
+
+    def test_variants_match(self):
+        """Test that heading spellings normalize to the same key."""
+        variants = [
+            "**Dev Learning Materials**",
+            "Dev Learning Materials:",
+            "1. Dev Agent Learning Materials",
+            "  DEV   learning-materials ",
+        ]
+        assert {normalize_title(v) for v in variants} == {"dev learning materials"}
+
+
+class TestSectionIndex:
+    """Tests for the section index."""
+
+    def test_sub_headings_do_not_end_sections(self):
+        """Test that unknown headings stay inside the enclosing section."""
+        index = SectionIndex(CRITIQUE)
+        assert index.get("whisper learning materials") == "**Strengths**\n- Clear delimiters"
+        assert "Print silhouette scores" in index.get("dev learning materials")
+
+    def test_missing_section(self):
+        """Test that missing sections return None."""
+        index = SectionIndex("## Something else\ntext")
+        assert "updated prompts" not in index
+        assert index.get("updated prompts") is None
+
+    def test_last_occurrence_wins(self):
+        """Test that a repeated heading uses its last occurrence and doesn't end earlier sections."""
+        text = "### Dev Learning Materials\nfirst\n### Quant Learning Materials\nq\n### Dev Learning Materials\nsecond"
+        index = SectionIndex(text)
+        assert index.get("dev learning materials") == "second"
+        assert index.get("quant learning materials") == "q"
+
+    def test_inline_mentions_ignored(self):
+        """Test that titles mentioned mid-line are not headings."""
+        text = "See the Dev Learning Materials below.\n### Dev Learning Materials\nreal"
+        assert SectionIndex(text).get("dev learning materials") == "real"
+
+
+class TestParseCritique:
+    """Tests for splitting Critique's output."""
+
+    def test_learning_materials(self):
+        """Test that every agent's materials are extracted."""
+        parsed = parse_critique(CRITIQUE)
+
+        assert set(parsed['learning']) == {"whisper", "spec", "dev", "quant"}
+        assert parsed['learning']['quant'] == "- Quote sample sizes"
+
+    def test_updated_prompt_and_suggestions(self):
+        """Test that the Whisper prompt and non-empty suggestions are extracted."""
+        parsed = parse_critique(CRITIQUE)
+
+        assert parsed['whisper_prompt'].startswith("You are Whisper.")
+        assert "Keep prompts short." in parsed['whisper_prompt']
+        assert parsed['suggestions'] == {
+            'spec': "- Ask for a data dictionary",
+            'quant': "- Require confidence intervals",
+        }
+
+    def test_suggestion_headings_inside_prompt(self):
+        """Test that suggestion headings echoed in the Whisper prompt don't cut it short."""
+        with open(os.path.join(os.path.dirname(__file__), "..", "prompts", "whisper_message.txt")) as f:
+            current_prompt = f.read()
+        critique = (
+            "## UPDATED PROMPTS\n\n### Updated Whisper Prompt\n"
+            f"{current_prompt}\n\n### Spec Prompt Suggestions\nstale\n\n"
+            "### Spec Prompt Suggestions\n- New spec idea\n\n"
+            "### Dev Prompt Suggestions\n- New dev idea\n\n"
+            "### Quant Prompt Suggestions\n- New quant idea\n"
+        )
+        parsed = parse_critique(critique)
+
+        assert parsed['whisper_prompt'].startswith(current_prompt.strip())
+        assert parsed['suggestions'] == {
+            'spec': "- New spec idea",
+            'dev': "- New dev idea",
+            'quant': "- New quant idea",
+        }
+
+    def test_empty_critique(self):
+        """Test that text without sections yields nothing."""
+        assert parse_critique("No sections here") == {'learning': {}, 'whisper_prompt': None, 'suggestions': {}}
+
+
+class TestParsingPerformance:
+    """Tests that parsing stays linear on large critiques."""
+
+    def test_multi_megabyte_critique(self):
+        """Test that a multi-megabyte critique parses quickly and completely."""
+        text = synthetic_critique(4 * 1024 * 1024)
+        start = time.perf_counter()
+        parsed = parse_critique(text)
+        elapsed = time.perf_counter() - start
+
+        assert len(text) > 3 * 1024 * 1024
+        assert set(parsed['learning']) == {"whisper", "spec", "dev", "quant"}
+        assert elapsed < 2.0
+
+    def test_scales_linearly(self):
+        """Test that parsing time grows roughly in proportion to size."""
+        def best_time(text):
+            times = []
+            for _ in range(3):
+                start = time.perf_counter()
+                parse_critique(text)
+                times.append(time.perf_counter() - start)
+            return min(times)
+
+        small = best_time(synthetic_critique(512 * 1024))
+        large = best_time(synthetic_critique(4 * 1024 * 1024))
+
+        # 8x the input; allow generous slack for timer noise
+        assert large < small * 20
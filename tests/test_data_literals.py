@@ -0,0 +1,138 @@
+"""
+Tests for moving embedded datasets out of generated code.
+"""
+import gzip
+import os
+import pandas as pd
+import pytest
+
+from pipeline.data_literals import externalize_data_literals, LOADER_IMPORT
+from generated_code import data_loader
+from generated_code.data_loader import load_data, read_data_file, DATA_PATH_ENV
+from pipeline import data_loading
+
+
+def _script(sample_csv_small, read="df = pd.read_csv(StringIO(csv_data))"):
+    with open(sample_csv_small, "r") as f:
+        csv_text = f.read()
+    return (f"import pandas as pd\n"
+            f"from io import StringIO\n"
+            f"\n"
+            f"# Load the data\n"
+            f"csv_data = '''\n{csv_text}'''\n"
+            f"\n"
+            f"{read}\n"
+            f"print(len(df))\n")
+
+
+@pytest.fixture(autouse=True)
+def no_data_path(monkeypatch):
+    """Make sure the loader doesn't pick up a dataset path from the environment."""
+    monkeypatch.delenv(DATA_PATH_ENV, raising=False)
+
+
+class TestExternalizeDataLiterals:
+    """Tests for rewriting CSV literals into loader calls."""
+
+    def test_literal_replaced_by_loader(self, temp_dir, sample_csv_small):
+        """Test that the literal is cached and the read becomes a loader call."""
+        cache_dir = os.path.join(temp_dir, "data_cache")
+        code = _script(sample_csv_small)
+        rewritten, moved = externalize_data_literals(code, sample_csv_small, cache_dir)
+        fingerprint = moved[0]['fingerprint']
+
+        assert "csv_data" not in rewritten
+        assert f'df = load_data("{fingerprint}")' in rewritten
+        assert rewritten.index(LOADER_IMPORT) > rewritten.index("from io import StringIO")
+        assert len(rewritten) < len(code) / 5
+        assert moved[0]['rows'] == 50
+        assert moved[0]['source'] == os.path.abspath(sample_csv_small)
+
+    def test_loaded_data_matches_literal(self, temp_dir, sample_csv_small):
+        """Test that the loader returns the same rows the script used to parse."""
+        cache_dir = os.path.join(temp_dir, "data_cache")
+        _, moved = externalize_data_literals(_script(sample_csv_small), sample_csv_small, cache_dir)
+        df = load_data(moved[0]['fingerprint'], cache_dir=cache_dir)
+
+        pd.testing.assert_frame_equal(df, pd.read_csv(sample_csv_small))
+
+    def test_other_uses_left_alone(self, temp_dir, sample_csv_small):
+        """Test that literals used elsewhere or read with extra options are kept."""
+        cache_dir = os.path.join(temp_dir, "data_cache")
+        for read in ("df = pd.read_csv(StringIO(csv_data))\nprint(csv_data[:10])",
+                     "df = pd.read_csv(StringIO(csv_data), index_col=0)"):
+            code = _script(sample_csv_small, read)
+            rewritten, moved = externalize_data_literals(code, sample_csv_small, cache_dir)
+
+            assert rewritten == code
+            assert moved == []
+
+    def test_unicode_line_separator_in_literal(self, temp_dir):
+        """Test that a U+2028 or form feed inside the literal doesn't shift the rewrite."""
+        code = ("import pandas as pd\nfrom io import StringIO\n"
+                "csv_data = '''a,text\n1,one\u2028two\n2,three\x0cfour\n'''\n"
+                "df = pd.read_csv(StringIO(csv_data))\nprint(len(df))\n")
+        rewritten, moved = externalize_data_literals(code, None, temp_dir)
+
+        assert rewritten.splitlines()[-2:] == [f'df = load_data("{moved[0]["fingerprint"]}")', "print(len(df))"]
+        assert moved[0]['rows'] == 2
+
+    def test_script_without_literals(self, temp_dir):
+        """Test that scripts that read data from a file are unchanged."""
+        code = "import pandas as pd\ndf = pd.read_csv('data.csv')\n"
+
+        assert externalize_data_literals(code, None, temp_dir) == (code, [])
+
+
+class TestLoadData:
+    """Tests for the loader used by generated scripts."""
+
+    def test_data_path_overrides_cache(self, temp_dir, sample_csv_small, monkeypatch):
+        """Test that DATA_FILE_PATH points a rewritten script at another dataset."""
+        cache_dir = os.path.join(temp_dir, "data_cache")
+        _, moved = externalize_data_literals(_script(sample_csv_small), sample_csv_small, cache_dir)
+        updated = os.path.join(temp_dir, "updated.csv")
+        pd.DataFrame({'position_text': ["new"]}).to_csv(updated, index=False)
+        monkeypatch.setenv(DATA_PATH_ENV, updated)
+
+        assert len(load_data(moved[0]['fingerprint'], cache_dir=cache_dir)) == 1
+
+    def test_falls_back_to_source(self, temp_dir, sample_csv_small):
+        """Test that the source dataset is read when the cached copy is gone."""
+        cache_dir = os.path.join(temp_dir, "data_cache")
+        _, moved = externalize_data_literals(_script(sample_csv_small), sample_csv_small, cache_dir)
+        os.remove(os.path.join(cache_dir, moved[0]['cache']))
+
+        assert len(load_data(moved[0]['fingerprint'], cache_dir=cache_dir)) == 50
+
+    def test_unknown_fingerprint(self, temp_dir):
+        """Test that an unknown fingerprint raises a helpful error."""
+        with pytest.raises(FileNotFoundError, match=DATA_PATH_ENV):
+            load_data("0123456789abcdef", cache_dir=temp_dir)
+
+
+class TestReadDataFile:
+    """Tests for format detection in the standalone loader."""
+
+    @pytest.fixture
+    def data_files(self, temp_dir):
+        """A small frame written as gzip CSV without an extension and as JSONL named .json."""
+        df = pd.DataFrame({'participant': ["a", "b"], 'position_text': ["x", "y"]})
+        gz_path = os.path.join(temp_dir, "export")
+        with gzip.open(gz_path, "wt") as f:
+            df.to_csv(f, index=False)
+        json_path = os.path.join(temp_dir, "export.json")
+        df.to_json(json_path, orient="records", lines=True)
+        return df, [gz_path, json_path]
+
+    def test_detected_by_content(self, data_files):
+        """Test that compression and JSONL are detected without relying on the extension."""
+        df, paths = data_files
+        for path in paths:
+            pd.testing.assert_frame_equal(read_data_file(path), df)
+
+    def test_same_rules_as_pipeline(self, data_files, sample_csv_small):
+        """Test that the copy detects the same format as pipeline.data_loading."""
+        _, paths = data_files
+        for path in paths + [sample_csv_small]:
+            assert data_loader.detect_format(path) == data_loading.detect_format(path)
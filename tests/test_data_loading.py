@@ -0,0 +1,150 @@
+"""
+Tests for memory-compact data loading.
+"""
+import os
+import pytest
+import pandas as pd
+
+from pipeline.data_loading import (
+    detect_format,
+    infer_schema,
+    load_dataframe,
+    format_memory_report,
+    concat_compact,
+    compact_dataframe,
+)
+
+
+class TestInferSchema:
+    """Tests for dtype inference."""
+
+    def test_known_columns(self, sample_consultation_csv):
+        """Test that known consultation columns get compact dtypes."""
+        schema = infer_schema(pd.read_csv(sample_consultation_csv))
+
+        for col in ['participant', 'question', 'position_type', 'strength']:
+            assert schema[col] == 'category'
+        assert isinstance(schema['position_text'], pd.StringDtype)
+
+    def test_numeric_columns_left_alone(self, sample_consultation_csv):
+        """Test that numeric columns are not part of the schema."""
+        schema = infer_schema(pd.read_csv(sample_consultation_csv))
+        assert 'round_number' not in schema
+
+    def test_low_cardinality_object_column(self, sample_csv_small):
+        """Test that unknown low-cardinality columns become categorical."""
+        schema = infer_schema(pd.read_csv(sample_csv_small))
+        assert schema['participant_id'] == 'category'
+
+
+class TestLoadDataframe:
+    """Tests for load_dataframe."""
+
+    def test_loads_all_rows(self, sample_consultation_csv):
+        """Test that chunked loading keeps every row in order."""
+        df, report = load_dataframe(sample_consultation_csv, chunk_rows=300)
+        expected = pd.read_csv(sample_consultation_csv)
+
+        assert report['rows'] == len(expected)
+        assert list(df['position_text']) == list(expected['position_text'])
+
+    def test_categoricals_survive_chunking(self, sample_consultation_csv):
+        """Test that categorical dtypes survive concatenation of chunks."""
+        df, _ = load_dataframe(sample_consultation_csv, chunk_rows=7)
+        assert isinstance(df['participant'].dtype, pd.CategoricalDtype)
+
+    def test_memory_drops(self, sample_consultation_csv):
+        """Test that compact dtypes use several times less memory."""
+        _, report = load_dataframe(sample_consultation_csv)
+        assert report['bytes_after'] * 2 < report['bytes_before']
+
+    def test_usecols_projection(self, sample_consultation_csv):
+        """Test that only requested columns are loaded."""
+        df, _ = load_dataframe(sample_consultation_csv, usecols=['participant', 'position_text'])
+        assert list(df.columns) == ['participant', 'position_text']
+
+    def test_explicit_schema(self, sample_csv_small):
+        """Test that an explicit schema is applied as given."""
+        df, report = load_dataframe(sample_csv_small, schema={'participant_id': 'string'})
+        assert isinstance(df['participant_id'].dtype, pd.StringDtype)
+        assert df['position_text'].dtype == object
+        assert report['schema'] == {'participant_id': 'string'}
+
+    def test_memory_report_format(self, sample_consultation_csv):
+        """Test the memory report summary line."""
+        _, report = load_dataframe(sample_consultation_csv)
+        line = format_memory_report(report)
+        assert line.startswith("Memory:")
+        assert "x smaller" in line
+
+
+class TestConcatCompact:
+    """Tests for concatenating compacted chunks."""
+
+    def test_mismatched_categories(self):
+        """Test chunks with different categories stay categorical."""
+        a = compact_dataframe(pd.DataFrame({'c': ['x', 'y']}), {'c': 'category'})
+        b = compact_dataframe(pd.DataFrame({'c': ['z']}), {'c': 'category'})
+
+        df = concat_compact([a, b])
+
+        assert isinstance(df['c'].dtype, pd.CategoricalDtype)
+        assert list(df['c']) == ['x', 'y', 'z']
+
+
+class TestInputFormats:
+    """Tests for format detection and streaming of compressed and columnar inputs."""
+
+    @pytest.fixture
+    def consultation_df(self, sample_consultation_csv):
+        return pd.read_csv(sample_consultation_csv)
+
+    def test_plain_csv(self, sample_consultation_csv):
+        """Test that a plain CSV is detected as uncompressed CSV."""
+        assert detect_format(sample_consultation_csv) == ('csv', None)
+
+    @pytest.mark.parametrize("suffix,compression", [(".csv.gz", "gzip"), (".csv.bz2", "bz2")])
+    def test_compressed_csv(self, temp_dir, consultation_df, suffix, compression):
+        """Test that compressed CSV is detected and streamed."""
+        path = os.path.join(temp_dir, f"data{suffix}")
+        consultation_df.to_csv(path, index=False, compression=compression)
+
+        df, report = load_dataframe(path, chunk_rows=500)
+
+        assert (report['format'], report['compression']) == ('csv', compression)
+        assert list(df['position_text']) == list(consultation_df['position_text'])
+
+    def test_zstd_csv_without_extension(self, temp_dir, consultation_df):
+        """Test that zstd is recognised from magic bytes alone."""
+        pytest.importorskip("zstandard")
+        path = os.path.join(temp_dir, "export.dat")
+        consultation_df.to_csv(path, index=False, compression="zstd")
+
+        df, report = load_dataframe(path, chunk_rows=500)
+
+        assert report['compression'] == 'zstd'
+        assert len(df) == len(consultation_df)
+
+    def test_jsonl(self, temp_dir, consultation_df):
+        """Test that line-delimited JSON is detected and projected."""
+        path = os.path.join(temp_dir, "data.jsonl.gz")
+        consultation_df.to_json(path, orient="records", lines=True, compression="gzip")
+
+        df, report = load_dataframe(path, usecols=['participant', 'position_text'], chunk_rows=300)
+
+        assert (report['format'], report['compression']) == ('jsonl', 'gzip')
+        assert list(df.columns) == ['participant', 'position_text']
+        assert isinstance(df['participant'].dtype, pd.CategoricalDtype)
+        assert len(df) == len(consultation_df)
+
+    def test_parquet(self, temp_dir, consultation_df):
+        """Test that Parquet is read batch by batch."""
+        pytest.importorskip("pyarrow")
+        path = os.path.join(temp_dir, "data.parquet")
+        consultation_df.to_parquet(path, row_group_size=400)
+
+        df, report = load_dataframe(path, usecols=['question', 'round_number'], chunk_rows=250)
+
+        assert report['format'] == 'parquet'
+        assert list(df.columns) == ['question', 'round_number']
+        assert list(df['round_number']) == list(consultation_df['round_number'])
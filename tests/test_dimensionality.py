@@ -0,0 +1,82 @@
+"""
+Tests for the dimensionality-reduction backends.
+"""
+import numpy as np
+import pytest
+from sklearn.manifold import TSNE
+from sklearn.neighbors import NearestNeighbors
+
+from generated_code import dimensionality
+from generated_code.dimensionality import (
+    METHODS,
+    compare_reductions,
+    reduce_embeddings,
+    resolve_method,
+)
+
+
+@pytest.fixture
+def embeddings():
+    """Three well-separated clusters of 40 float32 vectors each."""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(scale=10, size=(3, 32))
+    return np.vstack([center + rng.normal(size=(40, 32)) for center in centers]).astype(np.float32)
+
+
+class TestReduceEmbeddings:
+    """Tests for the individual backends."""
+
+    @pytest.mark.parametrize("method", METHODS)
+    def test_same_signature_and_shape(self, embeddings, method):
+        """Test that every backend returns one row per embedding and reports its time."""
+        reduced, used, seconds = reduce_embeddings(embeddings, 3, method)
+
+        assert reduced.shape == (120, 3)
+        assert used == method
+        assert seconds >= 0
+
+    def test_tsne_matches_original(self, embeddings):
+        """Test that the 'tsne' backend gives the same result as the original default t-SNE."""
+        reduced, _, _ = reduce_embeddings(embeddings, 3, "tsne")
+        expected = TSNE(n_components=3, random_state=42).fit_transform(embeddings)
+
+        np.testing.assert_allclose(reduced, expected)
+
+    def test_landmark_keeps_clusters_apart(self, embeddings, monkeypatch):
+        """Test that interpolated positions land next to positions of their own cluster."""
+        monkeypatch.setattr(dimensionality, "LANDMARK_ROWS", 60)
+        reduced, _, _ = reduce_embeddings(embeddings, 3, "landmark")
+        labels = np.repeat([0, 1, 2], 40)
+        _, neighbors = NearestNeighbors(n_neighbors=2).fit(reduced).kneighbors(reduced)
+
+        assert (labels[neighbors[:, 1]] == labels).mean() > 0.9
+
+    def test_auto_switches_to_landmark(self, monkeypatch):
+        """Test that 'auto' keeps t-SNE for small datasets and uses landmarks for large ones."""
+        monkeypatch.setattr(dimensionality, "AUTO_LANDMARK_ROWS", 100)
+
+        assert resolve_method("auto", 100) == "tsne"
+        assert resolve_method("auto", 101) == "landmark"
+
+    def test_default_is_tsne(self, embeddings, monkeypatch):
+        """Test that t-SNE stays the default however many positions there are."""
+        monkeypatch.setattr(dimensionality, "AUTO_LANDMARK_ROWS", 10)
+        _, method, _ = reduce_embeddings(embeddings)
+
+        assert method == "tsne"
+
+    def test_unknown_method(self, embeddings):
+        """Test that an unknown backend name is rejected."""
+        with pytest.raises(ValueError, match="Unknown reduction method 'umap'"):
+            reduce_embeddings(embeddings, 3, "umap")
+
+
+class TestCompareReductions:
+    """Tests for comparing backends on the same data."""
+
+    def test_results_per_method(self, embeddings):
+        """Test that each backend gets a time and a neighbourhood-preservation score."""
+        results = compare_reductions(embeddings, methods=("pca", "pca_tsne"))
+
+        assert [r['method'] for r in results] == ["pca", "pca_tsne"]
+        assert all(r['seconds'] >= 0 and 0 <= r['trustworthiness'] <= 1 for r in results)
@@ -0,0 +1,93 @@
+"""
+Tests for chunked, concurrent embedding requests.
+"""
+import threading
+import time
+import pytest
+
+from generated_code.embedding_batches import chunk_ranges, embed_in_chunks
+
+
+def _vectors(texts):
+    return [[float(len(t))] for t in texts]
+
+
+class TestChunkRanges:
+    """Tests for splitting texts into request-sized chunks."""
+
+    def test_item_limit(self):
+        """Test that no chunk holds more than the item limit."""
+        assert chunk_ranges(["a"] * 5, max_items=2) == [(0, 2), (2, 4), (4, 5)]
+
+    def test_token_limit(self):
+        """Test that chunks are closed before going over the estimated token limit."""
+        texts = ["x" * 40, "x" * 40, "x" * 40]  # 10 tokens each
+
+        assert chunk_ranges(texts, max_items=10, max_tokens=25) == [(0, 2), (2, 3)]
+
+    def test_oversized_text_gets_own_chunk(self):
+        """Test that a text over the token limit is sent on its own instead of looping."""
+        texts = ["a", "x" * 400, "b"]
+
+        assert chunk_ranges(texts, max_items=10, max_tokens=20) == [(0, 1), (1, 2), (2, 3)]
+
+    def test_empty(self):
+        """Test that no texts give no chunks."""
+        assert chunk_ranges([]) == []
+
+
+class TestEmbedInChunks:
+    """Tests for dispatching chunks."""
+
+    def test_results_in_original_order(self):
+        """Test that vectors line up with their texts even when chunks finish out of order."""
+        def embed(texts):
+            time.sleep(0.05 if texts[0] == "a" else 0)
+            return _vectors(texts)
+
+        texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+        result = embed_in_chunks(texts, embed, max_items=2, max_concurrency=3)
+
+        assert result == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+
+    def test_concurrency_limit(self):
+        """Test that chunks run concurrently but never above the limit."""
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+
+        def embed(texts):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.05)
+            with lock:
+                state['active'] -= 1
+            return _vectors(texts)
+
+        embed_in_chunks(["t"] * 10, embed, max_items=1, max_concurrency=3)
+
+        assert state['peak'] == 3
+
+    def test_failed_chunk_retried_alone(self):
+        """Test that only the failing chunk is sent again."""
+        calls = []
+
+        def embed(texts):
+            calls.append(tuple(texts))
+            if texts == ["b"] and calls.count(("b",)) == 1:
+                raise ConnectionError("rate limited")
+            return _vectors(texts)
+
+        result = embed_in_chunks(["a", "b", "c"], embed, max_items=1, backoff=0)
+
+        assert result == [[1.0], [1.0], [1.0]]
+        assert calls.count(("a",)) == 1 and calls.count(("c",)) == 1
+        assert calls.count(("b",)) == 2
+
+    def test_gives_up_after_retries(self):
+        """Test that a chunk failing every attempt raises with its text range."""
+        def embed(texts):
+            raise ConnectionError("down")
+
+        with pytest.raises(RuntimeError, match="texts 0-1 failed after 2 retries"):
+            embed_in_chunks(["a", "b"], embed, retries=2, backoff=0)
@@ -0,0 +1,98 @@
+"""
+Tests for the persistent embedding cache.
+"""
+import os
+import numpy as np
+import pytest
+
+from generated_code.embedding_cache import EmbeddingCache, cached_embeddings, text_key
+
+
+class FakeEmbedder:
+    """Embeds each text as [len(text), first char code] and records every call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), float(ord(t[0]))] for t in texts]
+
+
+@pytest.fixture
+def cache(temp_dir):
+    return EmbeddingCache(os.path.join(temp_dir, "embeddings.db"))
+
+
+class TestCachedEmbeddings:
+    """Tests for embedding through the cache."""
+
+    def test_duplicates_embedded_once(self, cache):
+        """Test that repeated texts in a batch reach the API once, in first-seen order."""
+        embed = FakeEmbedder()
+        vectors = cached_embeddings(["a", "bb", "a", "bb", "ccc"], embed, "model", cache)
+
+        assert embed.calls == [["a", "bb", "ccc"]]
+        assert vectors.dtype == np.float32
+        np.testing.assert_array_equal(vectors, [[1.0, 97.0], [2.0, 98.0], [1.0, 97.0], [2.0, 98.0], [3.0, 99.0]])
+
+    def test_rerun_only_embeds_new_texts(self, cache):
+        """Test that a second run only sends texts that weren't embedded before."""
+        embed = FakeEmbedder()
+        cached_embeddings(["a", "bb"], embed, "model", cache)
+        vectors = cached_embeddings(["bb", "a", "dddd"], embed, "model", cache)
+
+        assert embed.calls[1] == ["dddd"]
+        np.testing.assert_array_equal(vectors, [[2.0, 98.0], [1.0, 97.0], [4.0, 100.0]])
+
+    def test_fully_cached_run_makes_no_calls(self, cache):
+        """Test that unchanged texts, even with different whitespace, make no API calls."""
+        embed = FakeEmbedder()
+        cached_embeddings(["some position text"], embed, "model", cache)
+        cached_embeddings(["some  position\ntext "], embed, "model", cache)
+
+        assert len(embed.calls) == 1
+
+    def test_models_cached_separately(self, cache):
+        """Test that embeddings from another model are not reused."""
+        embed = FakeEmbedder()
+        cached_embeddings(["a"], embed, "model-1", cache)
+        cached_embeddings(["a"], embed, "model-2", cache)
+
+        assert len(embed.calls) == 2
+        assert cache.count("model-1") == 1
+        assert cache.count() == 2
+
+    def test_no_texts(self, cache):
+        """Test that an empty batch gives an empty float32 array without calls."""
+        embed = FakeEmbedder()
+        vectors = cached_embeddings([], embed, "model", cache)
+
+        assert vectors.shape == (0, 0) and vectors.dtype == np.float32
+        assert embed.calls == []
+
+    def test_wrong_number_of_embeddings(self, cache):
+        """Test that a short API response is an error rather than a misaligned result."""
+        with pytest.raises(ValueError, match="Expected 2 embeddings"):
+            cached_embeddings(["a", "b"], lambda texts: [[0.0]], "model", cache)
+        assert cache.count() == 0
+
+
+class TestEmbeddingCache:
+    """Tests for the SQLite store."""
+
+    def test_round_trip_float32(self, cache):
+        """Test that vectors come back as float32 arrays under their keys."""
+        cache.put_many("model", [(text_key("a"), [0.5, 1.5, 2.5])])
+        found = cache.get_many("model", [text_key("a"), text_key("missing")])
+
+        assert list(found) == [text_key("a")]
+        assert found[text_key("a")].dtype == np.float32
+        np.testing.assert_array_equal(found[text_key("a")], [0.5, 1.5, 2.5])
+
+    def test_large_lookups_batched(self, cache):
+        """Test that more keys than SQLite allows in one query are looked up correctly."""
+        keys = [text_key(str(i)) for i in range(1200)]
+        cache.put_many("model", [(key, [float(i)]) for i, key in enumerate(keys)])
+
+        assert len(cache.get_many("model", keys)) == 1200
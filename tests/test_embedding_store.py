@@ -0,0 +1,82 @@
+"""
+Tests for the memory-mapped embedding store.
+"""
+import os
+import numpy as np
+import pytest
+from sklearn.cluster import KMeans
+
+from generated_code.embedding_store import EmbeddingStore
+
+
+class FakeEmbedder:
+    """Embeds each text as [len(text), 1, 2] and records the size of every call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(len(texts))
+        return [[float(len(t)), 1.0, 2.0] for t in texts]
+
+
+@pytest.fixture
+def texts():
+    return ["a", "bb", "ccc", "dddd", "eeeee"]
+
+
+class TestBuild:
+    """Tests for building and reopening stores."""
+
+    def test_rows_and_index(self, temp_dir, texts):
+        """Test that rows follow the texts and ids map to their rows."""
+        ids = [f"p{i}" for i in range(5)]
+        store = EmbeddingStore.build(ids, texts, FakeEmbedder(), "model", directory=temp_dir)
+
+        assert store.shape == (5, 3)
+        assert store.vectors.dtype == np.float32
+        assert isinstance(store.vectors, np.memmap)
+        assert store.row("p3")[0] == 4.0
+        np.testing.assert_array_equal(store.rows(["p4", "p0"])[:, 0], [5.0, 1.0])
+
+    def test_written_in_blocks(self, temp_dir, texts):
+        """Test that texts are embedded block by block."""
+        embed = FakeEmbedder()
+        store = EmbeddingStore.build(None, texts, embed, "model", directory=temp_dir, block_rows=2)
+
+        assert embed.calls == [2, 2, 1]
+        np.testing.assert_array_equal(store[:, 0], [1.0, 2.0, 3.0, 4.0, 5.0])
+        assert store.ids == ["0", "1", "2", "3", "4"]
+
+    def test_same_texts_reopen_store(self, temp_dir, texts):
+        """Test that asking for the same embeddings reopens the file without embedding."""
+        embed = FakeEmbedder()
+        EmbeddingStore.build(None, texts, embed, "model", directory=temp_dir)
+        EmbeddingStore.build(None, texts, embed, "model", directory=temp_dir)
+        EmbeddingStore.build(None, texts, embed, "other-model", directory=temp_dir)
+
+        assert len(embed.calls) == 2
+        assert len([f for f in os.listdir(temp_dir) if f.endswith(".npy")]) == 2
+
+    def test_mismatched_ids(self, temp_dir, texts):
+        """Test that ids must line up with texts."""
+        with pytest.raises(ValueError, match="Got 2 ids for 5 texts"):
+            EmbeddingStore.build(["a", "b"], texts, FakeEmbedder(), "model", directory=temp_dir)
+
+
+class TestZeroCopy:
+    """Tests for reading the store without copying it."""
+
+    def test_float32_view_shares_memory(self, temp_dir, texts):
+        """Test that a float32 view of the store is the memory-mapped data itself."""
+        store = EmbeddingStore.build(None, texts, FakeEmbedder(), "model", directory=temp_dir)
+
+        assert np.shares_memory(np.asarray(store, dtype=np.float32), store.vectors)
+        assert not np.shares_memory(np.array(store, copy=True), store.vectors)
+
+    def test_sklearn_accepts_store(self, temp_dir, texts):
+        """Test that scikit-learn estimators can fit the read-only store directly."""
+        store = EmbeddingStore.build(None, texts, FakeEmbedder(), "model", directory=temp_dir)
+        labels = KMeans(n_clusters=2, random_state=42, n_init=10).fit_predict(np.asarray(store, dtype=np.float32))
+
+        assert len(labels) == 5
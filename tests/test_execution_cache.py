@@ -0,0 +1,191 @@
+"""
+Tests for the execution result cache.
+"""
+import json
+import os
+import time
+
+from pipeline.execution_cache import (
+    ExecutionCache,
+    cached_run,
+    normalized_code_hash,
+    file_hash,
+    library_versions,
+    local_modules,
+)
+from pipeline.local_executor import run_script
+
+
+def _write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+# Stands in for generated_code/data_loader.py, which isn't next to the test scripts
+LOADING_SCRIPT = "def load_data(fingerprint):\n    return fingerprint\n\ndf = load_data(\"abc\")\n"
+
+
+def _cache_dataset(script_dir, fingerprint):
+    """Add a dataset to the data cache next to a script and record it in the manifest."""
+    cache_dir = os.path.join(script_dir, "data_cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    manifest[fingerprint] = {'fingerprint': fingerprint, 'cache': f"{fingerprint}.csv", 'created': time.time()}
+    _write(manifest_path, json.dumps(manifest))
+    return _write(os.path.join(cache_dir, f"{fingerprint}.csv"), "a\n1\n")
+
+
+class CountingRunner:
+    """run_script wrapper that counts real executions."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return run_script(*args, **kwargs)
+
+
+class TestKeys:
+    """Tests for cache key components."""
+
+    def test_code_hash_ignores_comments_and_formatting(self):
+        """Test that comments and whitespace don't change the code hash."""
+        a = "x = 1\nprint(x)\n"
+        b = "# set x\nx   =   1\n\n\nprint( x )  # show it\n"
+
+        assert normalized_code_hash(a) == normalized_code_hash(b)
+        assert normalized_code_hash(a) != normalized_code_hash("x = 2\nprint(x)\n")
+
+    def test_code_hash_handles_invalid_code(self):
+        """Test that code that doesn't parse is still hashed."""
+        assert normalized_code_hash("def broken(:\n") == normalized_code_hash("def broken(:   \n\n")
+
+    def test_file_hash(self, temp_dir):
+        """Test that the dataset hash follows file content."""
+        path = _write(os.path.join(temp_dir, "data.csv"), "a,b\n1,2\n")
+        first = file_hash(path)
+        _write(path, "a,b\n1,3\n")
+
+        assert file_hash(path) != first
+        assert file_hash(None) == ""
+
+    def test_library_versions_in_key(self):
+        """Test that different library versions give different keys."""
+        cache = ExecutionCache()
+        versions = library_versions()
+
+        assert 'python' in versions and 'pandas' in versions
+        assert cache.key("print(1)", versions=versions) != cache.key("print(1)", versions={**versions, 'pandas': "0.0"})
+
+
+    def test_local_modules_found(self, temp_dir):
+        """Test that modules imported from the script's directory are found transitively."""
+        package = os.path.basename(temp_dir)
+        _write(os.path.join(temp_dir, "metrics.py"), "try:\n    from helpers import scale\nexcept ImportError:\n    scale = None\n")
+        _write(os.path.join(temp_dir, "helpers.py"), "import os\ndef scale(x):\n    return x\n")
+        _write(os.path.join(temp_dir, "unused.py"), "")
+        code = f"import numpy as np\nfrom {package}.metrics import scale\n"
+
+        assert local_modules(code, temp_dir) == sorted(
+            os.path.join(temp_dir, name) for name in ("helpers.py", "metrics.py"))
+
+
+class TestCachedRun:
+    """Tests for running scripts through the cache."""
+
+    def test_hit_replays_output_and_artifacts(self, temp_dir):
+        """Test that an unchanged script is replayed, including saved files."""
+        cache = ExecutionCache(os.path.join(temp_dir, "cache"))
+        script = _write(os.path.join(temp_dir, "analysis.py"),
+                        "print('result')\nopen('figure.txt', 'w').write('plot')\n")
+        runner = CountingRunner()
+
+        first = cached_run(cache, script, None, os.path.join(temp_dir, "run1"), runner=runner)
+        second = cached_run(cache, script, None, os.path.join(temp_dir, "run2"), runner=runner)
+
+        assert runner.calls == 1
+        assert first['cached'] is False and second['cached'] is True
+        assert second['stdout'] == first['stdout'] == "result\n"
+        assert second['result'] is None
+        replayed = os.path.join(temp_dir, "run2", "figure.txt")
+        assert second['artifacts'] == [replayed]
+        with open(replayed) as f:
+            assert f.read() == "plot"
+
+    def test_changed_data_misses(self, temp_dir):
+        """Test that a changed dataset runs the script again."""
+        cache = ExecutionCache(os.path.join(temp_dir, "cache"))
+        script = _write(os.path.join(temp_dir, "analysis.py"),
+                        "import os\nprint(len(open(os.environ['DATA_FILE_PATH']).readlines()))\n")
+        data = _write(os.path.join(temp_dir, "data.csv"), "a\n1\n")
+        runner = CountingRunner()
+
+        cached_run(cache, script, data, os.path.join(temp_dir, "run"), runner=runner)
+        _write(data, "a\n1\n2\n")
+        result = cached_run(cache, script, data, os.path.join(temp_dir, "run"), runner=runner)
+
+        assert runner.calls == 2
+        assert result['stdout'].strip() == "3"
+
+    def test_changed_local_module_misses(self, temp_dir):
+        """Test that editing a module the script imports runs the script again."""
+        cache = ExecutionCache(os.path.join(temp_dir, "cache"))
+        code_dir = os.path.join(temp_dir, "code")
+        os.makedirs(code_dir)
+        script = _write(os.path.join(code_dir, "analysis.py"), "from metrics import VALUE\nprint(VALUE)\n")
+        module = _write(os.path.join(code_dir, "metrics.py"), "VALUE = 1\n")
+        runner = CountingRunner()
+
+        cached_run(cache, script, None, os.path.join(temp_dir, "run"), runner=runner)
+        assert cached_run(cache, script, None, os.path.join(temp_dir, "run"), runner=runner)['cached']
+        _write(module, "VALUE = 2\n")
+        result = cached_run(cache, script, None, os.path.join(temp_dir, "run"), runner=runner)
+
+        assert runner.calls == 2
+        assert result['stdout'].strip() == "2"
+
+    def test_changed_loaded_dataset_misses(self, temp_dir):
+        """Test that changing a cached dataset the script loads runs it again."""
+        cache = ExecutionCache(os.path.join(temp_dir, "cache"))
+        script = _write(os.path.join(temp_dir, "analysis.py"), LOADING_SCRIPT)
+        cached = _cache_dataset(temp_dir, "abc")
+        runner = CountingRunner()
+
+        cached_run(cache, script, None, os.path.join(temp_dir, "run"), runner=runner)
+        _write(cached, "a\n2\n")
+        cached_run(cache, script, None, os.path.join(temp_dir, "run"), runner=runner)
+
+        assert runner.calls == 2
+
+    def test_other_cached_datasets_ignored(self, temp_dir):
+        """Test that caching another dataset, which rewrites the manifest, still hits."""
+        cache = ExecutionCache(os.path.join(temp_dir, "cache"))
+        script = _write(os.path.join(temp_dir, "analysis.py"), LOADING_SCRIPT)
+        _cache_dataset(temp_dir, "abc")
+        runner = CountingRunner()
+
+        cached_run(cache, script, None, os.path.join(temp_dir, "run"), runner=runner)
+        _cache_dataset(temp_dir, "def")
+        result = cached_run(cache, script, None, os.path.join(temp_dir, "run"), runner=runner)
+
+        assert runner.calls == 1
+        assert result['cached']
+
+    def test_failures_not_cached(self, temp_dir):
+        """Test that a failing script is retried rather than replayed."""
+        cache = ExecutionCache(os.path.join(temp_dir, "cache"))
+        script = _write(os.path.join(temp_dir, "analysis.py"), "raise ValueError('boom')\n")
+        runner = CountingRunner()
+
+        cached_run(cache, script, None, os.path.join(temp_dir, "run"), runner=runner)
+        result = cached_run(cache, script, None, os.path.join(temp_dir, "run"), runner=runner)
+
+        assert runner.calls == 2
+        assert result['returncode'] == 1
+        assert not os.path.exists(os.path.join(temp_dir, "cache"))
@@ -0,0 +1,156 @@
+"""
+Tests for the bounded, compacting learning materials store.
+"""
+import os
+import json
+import pytest
+
+from pipeline.learning_store import (
+    LearningStore,
+    split_lessons,
+    is_duplicate,
+)
+from pipeline.tokens import estimate_tokens
+
+
+class TestSplitLessons:
+    """Tests for splitting Critique materials into lessons."""
+
+    def test_sections_and_bullets(self, sample_learning_materials):
+        """Test that bullets become lessons under their heading."""
+        lessons = split_lessons(sample_learning_materials)
+
+        assert ("Strengths", "Good code structure") in lessons
+        assert ("Areas for Improvement", "Add more error handling") in lessons
+        assert len(lessons) == 5
+
+    def test_bold_headings_and_escaped_newlines(self):
+        """Test bold-line headings and literal '\\n' sequences."""
+        lessons = split_lessons("**Key Improvements Needed:**\\n- **Logging:** Add logging.\\n---")
+        assert lessons == [("Key Improvements Needed", "**Logging:** Add logging.")]
+
+    def test_wrapped_bullet(self):
+        """Test that continuation lines stay with their bullet."""
+        lessons = split_lessons("- First line\n  continues here\n- Second")
+        assert [text for _, text in lessons] == ["First line continues here", "Second"]
+
+
+class TestIsDuplicate:
+    """Tests for near-duplicate detection."""
+
+    def test_same_label(self):
+        """Test that lessons with the same bold label and related text match."""
+        assert is_duplicate("**Logging:** Use logging for progress.", "**Logging**: Track progress with logging.")
+
+    def test_same_label_different_text(self):
+        """Test that different lessons under a shared bold label are kept apart."""
+        assert not is_duplicate("**Data quality:** Check for missing values.",
+                                "**Data quality:** Remove duplicate rows before clustering.")
+
+    def test_similar_wording(self):
+        """Test that reworded lessons with high word overlap match."""
+        assert is_duplicate("Use random seeds for all clustering steps", "Use random seeds for all clustering")
+
+    def test_different_lessons(self):
+        """Test that unrelated lessons do not match."""
+        assert not is_duplicate("Add docstrings", "Validate input data for missing values")
+
+
+class TestLearningStore:
+    """Tests for LearningStore."""
+
+    def test_add_renders_markdown(self, temp_dir, sample_learning_materials):
+        """Test that adding materials writes lessons and rendered markdown."""
+        store = LearningStore(temp_dir)
+        rendered = store.add("dev", sample_learning_materials)
+
+        assert "### Strengths\n- Good code structure" in rendered
+        with open(os.path.join(temp_dir, "dev_learning.md")) as f:
+            assert f.read() == rendered
+        with open(os.path.join(temp_dir, "dev_lessons.json")) as f:
+            assert json.load(f)['run'] == 1
+
+    def test_repeated_materials_do_not_grow(self, temp_dir, sample_learning_materials):
+        """Test that re-adding the same materials is deduplicated."""
+        store = LearningStore(temp_dir)
+        first = store.add("dev", sample_learning_materials)
+        for _ in range(5):
+            latest = store.add("dev", sample_learning_materials)
+
+        assert latest == first
+        lessons = store.load("dev")['lessons']
+        assert all(lesson['hits'] == 6 for lesson in lessons)
+
+    def test_token_cap_enforced(self, temp_dir):
+        """Test that materials stay within the token cap across many runs."""
+        store = LearningStore(temp_dir, token_cap=60)
+        for run in range(30):
+            store.add("dev", f"### Areas for Improvement\n- Lesson {run}: fix component{run} handling of case{run}")
+
+        rendered = store.materials("dev")
+        assert estimate_tokens(rendered) <= 60
+        # Most recent lessons survive eviction
+        assert "Lesson 29" in rendered
+        assert "Lesson 0:" not in rendered
+
+    def test_importance_beats_recency(self, temp_dir):
+        """Test that repeated improvement lessons outlive newer strengths."""
+        store = LearningStore(temp_dir, token_cap=40)
+        store.add("dev", "### Areas for Improvement\n- Handle errors around file loading")
+        store.add("dev", "### Areas for Improvement\n- Handle errors around file loading")
+        store.add("dev", "### Strengths\n- Charts were nice and pretty overall\n- Tables were tidy and well labelled")
+
+        assert "Handle errors" in store.materials("dev")
+
+    def test_summarizer_compacts_old_lessons(self, temp_dir):
+        """Test that old lessons are consolidated by the summarizer."""
+        calls = []
+
+        def summarizer(lessons):
+            calls.append(lessons)
+            return "Keep code robust."
+
+        store = LearningStore(temp_dir, token_cap=50, summarizer=summarizer)
+        for run in range(6):
+            store.add("dev", f"- Lesson {run}: improve module{run} with care{run} and detail{run}")
+
+        rendered = store.materials("dev")
+        assert calls
+        assert "### Consolidated Lessons\n- Keep code robust." in rendered
+        assert estimate_tokens(rendered) <= 50
+
+    def test_compaction_saved_on_load(self, temp_dir):
+        """Test that compaction done while loading materials is persisted."""
+        calls = []
+
+        def summarizer(lessons):
+            calls.append(lessons)
+            return "Keep code robust."
+
+        for run in range(6):
+            LearningStore(temp_dir, token_cap=1000).add(
+                "dev", f"- Lesson {run}: improve module{run} with care{run} and detail{run}")
+
+        store = LearningStore(temp_dir, token_cap=50, summarizer=summarizer)
+        first = store.materials("dev")
+        second = store.materials("dev")
+
+        assert len(calls) == 1
+        assert first == second
+        with open(os.path.join(temp_dir, "dev_learning.md")) as f:
+            assert f.read() == first
+
+    def test_legacy_file_imported(self, temp_dir):
+        """Test that an append-only legacy file is imported and deduplicated."""
+        legacy = "- **Logging:** Add logging.\n\n---\n\n- **Logging:** Use the logging module.\n\n---\n\n- Validate inputs"
+        with open(os.path.join(temp_dir, "quant_learning.md"), "w") as f:
+            f.write(legacy)
+
+        state = LearningStore(temp_dir).load("quant")
+
+        assert state['run'] == 3
+        assert [l['text'] for l in state['lessons']] == ["**Logging:** Use the logging module.", "Validate inputs"]
+
+    def test_missing_agent(self, temp_dir):
+        """Test that an agent without materials returns None."""
+        assert LearningStore(temp_dir).materials("nobody") is None
@@ -0,0 +1,113 @@
+"""
+Tests for the SQLite full-text lesson index.
+"""
+import os
+import multiprocessing
+import pytest
+
+from pipeline.lesson_index import LessonIndex, query_terms
+
+
+def _write_lessons(args):
+    """Write a batch of lessons from a separate process."""
+    db_path, worker = args
+    index = LessonIndex(db_path)
+    for i in range(20):
+        index.add("dev", [("Lessons", f"Worker {worker} lesson {i} about topic{worker}x{i}")])
+    return worker
+
+
+@pytest.fixture
+def index(temp_dir):
+    """Index populated with a few lessons for two agents."""
+    index = LessonIndex(os.path.join(temp_dir, "lessons.db"))
+    index.add("dev", [
+        ("Areas for Improvement", "Add error handling around file loading"),
+        ("Areas for Improvement", "Set random seeds for t-SNE and clustering"),
+        ("Strengths", "Clear sentiment histograms"),
+        ("Resources", "Read the pandas categorical dtype guide"),
+    ])
+    index.add("quant", [("Areas for Improvement", "Explain p-values in plain language")])
+    return index
+
+
+class TestQueryTerms:
+    """Tests for building query terms from context."""
+
+    def test_stopwords_removed(self):
+        """Test that stopwords and short tokens are dropped."""
+        assert query_terms("the clustering of the sentiment is ok") == ["clustering", "sentiment"]
+
+    def test_most_frequent_first(self):
+        """Test that terms are ordered by frequency across texts."""
+        terms = query_terms("participant question", "participant strength", limit=2)
+        assert terms[0] == "participant"
+        assert len(terms) == 2
+
+
+class TestLessonIndex:
+    """Tests for LessonIndex."""
+
+    def test_relevant_lessons_first(self, index):
+        """Test that BM25 ranks matching lessons first."""
+        lessons = index.search("dev", ["clustering", "seeds"], k=1)
+        assert lessons == [{'section': 'Areas for Improvement', 'text': 'Set random seeds for t-SNE and clustering'}]
+
+    def test_agents_are_separate(self, index):
+        """Test that retrieval only returns the requested agent's lessons."""
+        lessons = index.search("quant", ["error", "handling"], k=5)
+        assert [l['text'] for l in lessons] == ["Explain p-values in plain language"]
+
+    def test_fills_up_to_k(self, index):
+        """Test that non-matching lessons fill the remaining slots by importance."""
+        lessons = index.search("dev", ["sentiment"], k=3)
+        assert lessons[0]['text'] == "Clear sentiment histograms"
+        assert len(lessons) == 3
+        assert all(l['section'] == 'Areas for Improvement' for l in lessons[1:])
+
+    def test_important_sections_first(self, index):
+        """Test that a lesson from a more important section outranks an equally relevant one."""
+        index.add("critique", [
+            ("Strengths", "Outlier handling in the clustering step"),
+            ("Critical Issues", "Outlier handling in the clustering code"),
+        ])
+
+        lessons = index.search("critique", ["outlier", "clustering"], k=2)
+        assert [l['section'] for l in lessons] == ["Critical Issues", "Strengths"]
+
+    def test_current_stage_boosted(self, index):
+        """Test that lessons from the current stage rank ahead of equally relevant ones."""
+        index.add("spec", [("Lessons", "Profile text columns before clustering")], stage="summary")
+        index.add("spec", [("Lessons", "Check raw rows before clustering")], stage="full")
+
+        for stage, first in [("summary", "Profile"), ("full", "Check")]:
+            lessons = index.search("spec", ["clustering"], k=2, stage=stage)
+            assert lessons[0]['text'].startswith(first)
+            fill = index.search("spec", [], k=1, stage=stage)
+            assert fill[0]['text'].startswith(first)
+
+    def test_constant_size(self, index):
+        """Test that retrieval size does not grow with the number of lessons."""
+        before = index.retrieve("dev", "file loading errors", k=2)
+        index.add("dev", [("Lessons", f"Extra lesson number {i} on loading files") for i in range(200)])
+        after = index.retrieve("dev", "file loading errors", k=2)
+
+        assert before.count("\n- ") == after.count("\n- ") == 2
+
+    def test_duplicates_bump_hits(self, index):
+        """Test that re-adding a lesson does not create a second row."""
+        index.add("dev", [("Areas for Improvement", "add ERROR handling around  file loading")])
+        assert index.count("dev") == 4
+
+    def test_retrieve_empty_agent(self, index):
+        """Test that an agent with no lessons returns None."""
+        assert index.retrieve("spec", "anything") is None
+
+    def test_concurrent_writers(self, temp_dir):
+        """Test that parallel runs can write to the same index."""
+        db_path = os.path.join(temp_dir, "shared.db")
+        LessonIndex(db_path)
+        with multiprocessing.get_context("spawn").Pool(4) as pool:
+            pool.map(_write_lessons, [(db_path, w) for w in range(4)])
+
+        assert LessonIndex(db_path).count("dev") == 80
@@ -0,0 +1,100 @@
+"""
+Tests for the local sandboxed executor.
+"""
+import os
+import sys
+import time
+import pytest
+
+from pipeline.local_executor import run_script, run_code, DATA_PATH_ENV
+
+
+class TestRunCode:
+    """Tests for running generated code locally."""
+
+    def test_stdout_and_shape(self, temp_dir):
+        """Test that results come back in the remote execution shape."""
+        result = run_code("print('hello')", None, temp_dir)
+
+        assert result['stdout'] == "hello\n"
+        assert result['stderr'] == ""
+        assert result['result'] is None
+        assert result['returncode'] == 0
+
+    def test_reads_dataset_from_env(self, temp_dir, sample_csv_small):
+        """Test that the dataset path is passed in the environment."""
+        code = f"import os, pandas as pd\nprint(len(pd.read_csv(os.environ['{DATA_PATH_ENV}'])))"
+        result = run_code(code, sample_csv_small, os.path.join(temp_dir, "run"))
+
+        assert result['stdout'].strip() == "50"
+
+    def test_artifacts_collected(self, temp_dir):
+        """Test that files saved with relative paths are reported as artifacts."""
+        run_dir = os.path.join(temp_dir, "run")
+        code = "import matplotlib.pyplot as plt\nplt.plot([1, 2])\nplt.savefig('figure.png')"
+        result = run_code(code, None, run_dir)
+
+        assert os.path.join(run_dir, "figure.png") in result['artifacts']
+        assert os.path.exists(os.path.join(run_dir, "figure.png"))
+
+    def test_errors_reported(self, temp_dir):
+        """Test that a failing script returns its traceback and exit code."""
+        result = run_code("raise ValueError('boom')", None, temp_dir)
+
+        assert result['returncode'] == 1
+        assert "ValueError: boom" in result['stderr']
+        assert result['result'] == "Process exited with code 1"
+
+    def test_timeout(self, temp_dir):
+        """Test that a script over the wall-clock limit is stopped."""
+        result = run_code("import time\nprint('started', flush=True)\ntime.sleep(30)", None, temp_dir,
+                          limits={'timeout_seconds': 1})
+
+        assert result['returncode'] is None
+        assert result['result'] == "Timed out after 1 seconds"
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="process groups are POSIX only")
+    def test_timeout_kills_grandchildren(self, temp_dir):
+        """Test that processes started by a timed-out script are killed too."""
+        code = (
+            "import subprocess, sys, time\n"
+            "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+            "print(child.pid, flush=True)\n"
+            "time.sleep(60)"
+        )
+        start = time.perf_counter()
+        result = run_code(code, None, temp_dir, limits={'timeout_seconds': 2})
+
+        assert result['returncode'] is None
+        assert time.perf_counter() - start < 30
+        grandchild = int(result['stdout'].split()[0])
+
+        def alive():
+            # A zombie waiting for init to reap it counts as dead
+            try:
+                with open(f"/proc/{grandchild}/status") as f:
+                    return "State:\tZ" not in f.read()
+            except FileNotFoundError:
+                return False
+
+        deadline = time.perf_counter() + 5
+        while alive() and time.perf_counter() < deadline:
+            time.sleep(0.1)
+        assert not alive()
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="resource limits are POSIX only")
+    def test_memory_limit(self, temp_dir):
+        """Test that allocations over the memory limit fail."""
+        result = run_code("x = bytearray(2 * 1024 ** 3)", None, temp_dir, limits={'memory_mb': 512})
+
+        assert result['returncode'] != 0
+        assert "MemoryError" in result['stderr']
+
+    def test_run_existing_script(self, temp_dir):
+        """Test that an existing script runs with the output directory as cwd."""
+        script = os.path.join(temp_dir, "script.py")
+        with open(script, "w") as f:
+            f.write("import os\nprint(os.path.basename(os.getcwd()))")
+        result = run_script(script, None, os.path.join(temp_dir, "outdir"))
+
+        assert result['stdout'].strip() == "outdir"
@@ -0,0 +1,190 @@
+"""
+Tests for dependency-aware parallel execution of script cells.
+"""
+import os
+import textwrap
+import time
+import pytest
+
+from pipeline.parallel_cells import split_cells, run_cells, describe_plan, POOL_SUPPORTED
+from pipeline.local_executor import run_script
+
+
+def _cells(code):
+    return split_cells(textwrap.dedent(code))
+
+
+def _deps_by_line(cells):
+    return {cell.line: {cells[d].line for d in cell.deps} for cell in cells}
+
+
+class TestSplitCells:
+    """Tests for building the dependency graph."""
+
+    def test_read_after_write(self):
+        """Test that a cell depends on the cell that assigned what it reads."""
+        deps = _deps_by_line(_cells("""
+            a = 1
+            b = 2
+            c = a + 1
+        """))
+
+        assert deps[4] == {2}
+
+    def test_columns_are_separate_resources(self):
+        """Test that cells adding different columns to a frame don't depend on each other."""
+        deps = _deps_by_line(_cells("""
+            df = load()
+            df['x'] = f(df['text'])
+            df['y'] = g(df['text'])
+            total = summarize(df)
+        """))
+
+        assert deps[3] == {2}
+        assert deps[4] == {2}
+        assert deps[5] == {2, 3, 4}
+
+    def test_write_after_read(self):
+        """Test that rebinding a name waits for earlier readers of it."""
+        deps = _deps_by_line(_cells("""
+            a = 1
+            b = a * 2
+            a = 5
+        """))
+
+        assert 3 in deps[4]
+
+    def test_function_globals_and_mutated_arguments(self):
+        """Test that calls pick up the globals a function reads and the arguments it mutates."""
+        cells = _cells("""
+            import logging
+            logger = logging.getLogger()
+            results = []
+            def record(items, value):
+                logger.info(value)
+                items.append(value)
+            record(results, 1)
+            print(results)
+        """)
+        deps = _deps_by_line(cells)
+
+        assert {3, 4, 5} <= deps[8]
+        assert 8 in deps[9]
+        assert cells[4].parallel and not cells[5].parallel
+
+    def test_top_level_pyplot_calls_keep_order(self):
+        """Test that top-level pyplot calls are ordered by pyplot's global state."""
+        deps = _deps_by_line(_cells("""
+            import matplotlib.pyplot as plt
+            plt.figure()
+            plt.plot([1, 2])
+            plt.savefig('figure.png')
+        """))
+
+        assert 3 in deps[4] and 4 in deps[5]
+
+    def test_comprehension_variables_are_local(self):
+        """Test that comprehension variables don't create dependencies."""
+        deps = _deps_by_line(_cells("""
+            x = 1
+            values = [x * 2 for x in range(3)]
+        """))
+
+        assert deps[3] == set()
+
+    def test_describe_plan(self):
+        """Test that the plan lists each cell with its dependencies."""
+        plan = describe_plan(_cells("""
+            def step(v):
+                return v
+            a = step(1)
+        """))
+
+        assert "line     4 [worker] after lines: 2" in plan
+
+
+class TestRunCells:
+    """Tests for running scripts cell by cell."""
+
+    def test_results_match_serial_run(self, capsys):
+        """Test that the script produces the same values and output order as a serial run."""
+        code = textwrap.dedent("""
+            import pandas as pd
+            df = pd.DataFrame({'text': ['a b', 'c d e', 'f']})
+            def lengths(s):
+                print('lengths')
+                return s.str.len()
+            def words(s):
+                print('words')
+                return s.str.split().str.len()
+            df['chars'] = lengths(df['text'])
+            df['words'] = words(df['text'])
+            print(df['chars'].sum(), df['words'].sum())
+        """)
+        exit_code = run_cells(code, workers=2)
+
+        assert exit_code == 0
+        assert capsys.readouterr().out == "lengths\nwords\n9 6\n"
+
+    @pytest.mark.skipif(not POOL_SUPPORTED, reason="parallel cells need fork")
+    def test_independent_steps_overlap(self, capsys):
+        """Test that independent slow steps run at the same time."""
+        code = textwrap.dedent("""
+            import time
+            def slow(v):
+                time.sleep(0.5)
+                return v
+            a = slow(1)
+            b = slow(2)
+            c = slow(3)
+            print(a + b + c)
+        """)
+        start = time.perf_counter()
+        exit_code = run_cells(code, workers=3)
+        elapsed = time.perf_counter() - start
+
+        assert exit_code == 0
+        assert capsys.readouterr().out == "6\n"
+        assert elapsed < 1.2
+
+    def test_failure_stops_in_source_order(self, capsys):
+        """Test that a failing cell prints everything before it and nothing after."""
+        code = textwrap.dedent("""
+            def step(v):
+                return v
+            def fail():
+                raise ValueError('boom')
+            print('before')
+            a = step(1)
+            b = fail()
+            print('after')
+        """)
+        exit_code = run_cells(code, workers=2)
+        captured = capsys.readouterr()
+
+        assert exit_code == 1
+        assert captured.out == "before\n"
+        assert "ValueError: boom" in captured.err
+
+    def test_unpicklable_values_rerun_locally(self, capsys):
+        """Test that a cell whose result can't be sent back still works."""
+        code = textwrap.dedent("""
+            import threading
+            def make_lock():
+                return threading.Lock()
+            lock = make_lock()
+            print(lock.locked())
+        """)
+
+        assert run_cells(code, workers=2) == 0
+        assert capsys.readouterr().out == "False\n"
+
+    def test_local_executor_option(self, temp_dir):
+        """Test that the local executor can run scripts through the parallel runner."""
+        script = os.path.join(temp_dir, "analysis.py")
+        with open(script, "w") as f:
+            f.write("def step(v):\n    return v\na = step(2)\nb = step(3)\nprint(a * b)\n")
+        result = run_script(script, None, temp_dir, parallel_cells=2)
+
+        assert result['stdout'] == "6\n"
+        assert result['returncode'] == 0
@@ -0,0 +1,115 @@
+"""
+Tests for stage-specific context projections.
+"""
+from pipeline.projections import (
+    strip_code_blocks,
+    collapse_duplicate_messages,
+    project_messages,
+    project_executions,
+    data_reference,
+    project_prompt,
+)
+from pipeline.prompts import segment, STABILITY_AGENT, STABILITY_DATA, STABILITY_RUN
+from pipeline.tokens import estimate_tokens
+
+
+DEV_MESSAGE = """Here is the analysis.
+
+```python
+import pandas as pd
+df = pd.read_csv('data.csv')
+print(df.shape)
+```
+
+The clusters are well separated."""
+
+# Same settings as the projections configured in main.py
+QUANT_PROJECTION = {'strip_code': True, 'dedupe_messages': True, 'stdout_token_cap': 6000}
+CRITIQUE_PROJECTION = {'strip_code': False, 'dedupe_messages': True, 'stdout_token_cap': 6000, 'data': 'fingerprint'}
+
+
+class TestStripCodeBlocks:
+    """Tests for removing code from messages."""
+
+    def test_code_replaced_with_placeholder(self):
+        """Test that code blocks become a placeholder and prose is kept."""
+        stripped = strip_code_blocks(DEV_MESSAGE)
+
+        assert "import pandas" not in stripped
+        assert "[python code block omitted: 3 lines]" in stripped
+        assert "The clusters are well separated." in stripped
+
+    def test_unterminated_block(self):
+        """Test that an unterminated block is stripped to the end."""
+        stripped = strip_code_blocks("Intro\n```\nx = 1\n")
+        assert stripped == "Intro\n[code code block omitted: 1 lines]"
+
+
+class TestMessages:
+    """Tests for projecting Dev messages."""
+
+    def test_duplicates_collapsed(self):
+        """Test that whitespace-only differences count as duplicates."""
+        assert collapse_duplicate_messages(["a  b", "a b\n", "c"]) == ["a  b", "c"]
+
+    def test_quant_projection(self):
+        """Test that Quant's view has no code and no duplicates."""
+        projected = project_messages([DEV_MESSAGE, DEV_MESSAGE], QUANT_PROJECTION)
+
+        assert len(projected) == 1
+        assert "import pandas" not in projected[0]
+
+    def test_critique_projection_keeps_code(self):
+        """Test that Critique's view keeps the code."""
+        projected = project_messages([DEV_MESSAGE], CRITIQUE_PROJECTION)
+        assert "import pandas" in projected[0]
+
+
+class TestExecutions:
+    """Tests for projecting execution results."""
+
+    def test_stdout_capped(self):
+        """Test that long stdout is capped and other fields kept."""
+        executions = [{'stdout': "\n".join(f"row {i}: {'x' * i}" for i in range(500)), 'stderr': 'warn', 'result': None}]
+        projected = project_executions(executions, {'stdout_token_cap': 100})
+
+        assert estimate_tokens(projected[0]['stdout']) <= 100
+        assert projected[0]['stderr'] == 'warn'
+        assert executions[0]['stdout'].startswith("row 0")
+
+    def test_no_cap(self):
+        """Test that stdout is untouched without a cap."""
+        executions = [{'stdout': "a\n" * 10, 'stderr': '', 'result': None}]
+        assert project_executions(executions, {})[0]['stdout'] == "a\n" * 10
+
+
+class TestProjectPrompt:
+    """Tests for projecting the data segment of a prompt."""
+
+    def segments(self):
+        return [
+            segment("instructions", "Extend the script.", STABILITY_AGENT),
+            segment("data", "a,b\n1,2\n3,4", STABILITY_DATA),
+            segment("specification", "Add a chart.", STABILITY_RUN),
+        ]
+
+    def test_full(self):
+        """Test that 'full' reproduces the original prompt."""
+        assert "1,2" in project_prompt(self.segments(), {'data': 'full'})
+
+    def test_fingerprint(self):
+        """Test that 'fingerprint' replaces the data with a stable reference."""
+        prompt = project_prompt(self.segments(), {'data': 'fingerprint'}, description="full mode")
+
+        assert "1,2" not in prompt
+        assert data_reference("a,b\n1,2\n3,4", "full mode") in prompt
+        assert prompt.endswith("Add a chart.")
+
+    def test_omit(self):
+        """Test that 'omit' drops the data segment."""
+        prompt = project_prompt(self.segments(), {'data': 'omit'})
+        assert prompt == "Extend the script.\n\nAdd a chart."
+
+    def test_reference_identifies_data(self):
+        """Test that different data gets a different fingerprint."""
+        assert data_reference("a,b\n1,2") != data_reference("a,b\n1,3")
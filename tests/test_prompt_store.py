@@ -0,0 +1,165 @@
+"""
+Tests for the versioned Whisper prompt store.
+"""
+import os
+import pytest
+
+from pipeline.prompt_store import PromptStore, trim_to_tokens, split_sections
+from pipeline.tokens import estimate_tokens
+
+
+@pytest.fixture
+def store(temp_dir):
+    """Prompt store with an existing prompt file."""
+    prompt_path = os.path.join(temp_dir, "whisper_message.txt")
+    with open(prompt_path, "w") as f:
+        f.write("You are Whisper.\n\nDesign prompts for Spec and Quant.")
+    return PromptStore(prompt_path, os.path.join(temp_dir, "history"), token_cap=100)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+class TestTrimToTokens:
+    """Tests for deterministic trimming."""
+
+    def test_short_text_unchanged(self):
+        """Test that text within the cap is returned as-is."""
+        assert trim_to_tokens("short", 10) == "short"
+
+    def test_trims_at_paragraph(self):
+        """Test that trimming keeps whole paragraphs."""
+        text = "a" * 40 + "\n\n" + "b" * 40 + "\n\n" + "c" * 40
+        assert trim_to_tokens(text, 22) == "a" * 40 + "\n\n" + "b" * 40
+
+    def test_least_important_sections_first(self):
+        """Test that low-importance sections go before appended suggestions."""
+        text = "\n\n".join([
+            "You are Whisper.",
+            "### Resources",
+            "Link one " * 10,
+            "Link two " * 10,
+            "## Quant Agent Prompt Suggestions",
+            "Explain the clusters " * 5,
+        ])
+        trimmed = trim_to_tokens(text, 50)
+
+        assert "Resources" not in trimmed
+        assert trimmed.startswith("You are Whisper.")
+        assert trimmed.endswith("## Quant Agent Prompt Suggestions\n\n" + "Explain the clusters " * 5)
+
+    def test_split_sections(self):
+        """Test splitting a prompt at heading paragraphs."""
+        sections = split_sections("Intro\n\n## Spec Agent Prompt Suggestions\nBe precise\n\nMore")
+        assert sections == [
+            (None, ["Intro"]),
+            ("Spec Agent Prompt Suggestions", ["## Spec Agent Prompt Suggestions\nBe precise", "More"]),
+        ]
+
+
+class TestPromptStore:
+    """Tests for PromptStore."""
+
+    def test_imports_existing_prompt(self, store):
+        """Test that the current prompt file becomes version 1."""
+        assert store.sync() == 1
+        assert store.history()[0]['note'] == "imported"
+        assert store.history()[0]['tokens'] == estimate_tokens(store.read(1))
+
+    def test_commit_writes_prompt_file(self, store):
+        """Test that committing activates and writes the new revision."""
+        store.sync()
+        version = store.commit("You are Whisper v2.", note="critique")
+
+        assert version == 2
+        assert read(store.prompt_path) == "You are Whisper v2."
+        assert store.history()[1]['parent'] == 1
+
+    def test_identical_commit_is_noop(self, store):
+        """Test that committing the active text does not add a revision."""
+        store.sync()
+        assert store.sync() == 1
+        assert len(store.history()) == 1
+
+    def test_manual_edit_becomes_revision(self, store):
+        """Test that hand edits to the prompt file are recorded."""
+        store.sync()
+        with open(store.prompt_path, "w") as f:
+            f.write("Hand-edited prompt")
+        assert store.sync() == 2
+
+    def test_active_version_read_only(self, store):
+        """Test that reading the active version does not record the prompt file."""
+        assert store.active_version() is None
+        assert store.history() == []
+
+    def test_cap_forces_trimming(self, store):
+        """Test that oversized revisions are trimmed to the cap."""
+        text = "Base prompt.\n\n" + "\n\n".join(f"Suggestion {i} " * 10 for i in range(20))
+        version = store.commit(text)
+        assert estimate_tokens(read(store.prompt_path)) <= 100
+        assert "trimmed" in store.history()[-1]['note']
+
+        # The full text is kept as the parent revision
+        raw, trimmed = store.history()
+        assert store.read(raw['version']) == text.strip()
+        assert trimmed['parent'] == raw['version']
+        assert store.active_version() == version == trimmed['version']
+
+        # Re-committing the same full text is a no-op
+        assert store.commit(text) == version
+        assert len(store.history()) == 2
+
+    def test_consolidator_used(self, temp_dir):
+        """Test that an oversized revision is consolidated when possible."""
+        calls = []
+
+        def consolidator(text, token_cap):
+            calls.append(token_cap)
+            return "Consolidated prompt."
+
+        store = PromptStore(os.path.join(temp_dir, "p.txt"), os.path.join(temp_dir, "h"), token_cap=10, consolidator=consolidator)
+        store.commit("x " * 200)
+
+        assert calls == [10]
+        assert read(store.prompt_path) == "Consolidated prompt."
+
+    def test_diff(self, store):
+        """Test unified diffs between revisions."""
+        store.sync()
+        store.commit("You are Whisper.\n\nDesign prompts for Spec only.")
+        diff = store.diff(1, 2)
+
+        assert "-Design prompts for Spec and Quant." in diff
+        assert "+Design prompts for Spec only." in diff
+
+    def test_rollback(self, store):
+        """Test that rollback restores an earlier revision."""
+        store.sync()
+        store.commit("Longer prompt " * 10)
+        store.rollback(1)
+
+        assert store.active_version() == 1
+        assert read(store.prompt_path) == store.read(1)
+
+    def test_rollback_unknown(self, store):
+        """Test that rolling back to a missing revision raises."""
+        with pytest.raises(ValueError):
+            store.rollback(42)
+
+    def test_best_version(self, store):
+        """Test choosing the fastest revision from recorded runs."""
+        store.sync()
+        store.commit("Second prompt")
+        store.record_run(1, 300.0)
+        store.record_run(2, 120.0)
+        store.record_run(2, 140.0, succeeded=False)
+
+        assert store.best_version() == 2
+
+    def test_best_version_without_runs(self, store):
+        """Test that no best version exists before any runs."""
+        store.sync()
+        assert store.best_version() is None
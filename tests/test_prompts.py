@@ -0,0 +1,90 @@
+"""
+Tests for cache-friendly prompt assembly.
+"""
+import os
+import json
+import pytest
+
+from pipeline.prompts import (
+    segment,
+    order_segments,
+    assemble_prompt,
+    prefix_hashes,
+    record_prefix_hashes,
+    STABILITY_AGENT,
+    STABILITY_SCRIPT,
+    STABILITY_LEARNING,
+    STABILITY_DATA,
+    STABILITY_RUN,
+)
+
+
+def dev_segments(spec="Spec v1", data="a,b\n1,2", learning="Use logging"):
+    """Build segments shaped like the Dev prompt, deliberately out of order."""
+    return [
+        segment("specification", spec, STABILITY_RUN),
+        segment("data", data, STABILITY_DATA),
+        segment("instructions", "Print all results.", STABILITY_AGENT),
+        segment("learning", learning, STABILITY_LEARNING),
+        segment("script", "def f(): pass", STABILITY_SCRIPT),
+    ]
+
+
+class TestAssemblePrompt:
+    """Tests for ordering and joining segments."""
+
+    def test_most_stable_first(self):
+        """Test that segments are ordered by stability tier."""
+        names = [s['name'] for s in order_segments(dev_segments())]
+        assert names == ["instructions", "script", "learning", "data", "specification"]
+
+    def test_empty_segments_dropped(self):
+        """Test that empty segments leave no blank gaps."""
+        prompt = assemble_prompt([segment("a", "A", 0), segment("b", "", 1), segment("c", "C", 2)])
+        assert prompt == "A\n\nC"
+
+    def test_ties_keep_given_order(self):
+        """Test that segments in the same tier keep their order."""
+        segments = [segment("x", "X", 2), segment("y", "Y", 2)]
+        assert assemble_prompt(segments) == "X\n\nY"
+
+
+class TestPrefixHashes:
+    """Tests for prefix hashing and reuse tracking."""
+
+    def test_prefix_hash_matches_prompt(self):
+        """Test that the last prefix hash covers the whole prompt."""
+        import hashlib
+        segments = dev_segments()
+        hashes = prefix_hashes(segments)
+        prompt = assemble_prompt(segments)
+
+        assert hashes[-1]['chars'] == len(prompt)
+        assert hashes[-1]['hash'] == hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+    def test_spec_change_keeps_prefix(self, temp_dir):
+        """Test that a new specification only invalidates the last segment."""
+        path = os.path.join(temp_dir, "hashes.json")
+        record_prefix_hashes("dev", dev_segments(spec="Spec v1"), path=path)
+        reuse = record_prefix_hashes("dev", dev_segments(spec="Spec v2"), path=path)
+
+        assert reuse['shared_segments'] == 4
+        assert reuse['total_segments'] == 5
+        assert 0 < reuse['shared_chars'] < reuse['total_chars']
+
+    def test_learning_change_breaks_later_prefix(self, temp_dir):
+        """Test that a change invalidates every later segment."""
+        path = os.path.join(temp_dir, "hashes.json")
+        record_prefix_hashes("dev", dev_segments(), path=path)
+        reuse = record_prefix_hashes("dev", dev_segments(learning="New lesson"), path=path)
+
+        assert reuse['shared_segments'] == 2
+
+    def test_first_run_and_storage(self, temp_dir):
+        """Test that the first run shares nothing and hashes are stored per prompt."""
+        path = os.path.join(temp_dir, "hashes.json")
+        reuse = record_prefix_hashes("whisper", dev_segments(), path=path)
+
+        assert reuse['shared_segments'] == 0
+        with open(path) as f:
+            assert list(json.load(f)) == ["whisper"]
@@ -0,0 +1,119 @@
+"""
+Tests for the structured results channel.
+"""
+import json
+
+from pipeline.results import (
+    RESULTS_START,
+    RESULTS_END,
+    AnalysisResults,
+    find_result_blocks,
+    strip_result_blocks,
+    extract_results,
+    render_results,
+)
+
+
+def results_block(payload):
+    """Wrap a payload the way Dev's code prints it."""
+    return f"{RESULTS_START}\n{json.dumps(payload)}\n{RESULTS_END}"
+
+
+class TestFindResultBlocks:
+    """Tests for locating results blocks in stdout."""
+
+    def test_finds_block_among_logs(self):
+        """Test that a block is found between other output."""
+        stdout = "Loading data\n" + results_block({'findings': ['a']}) + "\nDone"
+        blocks = find_result_blocks(stdout)
+
+        assert len(blocks) == 1
+        assert json.loads(blocks[0]) == {'findings': ['a']}
+
+    def test_unterminated_block(self):
+        """Test that an unterminated block runs to the end of the output."""
+        blocks = find_result_blocks(f"log\n{RESULTS_START}\n{{\"findings\": []}}")
+        assert json.loads(blocks[0]) == {'findings': []}
+
+    def test_strip_blocks(self):
+        """Test that stripping leaves only the surrounding output."""
+        stdout = "before\n" + results_block({}) + "\nafter"
+        assert strip_result_blocks(stdout) == "before\n\nafter"
+
+
+class TestExtractResults:
+    """Tests for parsing and validating results."""
+
+    def test_valid_block(self):
+        """Test that a valid block is parsed into results."""
+        stdout = results_block({
+            'metrics': [{'name': 'n_clusters', 'value': 5}],
+            'tables': [{'name': 'sizes', 'columns': ['cluster', 'size'], 'rows': [[0, 10], [1, 7]]}],
+            'figures': [{'name': 'tsne.png', 'description': 'Five separated clusters'}],
+            'findings': ['Cluster 0 is the largest'],
+        })
+        results, errors = extract_results([stdout])
+
+        assert errors == []
+        assert results.metrics[0].value == 5
+        assert results.tables[0].rows[1] == [1, 7]
+
+    def test_metric_mapping_shorthand(self):
+        """Test that metrics may be given as a name-to-value mapping."""
+        results, _ = extract_results([results_block({'metrics': {'silhouette': 0.41}})])
+        assert results.metrics[0].name == 'silhouette'
+        assert results.metrics[0].value == 0.41
+
+    def test_blocks_merged_across_executions(self):
+        """Test that blocks from several executions are combined."""
+        results, _ = extract_results([
+            results_block({'findings': ['first']}),
+            "no block here",
+            results_block({'findings': ['second']}),
+        ])
+        assert results.findings == ['first', 'second']
+
+    def test_invalid_json_reported(self):
+        """Test that malformed JSON is reported and skipped."""
+        results, errors = extract_results([f"{RESULTS_START}\n{{not json\n{RESULTS_END}"])
+        assert results is None
+        assert "not valid JSON" in errors[0]
+
+    def test_schema_errors_reported(self):
+        """Test that blocks not matching the schema are reported and skipped."""
+        results, errors = extract_results([results_block({'tables': [{'name': 'x'}]})])
+        assert results is None
+        assert "schema" in errors[0]
+
+    def test_no_blocks(self):
+        """Test that output without blocks yields no results."""
+        assert extract_results(["plain output", None]) == (None, [])
+
+
+class TestRenderResults:
+    """Tests for compact rendering."""
+
+    def test_render_sections(self):
+        """Test that every kind of result is rendered."""
+        results = AnalysisResults.model_validate({
+            'metrics': [{'name': 'silhouette', 'value': 0.412345, 'description': 'k=5'}],
+            'tables': [{'name': 'sizes', 'columns': ['cluster', 'size'], 'rows': [[0, 10]]}],
+            'figures': [{'name': 'tsne.png', 'description': 'Clusters'}],
+            'findings': ['Most positions agree'],
+        })
+        rendered = render_results(results)
+
+        assert "- silhouette: 0.4123 (k=5)" in rendered
+        assert "| cluster | size |" in rendered
+        assert "| 0 | 10 |" in rendered
+        assert "- tsne.png: Clusters" in rendered
+        assert "- Most positions agree" in rendered
+
+    def test_long_tables_truncated(self):
+        """Test that only the first rows of long tables are shown."""
+        results = AnalysisResults(tables=[{'name': 't', 'columns': ['i'], 'rows': [[i] for i in range(50)]}])
+        rendered = render_results(results, max_table_rows=10)
+
+        assert "| 9 |" in rendered
+        assert "| 10 |" not in rendered
+        assert "(40 more rows not shown)" in rendered
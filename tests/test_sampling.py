@@ -0,0 +1,110 @@
+"""
+Tests for random and representative row sampling.
+"""
+import pytest
+import numpy as np
+import pandas as pd
+
+from pipeline.sampling import (
+    allocate_quotas,
+    random_sample,
+    representative_sample,
+    format_sample_manifest,
+)
+
+
+def fake_embed(texts):
+    """Embed texts by topic keyword so clusters are known in advance."""
+    topics = ['energy', 'transport', 'housing']
+    vectors = []
+    for i, text in enumerate(texts):
+        vec = np.zeros(len(topics) + 1)
+        for j, topic in enumerate(topics):
+            if topic in text:
+                vec[j] = 10.0
+        vec[-1] = (i % 7) * 0.01
+        vectors.append(vec.tolist())
+    return vectors
+
+
+@pytest.fixture
+def skewed_df():
+    """DataFrame with one dominant topic and one rare topic."""
+    texts = (
+        [f"energy prices should fall {i}" for i in range(300)]
+        + [f"transport needs investment {i}" for i in range(90)]
+        + [f"housing is unaffordable {i}" for i in range(10)]
+    )
+    return pd.DataFrame({'participant': [f"P{i}" for i in range(len(texts))], 'position_text': texts})
+
+
+class TestAllocateQuotas:
+    """Tests for splitting the row budget across clusters."""
+
+    def test_sums_to_budget(self):
+        """Test that quotas use the whole budget."""
+        quotas = allocate_quotas([300, 90, 10], 40)
+        assert quotas.sum() == 40
+
+    def test_every_cluster_represented(self):
+        """Test that small clusters still get a row."""
+        quotas = allocate_quotas([1000, 1, 1], 10)
+        assert (quotas >= 1).all()
+
+    def test_never_exceeds_cluster_size(self):
+        """Test that quotas are capped at cluster size."""
+        quotas = allocate_quotas([2, 100], 101)
+        assert quotas[0] == 2
+        assert quotas.sum() == 101
+
+
+class TestRandomSample:
+    """Tests for uniform random sampling."""
+
+    def test_small_frame_returned_whole(self, skewed_df):
+        """Test that frames smaller than the budget are returned as-is."""
+        assert random_sample(skewed_df, 1000) is skewed_df
+
+    def test_reproducible(self, skewed_df):
+        """Test that the same seed gives the same sample."""
+        pd.testing.assert_frame_equal(random_sample(skewed_df, 50), random_sample(skewed_df, 50))
+
+
+class TestRepresentativeSample:
+    """Tests for embedding-cluster sampling."""
+
+    def test_rare_topic_represented(self, skewed_df):
+        """Test that the rare topic appears in a small sample."""
+        sample, _ = representative_sample(skewed_df, 12, embed=fake_embed, n_clusters=3)
+        assert sample['position_text'].str.contains('housing').any()
+        assert len(sample) == 12
+
+    def test_manifest_sizes(self, skewed_df):
+        """Test that the manifest records cluster sizes and weights."""
+        sample, manifest = representative_sample(skewed_df, 30, embed=fake_embed, n_clusters=3)
+
+        assert sorted(c['size'] for c in manifest['clusters']) == [10, 90, 300]
+        assert sum(c['sampled'] for c in manifest['clusters']) == len(sample)
+        for c in manifest['clusters']:
+            assert c['weight'] == pytest.approx(c['size'] / c['sampled'])
+
+    def test_weights_reconstruct_total(self, skewed_df):
+        """Test that sample weights add up to the number of rows."""
+        sample, _ = representative_sample(skewed_df, 30, embed=fake_embed, n_clusters=3)
+        assert sample['sample_weight'].sum() == pytest.approx(len(skewed_df))
+
+    def test_skips_duplicates_and_nulls(self):
+        """Test that duplicate texts are not sampled twice and nulls are excluded."""
+        df = pd.DataFrame({'position_text': ["energy now"] * 20 + ["transport now", None]})
+        sample, manifest = representative_sample(df, 10, embed=fake_embed, n_clusters=2)
+
+        assert sample['position_text'].is_unique
+        assert manifest['excluded_null_text'] == 1
+
+    def test_format_manifest(self, skewed_df):
+        """Test the manifest rendering shown to Dev."""
+        _, manifest = representative_sample(skewed_df, 12, embed=fake_embed, n_clusters=3)
+        text = format_sample_manifest(manifest)
+
+        assert "cluster | size | sampled | weight" in text
+        assert "sample_weight" in text
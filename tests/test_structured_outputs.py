@@ -0,0 +1,149 @@
+"""
+Tests for schema-validated structured outputs.
+"""
+import json
+import pytest
+from unittest.mock import Mock
+
+from pydantic import ValidationError
+
+from pipeline.critique_parsing import parse_critique
+from pipeline.structured_outputs import (
+    WhisperOutput,
+    CritiqueOutput,
+    StructuredOutputError,
+    response_format,
+    parse_output,
+    repair_prompt,
+    request_structured,
+)
+
+
+def reply(text, conversation_id="conv-1"):
+    """Build a mock conversation response with one text output."""
+    output = Mock()
+    output.content = text
+    return Mock(outputs=[output], conversation_id=conversation_id)
+
+
+CRITIQUE_JSON = {
+    'assessment': "Solid run.",
+    'whisper': {'learning_materials': "- Keep delimiters", 'prompt_suggestions': ""},
+    'spec': {'learning_materials': "- Name functions", 'prompt_suggestions': "- Ask for a data dictionary"},
+    'dev': {'learning_materials': "- Print metrics", 'prompt_suggestions': "- Require docstrings"},
+    'quant': {'learning_materials': "", 'prompt_suggestions': "- Quote sample sizes"},
+    'updated_whisper_prompt': "You are Whisper.",
+}
+
+
+class TestParseOutput:
+    """Tests for parsing JSON replies."""
+
+    def test_plain_json(self):
+        """Test that a JSON reply is validated into the model."""
+        parsed = parse_output('{"spec_prompt": "s", "quant_prompt": "q"}', WhisperOutput)
+        assert parsed.spec_prompt == "s"
+
+    def test_fenced_json(self):
+        """Test that a reply wrapped in a json code fence is accepted."""
+        parsed = parse_output('```json\n{"spec_prompt": "s", "quant_prompt": "q"}\n```', WhisperOutput)
+        assert parsed.quant_prompt == "q"
+
+    def test_not_json(self):
+        """Test that free text raises ValueError."""
+        with pytest.raises(ValueError, match="not valid JSON"):
+            parse_output("PROMPT FOR SPEC ...", WhisperOutput)
+
+    def test_schema_mismatch(self):
+        """Test that missing or empty fields fail validation."""
+        with pytest.raises(ValidationError):
+            parse_output('{"spec_prompt": ""}', WhisperOutput)
+
+
+class TestResponseFormat:
+    """Tests for the JSON-schema response format."""
+
+    def test_schema_included(self):
+        """Test that the model's JSON schema is requested."""
+        args = response_format(WhisperOutput)
+        schema = args['response_format']['json_schema']['schema']
+
+        assert args['response_format']['type'] == 'json_schema'
+        assert set(schema['required']) == {'spec_prompt', 'quant_prompt'}
+
+    def test_not_strict(self):
+        """Test that strict mode is off, since defaulted fields aren't listed as required."""
+        args = response_format(CritiqueOutput)
+
+        assert 'strict' not in args['response_format']['json_schema']
+
+
+class TestRepairPrompt:
+    """Tests for the repair message."""
+
+    def test_lists_validation_errors(self):
+        """Test that each failing field is named."""
+        try:
+            WhisperOutput.model_validate({'spec_prompt': 's'})
+        except ValidationError as e:
+            message = repair_prompt(e)
+        assert "- quant_prompt:" in message
+
+
+class TestRequestStructured:
+    """Tests for requesting and repairing structured replies."""
+
+    def test_valid_first_reply(self):
+        """Test that a valid reply needs no repair."""
+        client = Mock()
+        client.beta.conversations.start.return_value = reply('{"spec_prompt": "s", "quant_prompt": "q"}')
+
+        parsed, _ = request_structured(client, "agent-1", "prompt", WhisperOutput)
+
+        assert parsed.spec_prompt == "s"
+        assert client.beta.conversations.start.call_args[1]['completion_args']['response_format']['type'] == 'json_schema'
+        client.beta.conversations.append.assert_not_called()
+
+    def test_one_repair_retry(self):
+        """Test that an invalid reply is repaired in the same conversation."""
+        client = Mock()
+        client.beta.conversations.start.return_value = reply('{"spec_prompt": "s"}', "conv-7")
+        client.beta.conversations.append.return_value = reply('{"spec_prompt": "s", "quant_prompt": "q"}')
+
+        parsed, _ = request_structured(client, "agent-1", "prompt", WhisperOutput)
+
+        assert parsed.quant_prompt == "q"
+        append_call = client.beta.conversations.append.call_args[1]
+        assert append_call['conversation_id'] == "conv-7"
+        assert "quant_prompt" in append_call['inputs']
+
+    def test_repair_failure_raises(self):
+        """Test that a second invalid reply raises without further retries."""
+        client = Mock()
+        client.beta.conversations.start.return_value = reply("not json")
+        client.beta.conversations.append.return_value = reply("still not json")
+
+        with pytest.raises(StructuredOutputError):
+            request_structured(client, "agent-1", "prompt", WhisperOutput)
+        assert client.beta.conversations.append.call_count == 1
+
+
+class TestCritiqueOutput:
+    """Tests for the Critique output model."""
+
+    def test_sections(self):
+        """Test that sections match the shape of parse_critique."""
+        sections = CritiqueOutput.model_validate(CRITIQUE_JSON).sections()
+
+        assert sections['learning'] == {'whisper': "- Keep delimiters", 'spec': "- Name functions", 'dev': "- Print metrics"}
+        assert sections['whisper_prompt'] == "You are Whisper."
+        assert sections['suggestions'] == {
+            'spec': "- Ask for a data dictionary",
+            'dev': "- Require docstrings",
+            'quant': "- Quote sample sizes",
+        }
+
+    def test_markdown_round_trip(self):
+        """Test that the rendered markdown parses back to the same sections."""
+        output = CritiqueOutput.model_validate(json.loads(json.dumps(CRITIQUE_JSON)))
+        assert parse_critique(output.to_markdown()) == output.sections()
@@ -0,0 +1,102 @@
+"""
+Tests for the vectorized text column profiler.
+"""
+import pytest
+import numpy as np
+import pandas as pd
+
+from pipeline.text_profile import (
+    CountMinSketch,
+    text_columns,
+    profile_text_column,
+    profile_text_columns,
+    format_text_profile,
+)
+
+
+class TestCountMinSketch:
+    """Tests for the count-min sketch."""
+
+    def test_never_undercounts(self):
+        """Test that estimates are at least the true counts."""
+        items = np.array([f"w{i % 50}" for i in range(5000)], dtype=object)
+        sketch = CountMinSketch(width=64, depth=3)
+        sketch.add(items)
+
+        truth = pd.Series(items).value_counts()
+        estimates = sketch.estimate(truth.index.to_numpy())
+        assert (estimates >= truth.to_numpy()).all()
+
+    def test_exact_for_few_items(self):
+        """Test that a wide sketch is exact for a handful of items."""
+        sketch = CountMinSketch()
+        sketch.add(np.array(["a", "b", "a"], dtype=object))
+        assert list(sketch.estimate(["a", "b", "c"])) == [2, 1, 0]
+
+
+class TestProfileTextColumn:
+    """Tests for profiling a single text column."""
+
+    def test_lengths_and_nulls(self):
+        """Test the length distribution and null counts."""
+        series = pd.Series(["abc", "abcdef", None])
+        profile = profile_text_column(series)
+
+        assert profile['non_null'] == 2
+        assert profile['null'] == 1
+        assert profile['length']['min'] == 3
+        assert profile['length']['max'] == 6
+
+    def test_top_ngrams(self):
+        """Test that frequent unigrams and bigrams are reported in order."""
+        series = pd.Series(["the cat sat", "the cat ran", "the dog sat"] * 100)
+        profile = profile_text_column(series, top_n=2, chunk_rows=37)
+
+        assert profile['top_unigrams'][0] == ("the", 300)
+        assert profile['top_bigrams'][0] == ("the cat", 200)
+
+    def test_bigrams_do_not_cross_rows(self):
+        """Test that bigrams are only formed within a single text."""
+        profile = profile_text_column(pd.Series(["alpha", "beta"]))
+        assert profile['top_bigrams'] == []
+
+    def test_vocabulary_and_duplicates(self):
+        """Test vocabulary size and duplicate rate estimates."""
+        series = pd.Series(["One two", "one  TWO", "three"])
+        profile = profile_text_column(series)
+
+        assert profile['approx_vocabulary'] == 3
+        assert profile['duplicate_rate'] == pytest.approx(1 / 3)
+
+    def test_large_vocabulary_estimate(self):
+        """Test that the KMV estimate is close for vocabularies above the sketch size."""
+        series = pd.Series([f"word{i} token{i}" for i in range(20000)])
+        profile = profile_text_column(series)
+        assert profile['approx_vocabulary'] == pytest.approx(40000, rel=0.1)
+
+
+class TestProfileTextColumns:
+    """Tests for profiling all text columns of a DataFrame."""
+
+    def test_only_text_columns(self, sample_consultation_csv):
+        """Test that categorical and numeric columns are skipped."""
+        from pipeline.data_loading import load_dataframe
+        df, _ = load_dataframe(sample_consultation_csv)
+
+        assert text_columns(df) == ['position_text']
+        assert list(profile_text_columns(df)) == ['position_text']
+
+    def test_every_text_column_profiled(self, sample_csv_large):
+        """Test that object columns without a schema are all profiled."""
+        df = pd.read_csv(sample_csv_large)
+        profiles = profile_text_columns(df)
+        assert set(profiles) == {'position_text', 'participant_id'}
+
+    def test_format(self, sample_csv_small):
+        """Test the plain-text rendering of profiles."""
+        df = pd.read_csv(sample_csv_small)
+        summary = format_text_profile(profile_text_columns(df, columns=['position_text']))
+
+        assert "Text Column ('position_text') Profile:" in summary
+        assert "Top bigrams: sample text (50)" in summary
+        assert "Duplicate rate: 0.0%" in summary
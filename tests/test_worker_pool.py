@@ -0,0 +1,125 @@
+"""
+Tests for the warm worker pool.
+"""
+import os
+import time
+from types import SimpleNamespace
+import pytest
+
+from pipeline.worker_pool import WarmWorkerPool, POOL_SUPPORTED, warm_up
+from pipeline.local_executor import DATA_PATH_ENV
+
+
+pytestmark = pytest.mark.skipif(not POOL_SUPPORTED, reason="the worker pool needs fork")
+
+
+def _write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+@pytest.fixture(scope="module")
+def pool():
+    """A pool shared by the tests in this module, started once."""
+    with WarmWorkerPool(workers=2) as pool:
+        pool.start()
+        yield pool
+
+
+class TestWarmUp:
+    """Tests for preloading libraries."""
+
+    def test_missing_modules_skipped(self):
+        """Test that modules that aren't installed are skipped."""
+        imported = warm_up(modules=("json", "not_a_real_module_xyz"), corpora=())
+
+        assert imported == ["json"]
+
+
+class TestWarmWorkerPool:
+    """Tests for running scripts in warm workers."""
+
+    def test_libraries_preloaded(self, pool, temp_dir):
+        """Test that jobs start with pandas already imported."""
+        result = pool.run_code("import sys\nprint('pandas' in sys.modules)", None, temp_dir)
+
+        assert result['stdout'] == "True\n"
+
+    def test_result_shape_and_artifacts(self, pool, temp_dir, sample_csv_small):
+        """Test that results match the local executor, including the dataset path and saved files."""
+        code = (f"import os, pandas as pd\n"
+                f"df = pd.read_csv(os.environ['{DATA_PATH_ENV}'])\n"
+                f"print(len(df))\n"
+                f"df.head().to_csv('head.csv')\n")
+        result = pool.run_code(code, sample_csv_small, temp_dir)
+
+        assert result['stdout'] == "50\n"
+        assert result['result'] is None
+        assert result['returncode'] == 0
+        assert os.path.join(temp_dir, "head.csv") in result['artifacts']
+
+    def test_jobs_are_isolated(self, pool, temp_dir):
+        """Test that globals and module changes don't leak between jobs."""
+        pool.run_code("import json\njson.leaked = True\nLEAKED = True", None, temp_dir)
+        result = pool.run_code("import json\nprint('LEAKED' in globals(), hasattr(json, 'leaked'))", None, temp_dir)
+
+        assert result['stdout'] == "False False\n"
+
+    def test_errors_reported(self, pool, temp_dir):
+        """Test that a failing script returns its traceback and exit code."""
+        result = pool.run_code("raise ValueError('boom')", None, temp_dir)
+
+        assert result['returncode'] == 1
+        assert "ValueError: boom" in result['stderr']
+        assert result['result'] == "Process exited with code 1"
+
+    def test_sys_exit(self, pool, temp_dir):
+        """Test that sys.exit sets the exit code without killing the worker."""
+        result = pool.run_code("import sys\nprint('bye')\nsys.exit(3)", None, temp_dir)
+
+        assert result['stdout'] == "bye\n"
+        assert result['returncode'] == 3
+
+    def test_replies_arriving_together(self):
+        """Test that two replies written to the pipe at once are both read without waiting."""
+        read_fd, write_fd = os.pipe()
+        pool = WarmWorkerPool()
+        pool._server = SimpleNamespace(stdout=os.fdopen(read_fd, "r"))
+        os.write(write_fd, b'{"id": 0}\n{"id": 1}\n')
+        try:
+            start = time.perf_counter()
+            replies = [pool._receive(5), pool._receive(5)]
+        finally:
+            os.close(write_fd)
+            pool._server.stdout.close()
+
+        assert replies == [{'id': 0}, {'id': 1}]
+        assert time.perf_counter() - start < 1
+
+    def test_timeout_stops_only_that_job(self, temp_dir):
+        """Test that a job over the wall-clock limit is killed while the pool keeps serving."""
+        with WarmWorkerPool(workers=2) as pool:
+            slow, quick = [_write(os.path.join(temp_dir, name), code) for name, code in [
+                ("slow.py", "import time\ntime.sleep(30)"),
+                ("quick.py", "print('done')"),
+            ]]
+            results = pool.run_scripts([(slow, os.path.join(temp_dir, "slow")), (quick, os.path.join(temp_dir, "quick"))],
+                                       None, limits={'timeout_seconds': 1})
+
+            assert results[0]['returncode'] is None
+            assert results[0]['result'] == "Timed out after 1 seconds"
+            assert results[1]['stdout'] == "done\n"
+
+            result = pool.run_code("print('again')", None, temp_dir)
+            assert result['stdout'] == "again\n"
+
+    def test_jobs_run_concurrently(self, pool, temp_dir):
+        """Test that a batch runs up to one job per worker at the same time."""
+        scripts = [_write(os.path.join(temp_dir, f"job{i}.py"), f"import time\ntime.sleep(1)\nprint({i})")
+                   for i in range(2)]
+        start = time.perf_counter()
+        results = pool.run_scripts([(script, os.path.join(temp_dir, f"run{i}")) for i, script in enumerate(scripts)], None)
+
+        assert [r['stdout'] for r in results] == ["0\n", "1\n"]
+        assert time.perf_counter() - start < 1.9